@@ -6,3 +6,13 @@
 
 # Backup específico de uma VM específica
 # 30 2 * * 6 /opt/scripts/vm_backup.sh /opt/scripts/vm_backup_config.yaml winserver2022 > /dev/null 2>&1
+
+# Backup offline semanal com o motor Python (lê o config.yaml uma única vez)
+# 0 3 * * 0 /home/goku/scripts/backup/vm_backup.py /home/goku/scripts/backup/vm_backup_config.yaml > /dev/null 2>&1
+
+# Reverificação dos backups armazenados (VMs e NEs), quarta-feira às 01:00, fora da janela de domingo
+# O backupNE.py grava no próprio catálogo (usuário serveradm): os dois catálogos são informados com -d
+# 0 1 * * 3 /home/goku/scripts/backup/scrub_backups.py --rate 50 -d /opt/backup/catalog.db -d /home/serveradm/scripts/backupNE/catalog.db /home/goku/scripts/backup/vm_backup_config.yaml > /dev/null 2>&1
+
+# Réplica externa (SFTP) dos backups de VMs e NEs, toda noite às 04:30, até o horário de global.replica.until
+# 30 4 * * * /home/goku/scripts/backup/replicate_backups.py -d /opt/backup/catalog.db -d /home/serveradm/scripts/backupNE/catalog.db /home/goku/scripts/backup/vm_backup_config.yaml > /dev/null 2>&1
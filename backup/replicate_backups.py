@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+  replicate_backups.py - Python Script para replicar os backups para um servidor externo (SFTP)
+  Uso: sudo ./replicate_backups.py [opções] /caminho/para/config.yaml
+       sudo ./replicate_backups.py -R vm/VMSnipeit/VMSnipeit-full-20261019_030000 -t /tmp/restore config.yaml
+
+  Envia os backups de VMs e de NEs registrados nos catálogos (-d, repetível) e ainda não replicados
+  para o servidor da seção global.replica, em blocos, por várias conexões SFTP em
+  paralelo. Blocos que o servidor já tem não são reenviados e uma execução
+  interrompida continua do ponto em que parou. Retorna 1 se algum backup falhou.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import collections
+import os
+import sys
+import time
+sys.path.append('/home/goku/scripts/library')
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'test', 'library'))
+import log
+from optparse import OptionParser
+from catalog import BackupCatalog
+from chunkstore import ChunkStore
+from replicate import Replicator, ReplicationError
+from vmbackup import human_size
+from vmconfig import BackupConfig, ConfigError
+
+
+def deadline(until):
+   '''
+      deadline - função para converter o horário limite (HH:MM) em data
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @param until - HH:MM (hoje, ou amanhã se o horário já passou)
+        @returns - data (epoch) ou None se não houver limite
+   '''
+   if not until:
+      return None
+   hour, minute = [int(x) for x in until.split(':')]
+   now = time.localtime()
+   limit = time.mktime((now.tm_year, now.tm_mon, now.tm_mday, hour, minute, 0, 0, 0, -1))
+   return limit if limit > time.time() else limit + 86400
+
+
+def main(argv):
+   parser = OptionParser(usage='usage: %prog [options] <arquivo_config>', version='%prog 1.0')
+   parser.add_option('-k', '--kind', dest='kind', choices=['vm', 'ne'],
+                     help='replica apenas backups de VMs (vm) ou de NEs (ne)')
+   parser.add_option('-c', '--channels', dest='channels', type='int',
+                     help='conexoes SFTP em paralelo (padrao: global.replica.channels)')
+   parser.add_option('-u', '--until', dest='until',
+                     help='HH:MM apos o qual nenhum backup novo e iniciado (padrao: global.replica.until)')
+   parser.add_option('-R', '--restore', dest='restore',
+                     help='restaura do servidor remoto o backup <tipo>/<origem>/<nome>')
+   parser.add_option('-t', '--target', dest='target', default='.',
+                     help='diretorio onde o backup restaurado e gravado (padrao: .)')
+   parser.add_option('-d', '--catalog', dest='catalogs', action='append',
+                     help='catalogo de backups, pode ser repetido (padrao: global.catalog); '
+                          'o backupNE.py usa o proprio, ex: -d /home/serveradm/scripts/backupNE/catalog.db')
+   (options, args) = parser.parse_args(argv)
+   if len(args) < 1:
+      parser.print_help()
+      sys.exit(1)
+
+   try:
+      config = BackupConfig.load(args[0])
+   except ConfigError as e:
+      print('ERRO: %s' % e)
+      sys.exit(1)
+   replica = config.replica
+   if not replica.host or not replica.remote_dir:
+      print('ERRO: réplica não configurada (global.replica.host e remote_dir)')
+      sys.exit(1)
+   if options.channels:
+      replica.channels = max(1, options.channels)
+   logger = log.setup_custom_logger('root', os.path.join(config.log_dir, 'backup_replica.log'), 'info')
+
+   catalogs = options.catalogs or [config.catalog]
+   catalog = BackupCatalog(catalogs[0])
+   store = ChunkStore(config.chunk_store) if os.path.isdir(config.chunk_store) else None
+   replicator = Replicator(catalog, replica, store)
+
+   if options.restore:
+      try:
+         kind, source, name = options.restore.split('/', 2)
+         files = replicator.restore(kind, source, name, options.target)
+      except (ValueError, IOError, ReplicationError) as e:
+         print('ERRO: restauração de %s: %s' % (options.restore, e))
+         sys.exit(1)
+      finally:
+         replicator.close()
+         catalog.close()
+      for path in files:
+         print(path)
+      sys.exit(0)
+
+   if not replica.enabled:
+      print('Réplica desabilitada (global.replica.enabled)')
+      sys.exit(0)
+
+   print('====== INICIANDO RÉPLICA DOS BACKUPS PARA %s ======' % replica.host)
+   logger.info('Iniciando réplica para %s:%s com %d conexões' % (replica.host, replica.remote_dir, replica.channels))
+   until = deadline(options.until or replica.until)
+   summary = collections.Counter()
+   try:
+      # Os catálogos (VMs e NEs) são replicados em sequência pelas mesmas conexões, até o horário limite
+      for i, path in enumerate(catalogs):
+         if i:
+            catalog.close()
+            catalog = replicator.catalog = BackupCatalog(path)
+         logger.info('Replicando os backups do catálogo %s' % path)
+         summary.update(replicator.run(options.kind, until))
+   except ReplicationError as e:
+      logger.error('Réplica interrompida: %s' % e)
+      print('ERRO: %s' % e)
+      sys.exit(1)
+   finally:
+      replicator.close()
+      catalog.close()
+
+   msg = 'Replicados: %d backups, %s enviados, %s já presentes no servidor, %d falhas, %d adiados' \
+         % (summary['artifacts'], human_size(summary['sent_bytes']), human_size(summary['skipped_bytes']),
+            summary['failed'], summary['deferred'])
+   logger.info(msg)
+   print(msg)
+   print('====== RÉPLICA DOS BACKUPS CONCLUÍDA ======')
+   sys.exit(1 if summary['failed'] else 0)
+
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
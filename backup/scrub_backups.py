@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+  scrub_backups.py - Python Script para reverificar os backups armazenados (scrub)
+  Uso: sudo ./scrub_backups.py [opções] /caminho/para/config.yaml
+
+  Relê em paralelo os backups de VMs e de NEs registrados nos catálogos que não foram
+  verificados nos últimos dias, com taxa de leitura limitada e prioridade de I/O
+  idle, e grava o resultado no catálogo. Retorna 1 se algum backup está corrompido
+  ou ausente.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import collections
+import os
+import sys
+sys.path.append('/home/goku/scripts/library')
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'test', 'library'))
+import log
+from optparse import OptionParser
+from catalog import BackupCatalog
+from chunkstore import ChunkStore
+from iogovernor import MB
+from scrub import Scrubber
+from vmbackup import human_size
+from vmconfig import BackupConfig, ConfigError
+
+
+def main(argv):
+   parser = OptionParser(usage='usage: %prog [options] <arquivo_config>', version='%prog 1.0')
+   parser.add_option('-w', '--workers', dest='workers', type='int', default=2,
+                     help='arquivos verificados em paralelo (padrao: 2)')
+   parser.add_option('-r', '--rate', dest='rate', type='int', default=50,
+                     help='limite de leitura em MB/s, 0 = sem limite (padrao: 50)')
+   parser.add_option('-i', '--interval', dest='interval', type='int', default=7,
+                     help='reverifica backups verificados ha mais de N dias (padrao: 7)')
+   parser.add_option('-k', '--kind', dest='kind', choices=['vm', 'ne'],
+                     help='verifica apenas backups de VMs (vm) ou de NEs (ne)')
+   parser.add_option('-d', '--catalog', dest='catalogs', action='append',
+                     help='catalogo de backups, pode ser repetido (padrao: global.catalog); '
+                          'o backupNE.py usa o proprio, ex: -d /home/serveradm/scripts/backupNE/catalog.db')
+   parser.add_option('--deep', dest='deep', action='store_true', default=False,
+                     help='descompacta os .gz e confere tambem o checksum da imagem')
+   (options, args) = parser.parse_args(argv)
+   if len(args) < 1:
+      parser.print_help()
+      sys.exit(1)
+
+   try:
+      config = BackupConfig.load(args[0])
+   except ConfigError as e:
+      print('ERRO: %s' % e)
+      sys.exit(1)
+   logger = log.setup_custom_logger('root', os.path.join(config.log_dir, 'backup_scrub.log'), 'info')
+
+   store = ChunkStore(config.chunk_store) if os.path.isdir(config.chunk_store) else None
+
+   print('====== INICIANDO VERIFICAÇÃO DOS BACKUPS ARMAZENADOS ======')
+   summary = collections.Counter()
+   for path in options.catalogs or [config.catalog]:
+      logger.info('Iniciando scrub do catálogo %s' % path)
+      catalog = BackupCatalog(path)
+      try:
+         result = Scrubber(catalog, store, options.workers, options.rate * MB, options.deep).run(options.interval, options.kind)
+      finally:
+         catalog.close()
+      summary.update(result)
+
+   msg = 'Verificados: %d ok, %d corrompidos, %d ausentes (%s lidos)' \
+         % (summary['ok'], summary['corrupt'], summary['missing'], human_size(summary['bytes']))
+   logger.info(msg)
+   print(msg)
+   print('====== VERIFICAÇÃO DOS BACKUPS CONCLUÍDA ======')
+   sys.exit(1 if summary['corrupt'] or summary['missing'] else 0)
+
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+  trace_report.py - Python Script para comparar as etapas e o downtime dos backups de VMs entre execuções
+  Uso: ./trace_report.py [opções] /caminho/para/config.yaml
+
+  Lê o arquivo de spans (global.trace_file) e mostra, para cada VM, as últimas
+  execuções com duração total, downtime e duração/vazão de cada etapa. A última
+  execução de cada VM é comparada com a mediana das anteriores: etapas (ou o
+  downtime) mais lentas que o limite são indicadas como regressão, e o script
+  retorna 1.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import os
+import sys
+sys.path.append('/home/goku/scripts/library')
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'test', 'library'))
+from optparse import OptionParser
+from tracing import load
+from vmconfig import BackupConfig, ConfigError
+
+# Diferenças menores que isso (segundos) não são regressões, qualquer que seja a proporção
+MIN_DELTA = 5
+
+
+def median(values):
+   values = sorted(values)
+   middle = len(values) // 2
+   return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def regressions(runs, threshold):
+   '''
+      regressions - função para comparar a última execução com as anteriores
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @param runs      - resumos de uma VM, do mais antigo ao mais novo
+        @param threshold - fração acima da mediana considerada regressão (ex: 0.2)
+        @returns - lista de (métrica, valor atual, mediana anterior)
+   '''
+   if len(runs) < 2:
+      return []
+   last, previous = runs[-1], runs[:-1]
+   metrics = {'total': lambda r: r['duration'], 'downtime': lambda r: r['downtime']}
+   for phase in last['phases']:
+      metrics[phase] = lambda r, phase=phase: r['phases'].get(phase, {}).get('duration')
+   found = []
+   for metric, value in sorted(metrics.items()):
+      current = value(last)
+      history = [v for v in (value(r) for r in previous) if v is not None]
+      if current is None or not history:
+         continue
+      base = median(history)
+      if current > base * (1 + threshold) and current - base >= MIN_DELTA:
+         found.append((metric, current, base))
+   return found
+
+
+def main(argv):
+   parser = OptionParser(usage='usage: %prog [options] <arquivo_config>', version='%prog 1.0')
+   parser.add_option('-v', '--vm', dest='vm', help='mostra apenas a VM informada')
+   parser.add_option('-n', '--runs', dest='runs', type='int', default=8,
+                     help='execucoes mostradas e comparadas por VM (padrao: 8)')
+   parser.add_option('-t', '--threshold', dest='threshold', type='int', default=20,
+                     help='%% acima da mediana das execucoes anteriores considerado regressao (padrao: 20)')
+   (options, args) = parser.parse_args(argv)
+   if len(args) < 1:
+      parser.print_help()
+      sys.exit(1)
+
+   try:
+      config = BackupConfig.load(args[0])
+   except ConfigError as e:
+      print('ERRO: %s' % e)
+      sys.exit(1)
+   if not os.path.isfile(config.trace_file):
+      print('ERRO: arquivo de spans não encontrado: %s' % config.trace_file)
+      sys.exit(1)
+
+   by_vm = {}
+   for summary in load(config.trace_file, options.vm):
+      by_vm.setdefault(summary['vm'], []).append(summary)
+
+   found = 0
+   for vm in sorted(by_vm):
+      runs = by_vm[vm][-options.runs:]
+      print('====== %s ======' % vm)
+      print('%-16s %-7s %9s %9s  %s' % ('execução', 'result.', 'total', 'downtime', 'etapas (s, MB/s)'))
+      for r in runs:
+         phases = ', '.join('%s %.0f%s' % (p, t['duration'], '' if t['mb_s'] is None else '@%.0f' % t['mb_s'])
+                            for p, t in sorted(r['phases'].items(), key=lambda p: -p[1]['duration']))
+         downtime = '-' if r['downtime'] is None else '%.0fs' % r['downtime']
+         print('%-16s %-7s %8.0fs %9s  %s' % (r['run'], r['result'], r['duration'], downtime, phases))
+      for metric, current, base in regressions(runs, options.threshold / 100.0):
+         found += 1
+         print('REGRESSÃO: %s %.1fs na última execução, mediana anterior %.1fs (+%.0f%%)'
+               % (metric, current, base, (current / base - 1) * 100 if base else 100))
+      print('')
+   sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
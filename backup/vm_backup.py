@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+  vm_backup.py - Python Script para backup offline de VMs (sucessor do vm_backup.sh)
+  Uso: sudo ./vm_backup.py /caminho/para/config.yaml [nome_vm]
+
+  Lê o config.yaml uma única vez e realiza backups completos offline das VMs habilitadas.
+  Se nome_vm for fornecido, faz backup apenas desta VM.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import os
+import sys
+sys.path.append('/home/goku/scripts/library')
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'test', 'library'))
+from optparse import OptionParser
+from vmconfig import BackupConfig, ConfigError
+from vmbackup import process_backups
+
+
+def main(argv):
+   parser = OptionParser(usage='usage: %prog <arquivo_config> [nome_vm]', version='%prog 1.0')
+   (options, args) = parser.parse_args(argv)
+   if len(args) < 1:
+      parser.print_help()
+      sys.exit(1)
+   config_file = args[0]
+   target_vm = args[1] if len(args) > 1 else 'all'   # Se não for especificado, faz backup de todas as VMs
+
+   # Verificar se o script está rodando como root
+   if os.geteuid() != 0:
+      print('ERRO: Execute este script como root (sudo)')
+      sys.exit(1)
+
+   # Carregar a configuração uma única vez
+   try:
+      config = BackupConfig.load(config_file)
+   except ConfigError as e:
+      print('ERRO: %s' % e)
+      sys.exit(1)
+
+   print('====== INICIANDO GERENCIADOR DE BACKUPS DE VMs ======')
+   print('Arquivo de configuração: %s' % config_file)
+   print('VM alvo: %s' % target_vm)
+
+   result = process_backups(config, target_vm)
+
+   print('====== GERENCIADOR DE BACKUPS DE VMs CONCLUÍDO ======')
+   sys.exit(result)
+
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
@@ -164,22 +164,21 @@ check_disk_space() {
     local backup_dir="$3"
     local vm_file="$4"
     
-    # Para backup completo, precisamos de espaço suficiente para todo o arquivo
-    local vm_size=$(du -h "$vm_file" | awk '{print $1}' | grep -o '[0-9.]*' | head -1)
-    # Convertendo para um número inteiro para facilitar comparações
-    vm_size=$(echo "$vm_size" | cut -d. -f1)
-    if [ -z "$vm_size" ]; then vm_size=1; fi
+    # Para backup completo, precisamos de espaço suficiente para os dados alocados do arquivo
+    # (em bytes: 'du -h' perde a unidade e as casas decimais)
+    local vm_size=$(du -B1 "$vm_file" 2>/dev/null | awk '{print $1}')
+    if [ -z "$vm_size" ]; then vm_size=0; fi
 
-    local required_space=$((vm_size + 5))  # VM size + 5GB para segurança
-    local available_space=$(df -BG "$backup_dir" | tail -1 | awk '{print $4}' | tr -d 'G')
-    
-    if [ $available_space -lt $required_space ]; then
-        log "ALERTA: Espaço insuficiente para backup. Necessário: ${required_space}GB, Disponível: ${available_space}GB"
+    local required_space=$((vm_size + 5 * 1024 * 1024 * 1024))  # VM size + 5GB para segurança
+    local available_space=$(df -B1 --output=avail "$backup_dir" | tail -1 | tr -d ' ')
+
+    if [ "$available_space" -lt "$required_space" ]; then
+        log "ALERTA: Espaço insuficiente para backup. Necessário: $(numfmt --to=iec "$required_space"), Disponível: $(numfmt --to=iec "$available_space")"
         send_notification "$config_file" "critical" "Espaço em disco insuficiente para backup de $vm_name"
         return 1
     fi
-    
-    log "Espaço em disco suficiente para backup: ${available_space}GB disponível"
+
+    log "Espaço em disco suficiente para backup: $(numfmt --to=iec "$available_space") disponível"
     return 0
 }
 
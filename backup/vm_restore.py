@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+  vm_restore.py - Python Script para restaurar a imagem de uma VM a partir do catálogo de backups
+  Uso: sudo ./vm_restore.py [opções] /caminho/para/config.yaml nome_vm [nome_backup]
+
+  Sem nome_backup, restaura o último backup válido da VM. A imagem é remontada e
+  conferida com a VM ainda ligada; a VM só é desligada para a troca atômica do arquivo.
+  Com --list, apenas lista os backups disponíveis da VM.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import os
+import sys
+import time
+sys.path.append('/home/goku/scripts/library')
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'test', 'library'))
+from optparse import OptionParser
+from vmbackup import human_size
+from vmconfig import BackupConfig, ConfigError
+from vmrestore import VMRestore
+
+
+def main(argv):
+   parser = OptionParser(usage='usage: %prog [options] <arquivo_config> <nome_vm> [nome_backup]', version='%prog 1.0')
+   parser.add_option('-w', '--workers', dest='workers', type='int',
+                     help='threads de descompactacao (padrao: compress_workers da VM)')
+   parser.add_option('-l', '--list', dest='list', action='store_true', default=False,
+                     help='lista os backups disponiveis da VM')
+   parser.add_option('--no-start', dest='start', action='store_false', default=True,
+                     help='mantem a VM desligada apos a restauracao')
+   parser.add_option('--discard-original', dest='keep', action='store_false', default=True,
+                     help='nao mantem a imagem anterior (<imagem>.pre-restore-<data>)')
+   (options, args) = parser.parse_args(argv)
+   if len(args) < 2:
+      parser.print_help()
+      sys.exit(1)
+   config_file, vm_name = args[0], args[1]
+   backup_name = args[2] if len(args) > 2 else None
+
+   # Verificar se o script está rodando como root
+   if os.geteuid() != 0:
+      print('ERRO: Execute este script como root (sudo)')
+      sys.exit(1)
+
+   try:
+      config = BackupConfig.load(config_file)
+   except ConfigError as e:
+      print('ERRO: %s' % e)
+      sys.exit(1)
+   vm = config.get_vm(vm_name)
+   if vm is None:
+      print('ERRO: VM \'%s\' não encontrada na configuração' % vm_name)
+      sys.exit(1)
+
+   job = VMRestore(config, vm)
+   if options.list:
+      for row in job.catalog.artifacts('vm', vm_name):
+         print('%-40s %-7s %s  %10s  %s' % (row['name'], row['store'],
+                                           time.strftime('%d/%m/%Y %H:%M', time.localtime(row['created'])),
+                                           human_size(row['source_bytes'] or 0), row['verify_status'] or '-'))
+      sys.exit(0)
+
+   if not job.setup():
+      sys.exit(1)
+   ok = job.restore(backup_name, options.workers, options.keep, options.start)
+   sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
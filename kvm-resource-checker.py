@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+  kvm-resource-checker.py - Python Script para verificar recursos de VMs KVM e consolidação total
+  Uso: ./kvm-resource-checker.py [opções]
+
+  Mesmo relatório do kvm-resource-checker.sh, mas com os dados de todas as VMs
+  obtidos numa única consulta (virsh domstats) e as imagens das VMs desligadas
+  inspecionadas em paralelo, com cache pelo mtime. Com --json, imprime o
+  inventário em JSON para consumo por outros scripts.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import json
+import os
+import sys
+sys.path.append('/home/goku/scripts/library')
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test', 'library'))
+from optparse import OptionParser
+from kvminventory import DEFAULT_CACHE, KVMInventory
+
+# Cores para saída
+YELLOW = '\033[1;33m'
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+NC = '\033[0m'
+
+
+def print_report(inventory):
+   print('%s===============================================%s' % (YELLOW, NC))
+   print('%s      RELATÓRIO DE RECURSOS KVM              %s' % (YELLOW, NC))
+   print('%s===============================================%s' % (YELLOW, NC))
+   vms = inventory['vms']
+   if not vms:
+      print('%sNenhuma VM encontrada no servidor.%s' % (RED, NC))
+      return
+
+   rows = [('NOME VM', 'STATUS', 'VCPUs', 'MEMÓRIA (GB)', 'DISCO (GB)')]
+   for vm in vms:
+      rows.append((vm['name'], vm['state'], str(vm['vcpus']), '%.2f' % vm['memory_gb'], '%.2f' % vm['disk_gb']))
+   widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+   print('%sLista de VMs e seus recursos:%s' % (GREEN, NC))
+   for row in rows:
+      print('  '.join(col.ljust(w) for col, w in zip(row, widths)).rstrip())
+
+   host = inventory['host']
+   totals = inventory['totals']
+   print('\n%sRecursos do Host:%s' % (BLUE, NC))
+   print('CPUs Físicas: %d' % host['cpus'])
+   print('Memória Total: %.2f GB' % host['memory_gb'])
+
+   print('\n%sConsolidação de Recursos:%s' % (YELLOW, NC))
+   print('Total de vCPUs alocadas: %d' % totals['vcpus'])
+   print('Total de Memória alocada: %.2f GB' % totals['memory_gb'])
+   print('Total de Disco alocado: %.2f GB' % totals['disk_gb'])
+   cpu_ratio = float(totals['vcpus']) / host['cpus']
+   mem_ratio = totals['memory_gb'] / host['memory_gb'] if host['memory_gb'] else 0
+   print('Taxa de consolidação de CPU (vCPU:pCPU): %.2f:1' % cpu_ratio)
+   print('Taxa de consolidação de Memória (VM:Host): %.2f:1' % mem_ratio)
+
+   # Verificar sobre-alocação
+   if cpu_ratio > 1:
+      print('%sAlerta: CPUs estão sobre-alocadas em %.2f vezes.%s' % (RED, cpu_ratio, NC))
+   else:
+      print('%sInfo: CPUs não estão sobre-alocadas.%s' % (GREEN, NC))
+   if mem_ratio > 0.9:
+      print('%sAlerta: Memória está com alta alocação (%.2f da capacidade total).%s' % (RED, mem_ratio, NC))
+   else:
+      print('%sInfo: Memória está dentro de limites seguros.%s' % (GREEN, NC))
+
+   print('%s===============================================%s' % (YELLOW, NC))
+   print('%s            FIM DO RELATÓRIO                %s' % (YELLOW, NC))
+   print('%s===============================================%s' % (YELLOW, NC))
+
+
+def main(argv):
+   parser = OptionParser(usage='usage: %prog [options]', version='%prog 1.0')
+   parser.add_option('-j', '--json', dest='json', action='store_true', default=False,
+                     help='imprime o inventario em JSON')
+   parser.add_option('-w', '--workers', dest='workers', type='int', default=8,
+                     help='imagens inspecionadas em paralelo (padrao: 8)')
+   parser.add_option('-c', '--cache', dest='cache', default=DEFAULT_CACHE,
+                     help='cache das imagens (padrao: %s)' % DEFAULT_CACHE)
+   parser.add_option('--no-cache', dest='cache', action='store_const', const=None,
+                     help='inspeciona todas as imagens, sem cache')
+   (options, args) = parser.parse_args(argv)
+
+   try:
+      inventory = KVMInventory(options.cache, options.workers).collect()
+   except (RuntimeError, OSError) as e:
+      print('%sErro: %s. Execute como root ou adicione seu usuário ao grupo libvirt.%s' % (RED, e, NC))
+      sys.exit(1)
+
+   if options.json:
+      print(json.dumps(inventory, indent=2, sort_keys=True))
+   else:
+      print_report(inventory)
+
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
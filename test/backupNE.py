@@ -3,41 +3,448 @@
 '''
   backupNE.py - Python Script para fazer backup de configuração de elementos de rede
 
+  Execução única (cron):   backupNE.py -c ubiquiti_devs.ini
+  Modo residente:          backupNE.py -c ubiquiti_devs.ini -D
+     Cada NE é copiado a cada interval_min minutos (seção do INI, padrão 1440), com as
+     conexões SSH mantidas abertas entre os ciclos. SIGHUP relê o INI.
+  Backup imediato:         backupNE.py -n SW1-TI   (ou -n status)
+     Pede ao daemon, pelo socket Unix, o backup imediato de um NE.
+  Execução distribuída:    backupNE.py -c ubiquiti_devs.ini -s /mnt/backup/shard
+     Várias instâncias (processos ou servidores) com o mesmo diretório de coordenação
+     dividem as seções do INI por hash consistente; se uma instância cai, as suas
+     seções passam para as demais. Os backups são gravados no mesmo dir_backup.
+
+  Antes das conexões SSH, o alcance TCP de todos os NEs é testado em paralelo; NEs
+  inacessíveis são ignorados. Os timeouts de conexão e de comando de cada NE são
+  ajustados pelas latências observadas nas execuções anteriores (latency.json).
+
   Desenvolvido por: Diogenes Reis
   Email: diofolken@gmail.com
   Data de criação: 29/08/2016
-  Última modificação: 19/01/2017
-  Versão: 1.0
+  Última modificação: 19/10/2026
+  Versão: 1.4
 '''
 import sys, re, time
+import hashlib
 sys.path.append('/home/goku/scripts/library')
 import ConfigParser
-import logging 
+import logging
 import os
+import signal
+import sqlite3
 import log
 from connect_ssh import MySSH
 from commom import getcred, read_file, ConfigSectionMap, make_sure_path_exists, delete_old_files, write_file
+from catalog import BackupCatalog
+from nedaemon import BackupDaemon, request_backup
+from neprobe import PROBE_MAX_DAYS, command_failed, probe_marker
+from reachability import DEFAULT_SCAN_TIMEOUT, LatencyHistory, scan
+from shard import ShardCoordinator
 from optparse import OptionParser
 
+basepath = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOCKET = basepath + '/backupNE.sock'
+DEFAULT_LATENCY = basepath + '/latency.json'
+# Junto do script, gravável pelo usuário do serviço (o catálogo das VMs em /opt/backup é do root)
+DEFAULT_CATALOG = basepath + '/catalog.db'
+
+
+def read_config(configfile):
+   '''
+      read_config - função para leitura do arquivo INI dos NEs
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @param configfile - nome do arquivo no diretório config
+        @returns Config - objeto ConfigParser com os NEs
+   '''
+   logger = logging.getLogger('root')
+   logger.debug('Lendo arquivo de configuração.')
+   configpath = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)) + '/config'
+   Config = ConfigParser.ConfigParser()
+   Config.read(configpath + '/' + configfile)
+   logger.debug('Arquivo de configuração lido.')
+   return Config
+
+
+def prescan(Config, hosts, history=None):
+   '''
+      prescan - função para testar o alcance TCP dos NEs antes das conexões SSH
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @param Config  - objeto ConfigParser com os NEs
+        @param hosts   - seções dos NEs a testar
+        @param history - LatencyHistory (opcional): timeouts do teste e registro das latências
+        @returns reachable - seções dos NEs acessíveis
+   '''
+   logger = logging.getLogger('root')
+   started = time.time()
+   targets = []
+   for host in hosts:
+      if history is not None:
+         limit = history.timeout(host,'tcp',DEFAULT_SCAN_TIMEOUT)
+      else:
+         limit = DEFAULT_SCAN_TIMEOUT
+      targets.append((host, ConfigSectionMap(Config,host)["address"], int(ConfigSectionMap(Config,host)["port"]), limit))
+   results = scan(targets)
+
+   reachable = []
+   for host in hosts:
+      latency, error = results[host]
+      if latency is None:
+         logger.error('NE %s inacessível (%s:%s): %s' %(host, ConfigSectionMap(Config,host)["address"],
+                                                        ConfigSectionMap(Config,host)["port"], error))
+         print 'NE %s inacessível: %s' %(host, error)
+         continue
+      if history is not None:
+         history.add(host,'tcp',latency)
+      reachable.append(host)
+   logger.info('Teste de alcance: %d de %d NEs acessíveis em %.2fs' %(len(reachable), len(hosts), time.time()-started))
+   return reachable
+
+
+def run_command(ssh, host, command, type_cmd, timeout, history=None):
+   '''
+      run_command - função para executar um comando no NE e registrar a sua duração
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @returns output - saída do comando
+   '''
+   started = time.time()
+   if type_cmd:
+      output = ssh.run_cmd(command,timeout=timeout)
+   else:
+      output = ssh.run_cmd(command,indata=command,timeout=timeout)
+   if history is not None:
+      # Um comando que estourou o timeout entra com o próprio timeout, que assim cresce pela margem
+      history.add(host,'command',time.time()-started)
+   return output
+
+
+def open_session(Config, host, USER, PASS, keyfilename, timeout, sessions=None, history=None):
+   '''
+      open_session - função para abrir (ou reaproveitar) a conexão SSH com o NE
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @param sessions - dicionário seção -> MySSH das conexões mantidas abertas (modo residente)
+        @param history  - LatencyHistory (opcional) para registrar a duração da conexão
+        @returns ssh - objeto MySSH conectado ou None
+   '''
+   logger = logging.getLogger('root')
+   if sessions is not None and host in sessions:
+      ssh = sessions[host]
+      if ssh.transport is not None and ssh.transport.is_active():
+         logger.debug('Reaproveitando conexão com o NE %s' %(host))
+         return ssh
+      ssh.closeCon()
+      del sessions[host]
+
+   started = time.time()
+   ssh = MySSH()
+   ssh.connect(hostname=ConfigSectionMap(Config,host)["address"],
+               username=USER,
+               password=PASS,
+               port=int(ConfigSectionMap(Config,host)["port"]),
+               keyfilename=keyfilename,
+               timeout=timeout)
+   if ssh.connected() is False:
+      return None
+   if history is not None:
+      history.add(host,'connect',time.time()-started)
+   if sessions is not None:
+      # Keepalive para a conexão ociosa entre os ciclos não ser derrubada por firewalls
+      ssh.transport.set_keepalive(60)
+      sessions[host] = ssh
+   return ssh
+
+
+def open_catalog(path):
+   '''
+      open_catalog - função para abrir o catálogo de backups
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @param path - arquivo do catálogo
+        @returns BackupCatalog ou None se o catálogo não pode ser aberto (sem permissão de escrita,
+                 por exemplo); sem ele, os NEs são copiados como antes do catálogo
+   '''
+   logger = logging.getLogger('root')
+   try:
+      return BackupCatalog(path)
+   except (sqlite3.Error, OSError, IOError), e:
+      logger.error('Catálogo %s indisponível (%s): backups sem sondagem incremental e com retenção pela data dos arquivos' %(path, e))
+      return None
+
+
+def backup_host(Config, host, catalog, sessions=None, history=None):
+   '''
+      backup_host - função para fazer o backup de configuração de um NE
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @param Config   - objeto ConfigParser com os NEs
+        @param host     - seção do NE
+        @param catalog  - catálogo de backups (None: sem sondagem e com a retenção antiga, por data)
+        @param sessions - conexões mantidas abertas (modo residente); None fecha a conexão ao final
+        @param history  - LatencyHistory (opcional) para timeouts adaptativos
+        @returns (ok, msg) - sucesso e mensagem (arquivo gravado ou erro)
+   '''
+   logger = logging.getLogger('root')
+   logger.info('=' * 64)
+   logger.info('Backup do NE %s' %(host))
+   print
+   print '=' * 64
+   print "Backup do NE: " + host
+
+   '''
+     Verifica se o usuário é fornecido.
+       - Se for fornecido, adota o usuário na conexão com chave pública.
+       - Se não for fornecido, solicita as credenciais de usuário/senha.
+   '''
+   if not Config.has_option(host,'user'):
+      if sessions is not None:
+         logger.error('NE %s sem usuário configurado: credenciais manuais não são possíveis no modo residente' %(host))
+         return False, 'usuário não configurado'
+      (USER,PASS) = getcred()
+      keyfilename = None
+      logger.debug('Autenticacao com NE via credenciais manuais - Usuário: %s' %(USER))
+   else:
+      USER = ConfigSectionMap(Config,host)["user"]
+      keyfilename = ConfigSectionMap(Config,host)["keyfilename"]
+      PASS = None
+      logger.debug('Autenticacao com NE via arquivo de chave pública - Arquivo: %s' %(keyfilename))
+
+   '''
+     Verifica o tipo de NE:
+       - Tipo 0: NE que precisa que o comando seja enviado como entrada (ver detalhamento na classe MySSH).
+       - Tipo 1: NE que o comando é executado normalmente.
+   '''
+   if not Config.has_option(host,'type_cmd'):
+      type_cmd=1
+   else:
+      type_cmd=int(ConfigSectionMap(Config,host)["type_cmd"])
+   logger.debug('NE com comando tipo %d ' %(type_cmd))
+
+   '''
+     Verifica o timeout do NE. Se não tiver tal parâmetro na seção do host, adota-se o padrão de 10 segs.
+   '''
+   if not Config.has_option(host,'timeout'):
+      timeout=10
+   else:
+      timeout=int(ConfigSectionMap(Config,host)["timeout"])
+   logger.debug('Timeout configurado para conexão %d ' %(timeout))
+
+   # Timeouts adaptativos: max(timeout configurado, p99 das latências observadas x margem)
+   if history is not None:
+      connect_timeout = history.timeout(host,'connect',timeout)
+      command_timeout = history.timeout(host,'command',timeout)
+      logger.debug('Timeouts ajustados pelo histórico - conexão: %.1fs, comando: %.1fs' %(connect_timeout, command_timeout))
+   else:
+      connect_timeout = command_timeout = timeout
+
+   '''
+     Verifica o comando de sondagem (probe_command), opcional. Ele deve retornar um marcador curto
+     que muda quando a configuração muda (commit, data da última alteração, checksum). Se o marcador
+     for igual ao do último backup, a configuração completa não é transferida.
+   '''
+   if Config.has_option(host,'probe_command') and catalog is not None:
+      probe_command = ConfigSectionMap(Config,host)["probe_command"]
+   else:
+      probe_command = None
+   # Mesmo sem alteração, a configuração completa é transferida a cada probe_max_days dias
+   if not Config.has_option(host,'probe_max_days'):
+      probe_max_days = PROBE_MAX_DAYS
+   else:
+      probe_max_days = float(ConfigSectionMap(Config,host)["probe_max_days"])
+
+   # Cria a conexão SSH (ou reaproveita a do ciclo anterior, no modo residente)
+   started = time.time()
+   command = ConfigSectionMap(Config,host)["command"]
+   output = None
+   marker = None
+   unchanged = None
+   for attempt in (1, 2):
+      try:
+         ssh = open_session(Config, host, USER, PASS, keyfilename, connect_timeout, sessions, history)
+         if ssh is None:
+             logger.error('ERROR: conexão não foi aberta.')
+             return False, 'conexão não foi aberta'
+      except Exception, e:
+         logger.error('Erro na conexão.', exc_info=True)
+         return False, 'erro na conexão: %s' %(e)
+
+      # Executa a sondagem e, se a configuração mudou, o comando para coletar a configuração do NE.
+      try:
+         if probe_command:
+            marker = probe_marker(ssh, host, probe_command, type_cmd, command_timeout)
+            last = catalog.latest_good('ne',host) if marker else None
+            if last and last['marker'] == marker and os.path.isfile(last['path']):
+               if time.time() - last['created'] < probe_max_days * 86400:
+                  unchanged = last
+                  break
+               logger.info('Configuração do NE %s sem transferência completa há %g dias' %(host, probe_max_days))
+         output = run_command(ssh, host, command, type_cmd, command_timeout, history)
+         break
+      except Exception, e:
+         # Uma conexão mantida aberta pode ter sido encerrada pelo NE: descarta e tenta de novo
+         if sessions is not None and host in sessions and attempt == 1:
+            logger.info('Conexão com o NE %s expirou, reconectando' %(host))
+            sessions.pop(host).closeCon()
+            continue
+         logger.error('Erro na execução do comando.', exc_info=True)
+         return False, 'erro na execução do comando: %s' %(e)
+      finally:
+         if sessions is None:
+            try:
+               ssh.closeCon()
+            except: pass
+
+   # Configuração inalterada: registra apenas a conferência (o último arquivo continua válido)
+   if unchanged is not None:
+      catalog.record_check(unchanged['id'])
+      name, path = str(unchanged['name']), str(unchanged['path'])
+      logger.info('Configuração do NE %s inalterada desde %s (marcador %s)' %(host, name, marker[:12]))
+      logger.info('=' * 64)
+      print 'Configuração inalterada desde ' + name
+      print '=' * 64
+      return True, 'inalterado desde %s (%.2fs)' %(path, time.time()-started)
+
+   # Saída incompleta (timeout) ou de erro: não substitui o último backup válido
+   if command_failed(output):
+      logger.error('Configuração do NE %s incompleta, não gravada: %s' %(host, output.strip().splitlines()[-1]))
+      return False, 'saída incompleta: %s' %(output.strip().splitlines()[-1])
+
+   # Verifica se o diretório existe. Caso não exista, cria o diretório.
+   logger.debug('Verificando diretório para armazenamento de configuração')
+   directory = ConfigSectionMap(Config,host)["dir_backup"] + '/' + host.lower()
+   make_sure_path_exists(directory)
+
+   # Na primeira execução com o catálogo, registra os arquivos já existentes do NE
+   if catalog is not None and not catalog.has('ne',host):
+      catalog.adopt('ne',host,directory,host.lower() + '_','.cnf')
+
+   # Salva configuração em arquivo
+   logger.debug('Salvando arquivo de configuração')
+   curtime = str(time.localtime()[0])+'-'+str(time.localtime()[1])+'-'+str(time.localtime()[2])+'-'+str(time.localtime()[3])+'h'+str(time.localtime()[4])+'m'
+   filename = directory + '/' + host.lower() + '_' + curtime + '.cnf'
+   write_file(filename,output)
+   logger.debug('Apagando arquivo de configuração superiores a %d dias' %(int(ConfigSectionMap(Config,host)["retention_day"])))
+   if catalog is not None:
+      digest = hashlib.sha256(output).hexdigest()
+      catalog.record('ne',host,os.path.basename(filename)[:-4],filename,store='file',stored_bytes=len(output),
+                     sha256=digest,artifact_sha256=digest,duration=time.time()-started,marker=marker)
+
+      # Apaga arquivos antigos (escolhidos pelo catálogo, sem varrer o diretório)
+      removed = catalog.prune('ne',host,max_age_days=int(ConfigSectionMap(Config,host)["retention_day"]))
+      logger.debug('%d arquivos apagados' %(len(removed)))
+   else:
+      delete_old_files(ConfigSectionMap(Config,host)["dir_backup"],int(ConfigSectionMap(Config,host)["retention_day"]))
+
+   logger.info('Execução de Backup do NE %s bem-sucedido' %(host))
+   logger.info('=' * 64)
+   print '=' * 64
+   return True, '%s (%d bytes em %.2fs)' %(filename, len(output), time.time()-started)
+
+
+def run_daemon(options, catalog):
+   '''
+      run_daemon - função para manter o backup residente, com agendamento por NE
+        Versão: 1.0
+        Adicionado em: 19/10/2026 (Diogenes)
+
+        @param options - opções de linha de comando
+        @param catalog - catálogo de backups (ou None)
+   '''
+   logger = logging.getLogger('root')
+   state = {'Config': read_config(options.configfile)}
+   sessions = {}
+   history = LatencyHistory(options.latency)
+
+   def backup(host):
+      # Sem conexão aberta, testa o alcance antes de pagar o timeout do SSH
+      if host not in sessions and not prescan(state['Config'], [host], history):
+         return False, 'NE inacessível'
+      try:
+         return backup_host(state['Config'], host, catalog, sessions, history)
+      finally:
+         history.save()
+
+   daemon = BackupDaemon(backup, options.socket)
+
+   def schedule_all():
+      Config = state['Config']
+      for host in list(daemon.intervals):
+         if not Config.has_section(host):
+            daemon.unschedule(host)
+            if host in sessions:
+               sessions.pop(host).closeCon()
+      for host in Config.sections():
+         if Config.has_option(host,'interval_min'):
+            interval = int(ConfigSectionMap(Config,host)["interval_min"])
+         else:
+            interval = 1440
+         if daemon.intervals.get(host) == interval * 60:
+            continue   # agendamento mantido na releitura do INI
+         last = catalog.latest_good('ne',host) if catalog is not None else None
+         daemon.schedule(host, interval * 60, max(last['created'], last['checked']) if last else None)
+         logger.info('NE %s agendado a cada %d minutos' %(host, interval))
+
+   def reload_config(signum, frame):
+      logger.info('SIGHUP recebido, relendo %s' %(options.configfile))
+      state['Config'] = read_config(options.configfile)
+      schedule_all()
+
+   def terminate(signum, frame):
+      logger.info('Sinal %d recebido, finalizando' %(signum))
+      daemon.stop()
+
+   schedule_all()
+   signal.signal(signal.SIGHUP, reload_config)
+   signal.signal(signal.SIGTERM, terminate)
+   signal.signal(signal.SIGINT, terminate)
+   try:
+      daemon.serve_forever()
+   finally:
+      for ssh in sessions.values():
+         ssh.closeCon()
+
 
 def main(argv):
-   
+
    # Inicializa logging
-   logpath = os.path.dirname(os.path.abspath(__file__)) + '/logs'
+   logpath = basepath + '/logs'
    make_sure_path_exists(logpath)
    logger = log.setup_custom_logger('root',logpath + '/backupNE.log','info')
 
-   logger.info('#' * 64)
-   logger.info('Inicializando Backup!')
-   logger.info('#' * 64)
-
    # Leitura dos parâmetros de entrada
    logger.debug('Lendo parâmetros de entrada.')
    try:    # Coleta e verifica os parâmetros passados por linha de comando
-      parser = OptionParser(usage='usage: %prog [options] arguments',version='%prog 1.0')
+      parser = OptionParser(usage='usage: %prog [options] arguments',version='%prog 1.4')
       parser.add_option("-c", "--cfile",  dest="configfile" , help="define o arquivo de configuracao")
+      parser.add_option("-d", "--catalog",  dest="catalog" , default=DEFAULT_CATALOG, help="define o arquivo do catalogo de backups (padrao: %s)" %(DEFAULT_CATALOG))
+      parser.add_option("-D", "--daemon",  dest="daemon" , action="store_true", default=False, help="executa em modo residente, com agendamento por NE (interval_min)")
+      parser.add_option("-S", "--socket",  dest="socket" , default=DEFAULT_SOCKET, help="socket Unix do modo residente (padrao: %s)" %(DEFAULT_SOCKET))
+      parser.add_option("-n", "--now",  dest="now" , help="pede ao daemon o backup imediato do NE (ou 'status')")
+      parser.add_option("-L", "--latency",  dest="latency" , default=DEFAULT_LATENCY, help="historico de latencias dos NEs (padrao: %s)" %(DEFAULT_LATENCY))
+      parser.add_option("-s", "--shard-dir",  dest="shard_dir" , help="diretorio de coordenacao da execucao distribuida entre instancias")
+      parser.add_option("-i", "--instance",  dest="instance" , help="identificador da instancia (padrao: <hostname>:<pid>)")
+      parser.add_option("--shard-ttl",  dest="shard_ttl" , type="int", default=30, help="segundos sem heartbeat para uma instancia ser considerada fora (padrao: 30)")
+      parser.add_option("--shard-window",  dest="shard_window" , type="float", help="horas em que um NE ja tentado por outra instancia nao e repetido (padrao: desde o inicio da execucao atual)")
+      parser.add_option("--shard-settle",  dest="shard_settle" , type="float", default=5, help="segundos aguardando as demais instancias do mesmo agendamento (padrao: 5)")
       (options, args) = parser.parse_args()
 
+      if options.now:   # cliente do modo residente: não lê o INI nem abre conexões
+         try:
+            reply = request_backup(options.socket, options.now)
+         except Exception, e:
+            print 'ERRO: daemon indisponível em %s: %s' %(options.socket, e)
+            sys.exit(1)
+         print reply
+         sys.exit(1 if reply.startswith('ERRO') else 0)
+
       if not options.configfile:   # se não for passado o parâmetro de arquivo de configuração
          logger.error('Arquivo de configuração não definido!')
          parser.error('Arquivo de configuracao nao definido!')
@@ -48,114 +455,49 @@ def main(argv):
       sys.exit(2)
    logger.debug('Parâmetros de entrada lidos.')
 
-   # Leitura do arquivo de configuração
-   logger.debug('Lendo arquivo de configuração.')
-   configpath = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)) + '/config'
-   Config = ConfigParser.ConfigParser()
-   Config.read(configpath + '/' + options.configfile)
-   logger.debug('Arquivo de configuração lido.')
+   logger.info('#' * 64)
+   logger.info('Inicializando Backup!')
+   logger.info('#' * 64)
+
+   # Catálogo de backups (o mesmo das VMs se -d apontar para ele e o usuário puder gravá-lo)
+   catalog = open_catalog(options.catalog)
+
+   if options.daemon:
+      run_daemon(options, catalog)
+   else:
+      Config = read_config(options.configfile)
+      history = LatencyHistory(options.latency)
+
+      # Teste de alcance de todos os NEs em paralelo, antes de qualquer conexão SSH
+      reachable = prescan(Config, Config.sections(), history)
 
-   # Loop para execução de backup
-   for host in Config.sections():
-       logger.info('=' * 64)
-       logger.info('Backup do NE %s' %(host))
-       print
-       print '=' * 64
-       print "Backup do NE: " + host
-
-       ''' 
-         Verifica se o usuário é fornecido. 
-	   - Se for fornecido, adota o usuário na conexão com chave pública.
-           - Se não for fornecido, solicita as credenciais de usuário/senha.
-       '''
-       if not Config.has_option(host,'user'):
-          (USER,PASS) = getcred()
-          keyfilename = None
-          logger.debug('Autenticacao com NE via credenciais manuais - Usuário: %s' %(USER))
-       else:
-          USER = ConfigSectionMap(Config,host)["user"]
-          keyfilename = ConfigSectionMap(Config,host)["keyfilename"]
-          PASS = None
-          logger.debug('Autenticacao com NE via arquivo de chave pública - Arquivo: %s' %(keyfilename))
-
-       ''' 
-         Verifica o tipo de NE:
-           - Tipo 0: NE que precisa que o comando seja enviado como entrada (ver detalhamento na classe MySSH).
-           - Tipo 1: NE que o comando é executado normalmente.
-       '''
-       if not Config.has_option(host,'type_cmd'):
-          type_cmd=1
-       else:
-          type_cmd=int(ConfigSectionMap(Config,host)["type_cmd"])
-       logger.debug('NE com comando tipo %d ' %(type_cmd))
-
-       ''' 
-         Verifica o timeout do NE. Se não tiver tal parâmetro na seção do host, adota-se o padrão de 10 segs.
-       '''
-       if not Config.has_option(host,'timeout'):
-          timeout=10
-       else:
-          timeout=int(ConfigSectionMap(Config,host)["timeout"])
-       logger.debug('Timeout configurado para conexão %d ' %(timeout))
-
-       # Cria a conexão SSH
-       try:
-          ssh = MySSH()
-          ssh.connect(hostname=ConfigSectionMap(Config,host)["address"],
-                      username=USER,
-                      password=PASS,
-                      port=int(ConfigSectionMap(Config,host)["port"]),
-                      keyfilename=keyfilename,
-                      timeout=timeout)
-          if ssh.connected() is False:
-              logger.error('ERROR: conexão não foi aberta.')
-              continue
-       except Exception, e:
-          logger.error('Erro na conexão.', exc_info=True)
-          continue
-
-       # Executa o comando para coletar a configuração do NE.
-       try:
-          if type_cmd:
-             output = ssh.run_cmd(ConfigSectionMap(Config,host)["command"],timeout=timeout)
-          else:
-             output = ssh.run_cmd(ConfigSectionMap(Config,host)["command"],indata=ConfigSectionMap(Config,host)["command"],timeout=timeout)
-       except Exception, e:
-          logger.error('Erro na execução do comando.', exc_info=True)
-          continue
-       finally:
-          try:
-             ssh.closeCon()
-          except: pass
-
-       # Verifica se o diretório existe. Caso não exista, cria o diretório.
-       logger.debug('Verificando diretório para armazenamento de configuração')
-       directory = ConfigSectionMap(Config,host)["dir_backup"] + '/' + host.lower()
-       make_sure_path_exists(directory)
-
-       # Salva configuração em arquivo
-       logger.debug('Salvando arquivo de configuração')
-       curtime = str(time.localtime()[0])+'-'+str(time.localtime()[1])+'-'+str(time.localtime()[2])+'-'+str(time.localtime()[3])+'h'+str(time.localtime()[4])+'m'
-       filename = directory + '/' + host.lower() + '_' + curtime + '.cnf'
-       write_file(filename,output)
-       
-       # Apaga arquivos antigos
-       logger.debug('Apagando arquivo de configuração superiores a %d dias' %(int(ConfigSectionMap(Config,host)["retention_day"])))
-       delete_old_files(ConfigSectionMap(Config,host)["dir_backup"],int(ConfigSectionMap(Config,host)["retention_day"]))
-         
-       logger.info('Execução de Backup do NE %s bem-sucedido' %(host))
-       logger.info('=' * 64)
-       print '=' * 64
+      if options.shard_dir:   # execução distribuída: só as seções desta instância no anel
+         window = options.shard_window * 3600 if options.shard_window else None
+         shard = ShardCoordinator(options.shard_dir, options.instance, options.shard_ttl, window)
+         shard.join(settle=options.shard_settle)
+         try:
+            done, pending = shard.run(Config.sections(),
+                                      lambda host: host in reachable and backup_host(Config, host, catalog, history=history)[0])
+         finally:
+            shard.leave()
+         logger.info('%d NEs copiados por esta instância, %d pendentes' %(len(done), len(pending)))
+      else:
+         # Loop para execução de backup
+         for host in Config.sections():
+            if host in reachable:
+               backup_host(Config, host, catalog, history=history)
+      history.save()
+
+   if catalog is not None:
+      catalog.close()
 
    logger.info('#' * 64)
    logger.info('Fim de execução do script de Backup!')
    logger.info('#' * 64)
-    
+
 
 
 if __name__ == "__main__":
    main(sys.argv[1:])
 
 sys.exit(0)
-
-
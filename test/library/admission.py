@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe decide, antes de qualquer VM ser desligada, quais backups do lote
+cabem no disco de destino (sucessor do check_disk_space do vm_backup_utils.sh).
+
+O espaço de cada VM é previsto em bytes exatos: tamanho da imagem multiplicado
+pela taxa de compressão dos backups anteriores registrada no catálogo (sem
+histórico, os dados alocados da imagem), mais uma margem. A reserva é feita para o
+lote inteiro, por sistema de arquivos de destino, de forma que VMs processadas em
+sequência ou em paralelo não esgotem o disco no meio da execução. Se o espaço não
+basta, os backups expirados das VMs do lote são removidos antecipadamente.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import collections
+import logging
+import os
+
+MB = 1024 ** 2
+
+
+def free_bytes(path):
+    '''
+    free_bytes - função para obter o espaço livre do sistema de arquivos de um caminho
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param path - caminho (se ainda não existir, usa o diretório pai existente mais próximo)
+      @returns (dispositivo, bytes livres para usuários comuns)
+    '''
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    st = os.statvfs(path)
+    return os.stat(path).st_dev, st.f_bavail * st.f_frsize
+
+
+# ================================================================
+# class AdmissionController
+# ================================================================
+class AdmissionController:
+    '''
+    Reserva de espaço em disco para um lote de backups de VMs.
+    Uso típico:
+
+        admission = AdmissionController(min_free=1 * GB, margin=0.1)
+        for r in admission.admit(jobs):
+            if r['admitted']:
+                r['job'].run(slots, r)
+    '''
+    def __init__(self, min_free=0, margin=0.1):
+        '''
+        @param min_free  - bytes que devem continuar livres após todos os backups.
+        @param margin    - fração somada à previsão de cada VM (0.1 = 10%).
+        '''
+        self.min_free = min_free
+        self.margin = margin
+
+        # Conecta o logger ao módulo raiz (script que chama a classe)
+        self.logger = logging.getLogger('root')
+        # Define métodos para chamada do logger
+        self.info = self.logger.info
+        self.debug = self.logger.debug
+        self.error = self.logger.error
+
+    def estimate(self, job):
+        '''
+        Prevê os bytes que o backup da VM vai gravar.
+
+        @param job  - VMBackup da VM.
+        @returns dicionário com job, target, bytes, image_bytes, ratio e history.
+        '''
+        st = os.stat(job.vm.vm_file)
+        store = 'chunks' if job.store is not None else 'gzip'
+        ratio, history = job.catalog.compression_ratio('vm', job.vm.name, store)
+        if ratio is None:
+            # Sem histórico: no pior caso os dados alocados da imagem não comprimem
+            base = min(st.st_size, st.st_blocks * 512)
+        else:
+            base = int(st.st_size * ratio)
+        return {
+            'job': job,
+            'target': job.store.root if job.store is not None else job.vm.backup_dir,
+            'bytes': int(base * (1 + self.margin)),
+            'image_bytes': st.st_size,
+            'ratio': ratio,
+            'history': history,
+            'admitted': False,
+            'available': 0,
+        }
+
+    def admit(self, jobs):
+        '''
+        Reserva espaço para o lote, na ordem dos jobs, por sistema de arquivos de destino.
+
+        @param jobs  - lista de VMBackup já configurados (setup e adopt_legacy).
+        @returns lista de reservas (ver estimate) com admitted e available preenchidos.
+        '''
+        reservations = [self.estimate(job) for job in jobs]
+        devices = collections.OrderedDict()
+        for r in reservations:
+            devices.setdefault(free_bytes(r['target'])[0], []).append(r)
+
+        for group in devices.values():
+            target = group[0]['target']
+            needed = sum(r['bytes'] for r in group) + self.min_free
+            available = free_bytes(target)[1]
+            # 1º: backups além da retenção; 2º: os que este lote vai expirar ao final
+            for extra in (0, 1):
+                if available >= needed:
+                    break
+                for r in group:
+                    keep = r['job'].btype.retention_count - extra
+                    if keep >= 1:
+                        r['job'].log('Espaço livre em %s (%d MB) menor que o previsto para o lote (%d MB), '
+                                     'removendo backups expirados antecipadamente'
+                                     % (target, available / MB, needed / MB))
+                        r['job'].retention(keep)
+                available = free_bytes(target)[1]
+
+            budget = available - self.min_free
+            for r in group:
+                r['available'] = budget
+                if r['bytes'] <= budget:
+                    r['admitted'] = True
+                    budget -= r['bytes']
+            self.debug('Reserva em %s: %d de %d bytes' % (target, available - self.min_free - budget, available))
+        return reservations
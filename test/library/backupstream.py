@@ -0,0 +1,478 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  backupstream.py - biblioteca de cópia, compactação e checksum em passagem única.
+
+  A imagem de origem é lida uma única vez: cada bloco lido é somado ao SHA-256 da
+  imagem, compactado em formato gzip (em paralelo, um membro gzip por bloco) e
+  gravado direto no arquivo de backup, cujo SHA-256 também é calculado durante a
+  escrita. Os checksums e tamanhos ficam num manifesto ao lado do artefato
+  (<artefato>.manifest).
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import collections
+import errno
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+from multiprocessing.pool import ThreadPool
+
+# Conecta o logger ao módulo raiz (script que chama a classe)
+logger = logging.getLogger('root')
+
+BLOCK_SIZE = 4 * 1024 * 1024
+# Valores do Linux, usados quando o Python não exporta os.SEEK_DATA/os.SEEK_HOLE
+SEEK_DATA = getattr(os, 'SEEK_DATA', 3)
+SEEK_HOLE = getattr(os, 'SEEK_HOLE', 4)
+_ZEROS = {}
+MANIFEST_SUFFIX = '.manifest'
+
+
+def compress_block(data, level=6):
+    '''
+    compress_block - função para compactar um bloco como um membro gzip independente
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      A concatenação de membros gzip é um arquivo gzip válido (RFC 1952), lido
+      normalmente pelo gunzip/zcat. Como o zlib libera o GIL, vários blocos são
+      compactados em paralelo por threads.
+
+      @param data  - bloco de dados
+      @param level - nível de compressão
+      @returns - bloco compactado em formato gzip
+    '''
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def data_extents(fd, size):
+    '''
+    data_extents - função para listar as regiões alocadas de um arquivo esparso
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      Usa lseek com SEEK_DATA/SEEK_HOLE. Se o sistema de arquivos não suportar,
+      considera o restante do arquivo inteiro como dados.
+
+      @param fd   - descritor do arquivo aberto com os.open
+      @param size - tamanho aparente do arquivo
+      @returns - gerador de tuplas (início, fim) das regiões com dados
+    '''
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, SEEK_DATA)
+            end = os.lseek(fd, start, SEEK_HOLE)
+        except OSError as e:
+            if e.errno == errno.ENXIO:      # não há mais dados após offset
+                return
+            yield offset, size              # SEEK_DATA não suportado
+            return
+        yield start, min(end, size)
+        offset = end
+
+
+# ================================================================
+# class ImageReader
+# ================================================================
+class ImageReader:
+    '''
+    Lê uma imagem em blocos de tamanho fixo, sem ler as regiões não alocadas.
+    Uso típico:
+
+        reader = ImageReader('/var/lib/libvirt/images/vm.qcow2')
+        for offset, length, data in reader.blocks():
+            # data é None para blocos não alocados ou somente com zeros
+            ...
+        reader.close()
+    '''
+    def __init__(self, source, blocksize=BLOCK_SIZE):
+        self.source = source
+        self.blocksize = blocksize
+        self.fd = os.open(source, os.O_RDONLY)
+        self.size = os.fstat(self.fd).st_size
+        self.read_bytes = 0
+        self.zero_blocks = 0
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def blocks(self):
+        '''
+        @returns - gerador de tuplas (offset, tamanho, dados ou None)
+        '''
+        extents = data_extents(self.fd, self.size)
+        extent = next(extents, None)
+        for offset in range(0, self.size, self.blocksize):
+            length = min(self.blocksize, self.size - offset)
+            while extent is not None and extent[1] <= offset:
+                extent = next(extents, None)
+            data = None
+            if extent is not None and extent[0] < offset + length:
+                data = self._read_at(offset, length)
+                self.read_bytes += length
+                if data == zeros(length):
+                    data = None
+            if data is None:
+                self.zero_blocks += 1
+            yield offset, length, data
+
+    def _read_at(self, offset, length):
+        os.lseek(self.fd, offset, os.SEEK_SET)
+        chunks = []
+        missing = length
+        while missing > 0:
+            data = os.read(self.fd, missing)
+            if not data:
+                raise IOError('Leitura incompleta de %s no offset %d' % (self.source, offset))
+            chunks.append(data)
+            missing -= len(data)
+        return b''.join(chunks)
+
+
+class ReadyResult:
+    '''
+    Resultado já disponível, com a mesma interface do AsyncResult do pool.
+    '''
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def stream_backup(source, target, level=6, blocksize=BLOCK_SIZE, workers=1, governor=None):
+    '''
+    stream_backup - função para copiar e compactar uma imagem em uma única leitura
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      A imagem é dividida em blocos de tamanho fixo; cada bloco vira um membro gzip
+      compactado por um pool de threads. A ordem de escrita é preservada e no máximo
+      2 x workers blocos ficam em memória. O tamanho compactado de cada bloco fica
+      no manifesto ('members'), permitindo descompactação paralela na restauração.
+
+      Blocos em regiões não alocadas (SEEK_HOLE) não são lidos, e blocos lidos que
+      contêm apenas zeros não são compactados: ambos recebem um membro gzip de zeros
+      pré-calculado. O artefato continua sendo um gzip comum da imagem completa.
+
+      @param source    - arquivo de origem (imagem da VM)
+      @param target    - arquivo .gz de destino
+      @param level     - nível de compressão gzip (padrão: 6, igual ao gzip)
+      @param blocksize - tamanho do bloco de leitura e de cada membro gzip em bytes
+      @param workers   - número de threads de compressão
+      @param governor  - IOGovernor que limita leitura, escrita e blocos em voo (opcional)
+      @returns manifest - dicionário com tamanhos e checksums gravado em <target>.manifest
+    '''
+    started = time.time()
+    partfile = target + '.part'
+    source_hash = hashlib.sha256()
+    artifact_hash = hashlib.sha256()
+    zero_members = {}
+    members = []
+    pending = collections.deque()
+    pool = ThreadPool(max(1, workers))
+
+    def write_next(outfile):
+        out = pending.popleft().get()
+        artifact_hash.update(out)
+        members.append(len(out))
+        if governor is not None:
+            governor.write(outfile, out)
+        else:
+            outfile.write(out)
+
+    reader = ImageReader(source, blocksize)
+    try:
+        with open(partfile, 'wb') as outfile:
+            for offset, length, data in reader.blocks():
+                if data is None:
+                    source_hash.update(zeros(length))
+                    if length not in zero_members:
+                        zero_members[length] = compress_block(zeros(length), level)
+                    pending.append(ReadyResult(zero_members[length]))
+                else:
+                    if governor is not None:
+                        governor.read(length)
+                    source_hash.update(data)
+                    pending.append(pool.apply_async(compress_block, (data, level)))
+                while len(pending) >= (governor.window() if governor is not None else 2 * max(1, workers)):
+                    write_next(outfile)
+            while pending:
+                write_next(outfile)
+            if not members:
+                # Imagem vazia: grava um membro gzip vazio para manter o arquivo válido
+                pending.append(ReadyResult(compress_block(b'', level)))
+                write_next(outfile)
+            if governor is not None:
+                governor.flush(outfile)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+    except Exception:
+        if os.path.exists(partfile):
+            os.remove(partfile)
+        raise
+    finally:
+        reader.close()
+        pool.close()
+        pool.join()
+    os.rename(partfile, target)
+
+    manifest = {
+        'source': source,
+        'artifact': os.path.basename(target),
+        'format': 'gzip',
+        'block_size': blocksize,
+        'members': members,
+        'source_bytes': reader.size,
+        'source_sha256': source_hash.hexdigest(),
+        'read_bytes': reader.read_bytes,
+        'zero_blocks': reader.zero_blocks,
+        'artifact_bytes': sum(members),
+        'artifact_sha256': artifact_hash.hexdigest(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'duration': round(time.time() - started, 3),
+        'workers': workers,
+    }
+    if governor is not None:
+        manifest['io'] = governor.stats()
+    write_manifest(target, manifest)
+    logger.debug('Backup %s gravado: %d bytes lidos de %d -> %d bytes'
+                 % (target, reader.read_bytes, reader.size, manifest['artifact_bytes']))
+    return manifest
+
+
+def restore_stream(artifact, target, manifest=None, blocksize=BLOCK_SIZE, workers=1):
+    '''
+    restore_stream - função para descompactar um artefato recriando a imagem esparsa
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      Blocos que contêm apenas zeros não são escritos (o offset é apenas avançado),
+      e o tamanho final é ajustado com truncate, deixando buracos no arquivo. Com o
+      manifesto, os membros gzip são descompactados em paralelo por workers threads
+      e os membros de zeros gravados pelo backup nem chegam a ser descompactados.
+
+      @param artifact  - arquivo .gz do backup
+      @param target    - arquivo da imagem a ser criado
+      @param manifest  - manifesto do artefato (lido de <artifact>.manifest se omitido)
+      @param blocksize - tamanho dos blocos escritos quando não há manifesto
+      @param workers   - número de threads de descompactação
+      @returns (sha256, bytes) - checksum e tamanho da imagem restaurada
+    '''
+    manifest = manifest or read_manifest(artifact)
+    restored = hashlib.sha256()
+    total = 0
+    pool = ThreadPool(max(1, workers))
+    try:
+        with open(artifact, 'rb') as infile:
+            if manifest and manifest.get('members'):
+                zero_members = {}
+                size = manifest['source_bytes']
+
+                def members():
+                    offset = 0
+                    for n in manifest['members']:
+                        data = infile.read(n)
+                        length = min(manifest['block_size'], size - offset)
+                        offset += length
+                        # Membros de zeros gravados pelo backup são reconhecidos sem descompactar
+                        if length not in zero_members:
+                            zero_members[length] = compress_block(zeros(length))
+                        if data == zero_members[length]:
+                            yield ReadyResult(zeros(length))
+                        else:
+                            yield pool.apply_async(decompress_member, (data,))
+
+                blocks = ordered(members(), 2 * max(1, workers))
+            else:
+                gz = gzip.GzipFile(fileobj=infile, mode='rb')
+                blocks = iter(lambda: gz.read(blocksize), b'')
+            with open(target, 'wb') as outfile:
+                for data in blocks:
+                    restored.update(data)
+                    if data == zeros(len(data)):
+                        outfile.seek(len(data), os.SEEK_CUR)
+                    else:
+                        outfile.write(data)
+                    total += len(data)
+                outfile.truncate(total)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+    finally:
+        pool.close()
+        pool.join()
+    return restored.hexdigest(), total
+
+
+def decompress_member(data):
+    return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+def ordered(results, window):
+    '''
+    ordered - função para consumir resultados do pool na ordem, com limite de memória
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param results - iterador de AsyncResult/ReadyResult (submetidos sob demanda)
+      @param window  - máximo de resultados em voo
+      @returns - gerador com os valores na ordem de submissão
+    '''
+    pending = collections.deque()
+    for result in results:
+        pending.append(result)
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def zeros(length):
+    '''
+    Retorna um bloco de zeros do tamanho pedido (mantido em cache).
+    '''
+    if length not in _ZEROS:
+        _ZEROS[length] = bytes(bytearray(length))
+    return _ZEROS[length]
+
+
+def write_manifest(artifact, manifest):
+    '''
+    write_manifest - função para gravar o manifesto de um artefato de backup
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param artifact - caminho do artefato de backup
+      @param manifest - dicionário com os dados do artefato
+    '''
+    path = artifact + MANIFEST_SUFFIX
+    with open(path + '.part', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.rename(path + '.part', path)
+
+
+def read_manifest(artifact):
+    '''
+    read_manifest - função para ler o manifesto de um artefato de backup
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param artifact - caminho do artefato de backup
+      @returns manifest - dicionário com os dados do artefato ou None se não existir
+    '''
+    path = artifact + MANIFEST_SUFFIX
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def file_sha256(path, blocksize=BLOCK_SIZE):
+    '''
+    file_sha256 - função para calcular o SHA-256 de um arquivo
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param path - caminho do arquivo
+      @returns (hexdigest, bytes) - checksum e tamanho lido
+    '''
+    h = hashlib.sha256()
+    size = 0
+    with open(path, 'rb', 0) as f:
+        while True:
+            data = f.read(blocksize)
+            if not data:
+                break
+            h.update(data)
+            size += len(data)
+    return h.hexdigest(), size
+
+
+def verify_artifact(artifact, manifest=None, workers=1):
+    '''
+    verify_artifact - função para verificar um artefato contra os checksums do manifesto
+      Versão: 1.1
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      Relê o arquivo compactado (não a imagem de origem) uma única vez: confere o
+      SHA-256 e o tamanho do .gz com os valores calculados durante a escrita e
+      descompacta cada membro gzip (em paralelo, por workers threads), conferindo o
+      SHA-256 e o tamanho da imagem descompactada com os da origem. Assim como o
+      gzip -t, detecta membros que não descompactam, e também um compressor que
+      gerou dados diferentes da imagem lida.
+
+      @param artifact - caminho do artefato de backup
+      @param manifest - manifesto do artefato (lido de <artifact>.manifest se omitido)
+      @param workers  - número de threads de descompactação
+      @returns - True se o artefato confere com o manifesto ou False caso contrário
+    '''
+    manifest = manifest or read_manifest(artifact)
+    if manifest is None:
+        logger.error('Manifesto não encontrado para %s' % (artifact))
+        return False
+    digest = hashlib.sha256()
+    image = hashlib.sha256()
+    size = 0
+    restored = 0
+    pool = ThreadPool(max(1, workers))
+    try:
+        with open(artifact, 'rb') as infile:
+            if manifest.get('members'):
+                zero_members = {}
+
+                def members():
+                    offset = 0
+                    for n in manifest['members']:
+                        data = infile.read(n)
+                        digest.update(data)
+                        # Membros de zeros iguais aos gravados pelo backup não precisam ser descompactados
+                        length = min(manifest['block_size'], manifest['source_bytes'] - offset)
+                        offset += max(0, length)
+                        if length > 0 and length not in zero_members:
+                            zero_members[length] = compress_block(zeros(length))
+                        if length > 0 and data == zero_members[length]:
+                            yield ReadyResult(zeros(length))
+                        else:
+                            yield pool.apply_async(decompress_member, (data,))
+
+                for data in ordered(members(), 2 * max(1, workers)):
+                    image.update(data)
+                    restored += len(data)
+                digest.update(infile.read())
+            else:
+                gz = gzip.GzipFile(fileobj=infile, mode='rb')
+                for data in iter(lambda: gz.read(BLOCK_SIZE), b''):
+                    image.update(data)
+                    restored += len(data)
+                infile.seek(0)
+                for data in iter(lambda: infile.read(BLOCK_SIZE), b''):
+                    digest.update(data)
+            size = infile.tell()
+    except (IOError, OSError, EOFError, zlib.error) as e:
+        logger.error('Falha ao descompactar %s: %s' % (artifact, e))
+        return False
+    finally:
+        pool.close()
+        pool.join()
+    if size != manifest['artifact_bytes'] or digest.hexdigest() != manifest['artifact_sha256']:
+        logger.error('Checksum divergente para %s: %s (%d bytes), esperado %s (%d bytes)'
+                     % (artifact, digest.hexdigest(), size, manifest['artifact_sha256'], manifest['artifact_bytes']))
+        return False
+    if restored != manifest['source_bytes'] or image.hexdigest() != manifest['source_sha256']:
+        logger.error('Imagem descompactada de %s divergente: %s (%d bytes), esperado %s (%d bytes)'
+                     % (artifact, image.hexdigest(), restored, manifest['source_sha256'], manifest['source_bytes']))
+        return False
+    return True
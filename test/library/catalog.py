@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe mantém o catálogo local de backups (SQLite) compartilhado pelo backup
+de VMs (vm_backup.py) e pelo backup de elementos de rede (backupNE.py).
+
+Cada artefato gravado é registrado com origem, caminho, tamanhos, checksum, duração
+e situação. Consultas como "último backup válido de X", "total de bytes por VM" e
+a escolha dos backups expirados passam a ser consultas indexadas, sem varrer os
+diretórios de backup.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CATALOG = '/opt/backup/catalog.db'
+
+SCHEMA = [
+    '''create table if not exists artifacts (
+           id integer primary key autoincrement,
+           kind text not null,
+           source text not null,
+           name text not null,
+           path text not null unique,
+           store text,
+           created real not null,
+           source_bytes integer,
+           stored_bytes integer,
+           sha256 text,
+           duration real,
+           status text not null,
+           deleted real)''',
+    'create index if not exists ix_artifacts_source on artifacts (kind, source, status, created)',
+]
+
+# Migrações do esquema, aplicadas em ordem conforme o 'pragma user_version' do arquivo
+MIGRATIONS = [
+    # 1: resultado da verificação periódica (scrub) e checksum do arquivo gravado
+    ['alter table artifacts add column artifact_sha256 text',
+     'alter table artifacts add column verified real',
+     'alter table artifacts add column verify_status text'],
+    # 2: marcador de alteração do NE (probe_command) e última conferência sem alteração
+    ['alter table artifacts add column marker text',
+     'alter table artifacts add column checked real'],
+    # 3: data da réplica externa (SFTP) concluída
+    ['alter table artifacts add column replicated real'],
+]
+
+
+# ================================================================
+# class BackupCatalog
+# ================================================================
+class BackupCatalog:
+    '''
+    Catálogo de backups em SQLite.
+    Uso típico:
+
+        catalog = BackupCatalog('/opt/backup/catalog.db')
+        catalog.record('vm', 'VMSnipeit', 'VMSnipeit-full-20261019_030000',
+                       '/opt/backup/VMSnipeit/full/VMSnipeit-full-20261019_030000.qcow2.gz',
+                       store='gzip', stored_bytes=1234, sha256='...')
+        print catalog.latest_good('vm', 'VMSnipeit')['path']
+        print catalog.total_bytes('vm', 'VMSnipeit')
+        catalog.prune('vm', 'VMSnipeit', keep=4)
+        catalog.close()
+    '''
+    def __init__(self, path=DEFAULT_CATALOG):
+        '''
+        @param path  - arquivo do catálogo (criado se não existir).
+        '''
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.path = path
+        # Uma conexão por processo, usada por várias threads sob o lock
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        # WAL: backups de VMs e de NEs gravam ao mesmo tempo sem bloquear leituras
+        self._db.execute('pragma journal_mode=wal')
+        with self._lock:
+            self._migrate()
+
+        # Conecta o logger ao módulo raiz (script que chama a classe)
+        self.logger = logging.getLogger('root')
+        # Define métodos para chamada do logger
+        self.info = self.logger.info
+        self.debug = self.logger.debug
+        self.error = self.logger.error
+
+    def close(self):
+        self._db.close()
+
+    def _migrate(self):
+        '''
+        Cria o esquema e aplica as migrações pendentes. Cada migração e o seu
+        user_version são gravados numa transação com lock de escrita (begin immediate),
+        e a versão é relida depois do lock: dois processos abrindo um catálogo novo ao
+        mesmo tempo não aplicam a mesma migração duas vezes.
+        '''
+        # Sem transações implícitas (o Python 2 faria commit antes de cada DDL)
+        isolation, self._db.isolation_level = self._db.isolation_level, None
+        try:
+            while True:
+                self._db.execute('begin immediate')
+                try:
+                    for sql in SCHEMA:
+                        self._db.execute(sql)
+                    version = self._db.execute('pragma user_version').fetchone()[0]
+                    if version < len(MIGRATIONS):
+                        for sql in MIGRATIONS[version]:
+                            self._db.execute(sql)
+                        self._db.execute('pragma user_version = %d' % (version + 1))
+                    self._db.execute('commit')
+                except Exception:
+                    self._db.execute('rollback')
+                    raise
+                if version + 1 >= len(MIGRATIONS):
+                    break
+        finally:
+            self._db.isolation_level = isolation
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            cur = self._db.execute(sql, args)
+            self._db.commit()
+            return cur
+
+    def _query(self, sql, args=()):
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, args).fetchall()]
+
+    def record(self, kind, source, name, path, status='ok', store=None, created=None,
+               source_bytes=None, stored_bytes=None, sha256=None, duration=None, artifact_sha256=None,
+               marker=None):
+        '''
+        Registra (ou atualiza, pelo caminho) um artefato de backup. Ao atualizar, a
+        verificação e a réplica são mantidas, a menos que o checksum do arquivo mude.
+
+        @param kind     - tipo da origem: vm | ne.
+        @param source   - nome da VM ou seção do NE.
+        @param name     - nome do backup.
+        @param path     - caminho do artefato.
+        @param status   - ok | failed.
+        @param sha256   - checksum dos dados de origem (imagem ou configuração).
+        @param artifact_sha256 - checksum do arquivo gravado, se diferente (ex: .gz).
+        @param marker   - marcador de alteração informado pela origem (ex: commit do NE).
+        @returns id do registro.
+        '''
+        values = (kind, source, name, store, created or time.time(), source_bytes,
+                  stored_bytes, sha256, duration, status, marker)
+        with self._lock:
+            cur = self._db.execute(
+                '''update artifacts set kind = ?, source = ?, name = ?, store = ?, created = ?, source_bytes = ?,
+                                        stored_bytes = ?, sha256 = ?, duration = ?, status = ?, marker = ?,
+                                        deleted = null,
+                                        verified = case when ifnull(? = artifact_sha256, 1) then verified end,
+                                        verify_status = case when ifnull(? = artifact_sha256, 1) then verify_status end,
+                                        replicated = case when ifnull(? = artifact_sha256, 1) then replicated end,
+                                        artifact_sha256 = coalesce(?, artifact_sha256)
+                   where path = ?''', values + (artifact_sha256,) * 4 + (path,))
+            if cur.rowcount:
+                artifact_id = self._db.execute('select id from artifacts where path = ?', (path,)).fetchone()[0]
+            else:
+                cur = self._db.execute(
+                    '''insert into artifacts (kind, source, name, store, created, source_bytes, stored_bytes,
+                                              sha256, duration, status, marker, artifact_sha256, path)
+                       values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', values + (artifact_sha256, path))
+                artifact_id = cur.lastrowid
+            self._db.commit()
+        self.debug('Catálogo: %s %s registrado como %s' % (kind, name, status))
+        return artifact_id
+
+    def record_check(self, artifact_id):
+        '''
+        Registra que a origem foi conferida e continua igual ao backup (marcador inalterado).
+        '''
+        self._execute('update artifacts set checked = ? where id = ?', (time.time(), artifact_id))
+
+    def has(self, kind, source):
+        return bool(self._query('select 1 from artifacts where kind = ? and source = ? limit 1', (kind, source)))
+
+    def adopt(self, kind, source, directory, prefix='', suffix='', store='file'):
+        '''
+        Registra os backups já existentes no diretório, gravados antes do catálogo,
+        usando a data de modificação como data do backup. Feito uma única vez por origem.
+
+        @returns número de arquivos registrados.
+        '''
+        if not os.path.isdir(directory):
+            return 0
+        count = 0
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            if not (filename.startswith(prefix) and filename.endswith(suffix) and os.path.isfile(path)):
+                continue
+            if self._query('select 1 from artifacts where path = ?', (path,)):
+                continue
+            st = os.stat(path)
+            name = filename[:-len(suffix)] if suffix else filename
+            self.record(kind, source, name, path, store=store, created=st.st_mtime, stored_bytes=st.st_size)
+            count += 1
+        if count:
+            self.info('Catálogo: %d backups existentes de %s registrados' % (count, source))
+        return count
+
+    def artifacts(self, kind, source, status='ok', store=None):
+        '''
+        @returns - backups da origem (opcionalmente de um só store), do mais novo para o mais antigo.
+        '''
+        if store is None:
+            return self._query('''select * from artifacts where kind = ? and source = ? and status = ?
+                                  order by created desc, id desc''', (kind, source, status))
+        return self._query('''select * from artifacts where kind = ? and source = ? and status = ? and store = ?
+                              order by created desc, id desc''', (kind, source, status, store))
+
+    def latest_good(self, kind, source):
+        '''
+        @returns - último backup válido da origem (dicionário) ou None.
+        '''
+        rows = self._query('''select * from artifacts where kind = ? and source = ? and status = 'ok'
+                              order by created desc, id desc limit 1''', (kind, source))
+        return rows[0] if rows else None
+
+    def find(self, kind, source, name):
+        '''
+        @returns - backup da origem com o nome informado (dicionário) ou None.
+        '''
+        rows = self._query('''select * from artifacts where kind = ? and source = ? and name = ?
+                              order by id desc limit 1''', (kind, source, name))
+        return rows[0] if rows else None
+
+    def total_bytes(self, kind, source=None):
+        '''
+        @returns - bytes ocupados pelos backups válidos da origem (ou de todas as origens do tipo).
+        '''
+        if source is None:
+            rows = self._query("select sum(stored_bytes) as total from artifacts where kind = ? and status = 'ok'",
+                               (kind,))
+        else:
+            rows = self._query("""select sum(stored_bytes) as total from artifacts
+                                  where kind = ? and source = ? and status = 'ok'""", (kind, source))
+        return rows[0]['total'] or 0
+
+    def compression_ratio(self, kind, source, store=None, samples=5):
+        '''
+        Taxa bytes gravados / bytes de origem dos últimos backups válidos da origem.
+        Usa a maior taxa da amostra, para que a previsão de espaço fique do lado seguro.
+
+        @param samples  - número de backups considerados.
+        @returns (taxa, backups usados) ou (None, 0) sem histórico.
+        '''
+        sql = '''select stored_bytes, source_bytes from artifacts
+                 where kind = ? and source = ? and status in ('ok', 'deleted')
+                   and source_bytes > 0 and stored_bytes is not null'''
+        args = [kind, source]
+        if store is not None:
+            sql += ' and store = ?'
+            args.append(store)
+        rows = self._query(sql + ' order by created desc limit ?', args + [samples])
+        if not rows:
+            return None, 0
+        return max(float(r['stored_bytes']) / r['source_bytes'] for r in rows), len(rows)
+
+    def sources(self, kind):
+        return [r['source'] for r in self._query('select distinct source from artifacts where kind = ? order by source',
+                                                  (kind,))]
+
+    def expired(self, kind, source, keep=None, max_age_days=None, store=None):
+        '''
+        Seleciona os backups fora da retenção: além dos keep mais novos e/ou mais
+        antigos que max_age_days. Backups com falha não contam para o keep; os seus
+        arquivos expiram quando há um backup válido mais novo ou pela idade.
+
+        @returns - lista de backups expirados (dicionários).
+        '''
+        rows = self.artifacts(kind, source, store=store)
+        kept = rows[:keep] if keep is not None else rows
+        expired = rows[len(kept):]
+        limit = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        if limit is not None:
+            expired = [r for r in kept if r['created'] < limit] + expired
+        newest = rows[0]['created'] if rows else None
+        for row in self.artifacts(kind, source, status='failed', store=store):
+            if (newest is not None and row['created'] < newest) or (limit is not None and row['created'] < limit):
+                expired.append(row)
+        return expired
+
+    def mark_deleted(self, kind, source, names):
+        '''
+        Marca os backups como removidos (o histórico é mantido no catálogo).
+        '''
+        now = time.time()
+        with self._lock:
+            for name in names:
+                self._db.execute("""update artifacts set status = 'deleted', deleted = ?
+                                    where kind = ? and source = ? and name = ? and status in ('ok', 'failed')""",
+                                 (now, kind, source, name))
+            self._db.commit()
+
+    def prune(self, kind, source, keep=None, max_age_days=None, sidecars=(), store=None):
+        '''
+        Apaga os arquivos dos backups expirados e os marca como removidos.
+
+        @param sidecars  - sufixos de arquivos auxiliares apagados junto (ex: '.manifest').
+        @returns - lista de backups removidos (dicionários).
+        '''
+        expired = self.expired(kind, source, keep, max_age_days, store)
+        for row in expired:
+            for path in [row['path']] + [row['path'] + s for s in sidecars]:
+                if os.path.exists(path):
+                    os.remove(path)
+        self.mark_deleted(kind, source, [r['name'] for r in expired])
+        self.debug('Catálogo: %d backups de %s removidos' % (len(expired), source))
+        return expired
+
+    def due_for_scrub(self, interval_days, kind=None):
+        '''
+        @param interval_days  - backups verificados há menos tempo que isso são ignorados.
+        @param kind           - vm | ne (padrão: ambos).
+        @returns - backups válidos a verificar, dos nunca verificados aos mais antigos.
+        '''
+        limit = time.time() - interval_days * 86400
+        sql = '''select * from artifacts where status = 'ok' and (verified is null or verified < ?)'''
+        args = [limit]
+        if kind is not None:
+            sql += ' and kind = ?'
+            args.append(kind)
+        return self._query(sql + ' order by verified is not null, verified, created', args)
+
+    def pending_replication(self, kind=None):
+        '''
+        @param kind  - vm | ne (padrão: ambos).
+        @returns - backups válidos ainda não replicados, dos mais antigos aos mais novos.
+        '''
+        sql = "select * from artifacts where status = 'ok' and replicated is null"
+        args = []
+        if kind is not None:
+            sql += ' and kind = ?'
+            args.append(kind)
+        return self._query(sql + ' order by created, id', args)
+
+    def record_replicated(self, artifact_id):
+        self._execute('update artifacts set replicated = ? where id = ?', (time.time(), artifact_id))
+
+    def record_verify(self, artifact_id, verify_status, sha256=None):
+        '''
+        Grava o resultado de uma verificação (ok | corrupt | missing). Se o arquivo ainda
+        não tinha checksum (registrado antes do catálogo), o checksum lido é adotado.
+        '''
+        self._execute('''update artifacts set verified = ?, verify_status = ?,
+                                artifact_sha256 = coalesce(artifact_sha256, ?)
+                         where id = ?''', (time.time(), verify_status, sha256, artifact_id))
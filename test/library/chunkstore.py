@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe implementa um repositório de backups deduplicado por blocos (chunks).
+
+A imagem é dividida em blocos de tamanho fixo; cada bloco é identificado pelo seu
+SHA-256 e gravado compactado uma única vez em <raiz>/chunks/<aa>/<sha256>.gz.
+Cada backup é descrito por um manifesto JSON em <raiz>/manifests/<nome>.json com a
+lista ordenada de blocos (null para blocos de zeros). Backups semanais de uma VM
+que pouco mudou gravam apenas os blocos novos.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import collections
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from multiprocessing.pool import ThreadPool
+from backupstream import BLOCK_SIZE, ImageReader, ReadyResult, compress_block, ordered, zeros
+
+
+# ================================================================
+# class ChunkStore
+# ================================================================
+class ChunkStore:
+    '''
+    Repositório de blocos deduplicados.
+    Uso típico:
+
+        store = ChunkStore('/opt/backup/chunkstore')
+        manifest = store.backup('/var/lib/libvirt/images/vm.qcow2', 'vm-full-20261019_030000')
+        store.restore('vm-full-20261019_030000', '/tmp/vm.qcow2')
+        store.prune(['vm-full-20261012_030000'])     # expirados segundo o catálogo
+    '''
+    def __init__(self, root, blocksize=BLOCK_SIZE, level=6):
+        '''
+        @param root       - diretório raiz do repositório.
+        @param blocksize  - tamanho dos blocos em bytes.
+        @param level      - nível de compressão dos blocos.
+        '''
+        self.root = root
+        self.blocksize = blocksize
+        self.level = level
+        self.chunk_dir = os.path.join(root, 'chunks')
+        self.manifest_dir = os.path.join(root, 'manifests')
+        for d in (self.chunk_dir, self.manifest_dir):
+            if not os.path.isdir(d):
+                os.makedirs(d)
+
+        # Conecta o logger ao módulo raiz (script que chama a classe)
+        self.logger = logging.getLogger('root')
+        # Define métodos para chamada do logger
+        self.info = self.logger.info
+        self.debug = self.logger.debug
+        self.error = self.logger.error
+
+    def chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest + '.gz')
+
+    def manifest_path(self, name):
+        return os.path.join(self.manifest_dir, name + '.json')
+
+    def _lock(self, mode):
+        '''
+        Backups seguram a trava compartilhada e a limpeza a exclusiva, para que um
+        bloco recém-referenciado não seja removido antes do manifesto ser gravado.
+        '''
+        f = open(os.path.join(self.root, '.lock'), 'a')
+        fcntl.flock(f.fileno(), mode)
+        return f
+
+    def _put(self, data, governor=None):
+        '''
+        Grava um bloco se ele ainda não existir no repositório.
+
+        @returns (sha256, bytes gravados)
+        '''
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        out = compress_block(data, self.level)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        tmp = '%s.%d.%d.part' % (path, os.getpid(), threading.current_thread().ident)
+        with open(tmp, 'wb') as f:
+            if governor is not None:
+                governor.write(f, out, sync=True)
+            else:
+                f.write(out)
+        os.rename(tmp, path)
+        return digest, len(out)
+
+    def _get(self, digest):
+        with open(self.chunk_path(digest), 'rb') as f:
+            return zlib.decompress(f.read(), 16 + zlib.MAX_WBITS)
+
+    def backup(self, source, name, workers=1, governor=None):
+        '''
+        Grava uma imagem no repositório.
+
+        @param source   - arquivo de origem (imagem da VM).
+        @param name     - nome do backup (manifesto).
+        @param workers  - número de threads de hash/compressão.
+        @param governor - IOGovernor que limita leitura, escrita e blocos em voo (opcional).
+        @returns manifest - dicionário com a lista de blocos e estatísticas.
+        '''
+        started = time.time()
+        source_hash = hashlib.sha256()
+        chunks = []
+        stats = {'new_chunks': 0, 'new_bytes': 0}
+        pending = collections.deque()
+        pool = ThreadPool(max(1, workers))
+        lock = self._lock(fcntl.LOCK_SH)
+        reader = ImageReader(source, self.blocksize)
+
+        def collect():
+            digest, written = pending.popleft().get()
+            chunks.append(digest)
+            if written:
+                stats['new_chunks'] += 1
+                stats['new_bytes'] += written
+
+        try:
+            for offset, length, data in reader.blocks():
+                if data is None:
+                    source_hash.update(zeros(length))
+                    pending.append(ReadyResult((None, 0)))
+                else:
+                    if governor is not None:
+                        governor.read(length)
+                    source_hash.update(data)
+                    pending.append(pool.apply_async(self._put, (data, governor)))
+                while len(pending) >= (governor.window() if governor is not None else 2 * max(1, workers)):
+                    collect()
+            while pending:
+                collect()
+
+            manifest = {
+                'name': name,
+                'source': source,
+                'format': 'chunks',
+                'block_size': self.blocksize,
+                'chunks': chunks,
+                'source_bytes': reader.size,
+                'source_sha256': source_hash.hexdigest(),
+                'read_bytes': reader.read_bytes,
+                'zero_blocks': reader.zero_blocks,
+                'new_chunks': stats['new_chunks'],
+                'new_bytes': stats['new_bytes'],
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'duration': round(time.time() - started, 3),
+                'workers': workers,
+            }
+            if governor is not None:
+                manifest['io'] = governor.stats()
+            path = self.manifest_path(name)
+            with open(path + '.part', 'w') as f:
+                json.dump(manifest, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(path + '.part', path)
+        finally:
+            reader.close()
+            pool.close()
+            pool.join()
+            lock.close()
+        self.debug('Backup %s: %d blocos, %d novos (%d bytes gravados)'
+                   % (name, len(chunks), stats['new_chunks'], stats['new_bytes']))
+        return manifest
+
+    def manifests(self, prefix=''):
+        '''
+        @returns - nomes dos backups do repositório que começam com prefix, em ordem.
+        '''
+        return sorted(f[:-5] for f in os.listdir(self.manifest_dir)
+                      if f.endswith('.json') and f.startswith(prefix))
+
+    def load(self, name):
+        with open(self.manifest_path(name)) as f:
+            return json.load(f)
+
+    def restore(self, name, target, workers=1):
+        '''
+        Remonta uma imagem a partir do manifesto, recriando os blocos de zeros como
+        buracos (arquivo esparso) e conferindo o SHA-256 da imagem. Os blocos são
+        lidos e descompactados em paralelo por workers threads.
+
+        @returns True se o checksum da imagem restaurada confere ou False caso contrário.
+        '''
+        manifest = self.load(name)
+        restored = hashlib.sha256()
+        size = manifest['source_bytes']
+        blocksize = manifest['block_size']
+        pool = ThreadPool(max(1, workers))
+
+        def blocks():
+            for i, digest in enumerate(manifest['chunks']):
+                if digest is None:
+                    yield ReadyResult(zeros(min(blocksize, size - i * blocksize)))
+                else:
+                    yield pool.apply_async(self._get, (digest,))
+
+        try:
+            with open(target, 'wb') as outfile:
+                for i, data in enumerate(ordered(blocks(), 2 * max(1, workers))):
+                    restored.update(data)
+                    if manifest['chunks'][i] is None:
+                        outfile.seek(len(data), os.SEEK_CUR)
+                    else:
+                        outfile.write(data)
+                outfile.truncate(size)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+        finally:
+            pool.close()
+            pool.join()
+        if restored.hexdigest() != manifest['source_sha256']:
+            self.error('Checksum divergente na restauração de %s' % (name))
+            return False
+        return True
+
+    def verify(self, name, deep=False):
+        '''
+        Confere se todos os blocos de um backup existem no repositório. Com deep=True,
+        também descompacta cada bloco e confere o seu SHA-256.
+
+        @returns lista de blocos ausentes ou corrompidos (vazia se o backup está íntegro).
+        '''
+        bad = []
+        for digest in set(self.load(name)['chunks']):
+            if digest is None:
+                continue
+            if not os.path.exists(self.chunk_path(digest)):
+                bad.append(digest)
+            elif deep:
+                try:
+                    if hashlib.sha256(self._get(digest)).hexdigest() != digest:
+                        bad.append(digest)
+                except (IOError, zlib.error):
+                    bad.append(digest)
+        return bad
+
+    def scrub(self, workers=1, bucket=None):
+        '''
+        Relê todos os blocos do repositório em paralelo e confere o SHA-256 de cada um.
+        Cada bloco é lido uma única vez, mesmo que seja usado por vários backups.
+
+        @param workers  - número de threads de leitura/descompactação.
+        @param bucket   - TokenBucket que limita a taxa de leitura (opcional).
+        @returns - conjunto de blocos corrompidos.
+        '''
+        def check(path):
+            digest = os.path.basename(path)[:-3]
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                if bucket is not None:
+                    bucket.consume(len(data))
+                if hashlib.sha256(zlib.decompress(data, 16 + zlib.MAX_WBITS)).hexdigest() == digest:
+                    return None
+            except (IOError, OSError, zlib.error):
+                pass
+            return digest
+
+        paths = [os.path.join(d, f) for d, _, names in os.walk(self.chunk_dir)
+                 for f in names if f.endswith('.gz')]
+        pool = ThreadPool(max(1, workers))
+        try:
+            bad = set(d for d in pool.imap_unordered(check, paths, 16) if d is not None)
+        finally:
+            pool.close()
+            pool.join()
+        self.debug('Scrub do repositório: %d blocos lidos, %d corrompidos' % (len(paths), len(bad)))
+        return bad
+
+    def refcounts(self):
+        '''
+        @returns Counter {sha256: número de manifestos que referenciam o bloco}.
+        '''
+        counts = collections.Counter()
+        for name in self.manifests():
+            counts.update(set(d for d in self.load(name)['chunks'] if d is not None))
+        return counts
+
+    def prune(self, names):
+        '''
+        Remove os backups informados e os blocos que deixaram de ser referenciados
+        por qualquer manifesto. Os backups a remover são escolhidos pelo catálogo
+        (BackupCatalog.expired), que só conta os backups válidos na retenção.
+
+        @param names  - nomes dos backups (manifestos) expirados.
+        @returns (manifestos removidos, blocos removidos, bytes liberados)
+        '''
+        lock = self._lock(fcntl.LOCK_EX)
+        try:
+            expired = [n for n in names if os.path.exists(self.manifest_path(n))]
+            if not expired:
+                return [], 0, 0
+            counts = self.refcounts()
+            freed = 0
+            removed = 0
+            for name in expired:
+                chunks = set(d for d in self.load(name)['chunks'] if d is not None)
+                os.remove(self.manifest_path(name))
+                for digest in chunks:
+                    counts[digest] -= 1
+                    if counts[digest] <= 0:
+                        path = self.chunk_path(digest)
+                        if os.path.exists(path):
+                            freed += os.path.getsize(path)
+                            os.remove(path)
+                            removed += 1
+            self.debug('Limpeza: %d backups, %d blocos, %d bytes' % (len(expired), removed, freed))
+            return expired, removed, freed
+        finally:
+            lock.close()
+
+    def stored_bytes(self):
+        '''
+        @returns - total de bytes ocupados pelos blocos do repositório.
+        '''
+        return sum(os.path.getsize(os.path.join(d, f))
+                   for d, _, names in os.walk(self.chunk_dir) for f in names)
@@ -132,44 +132,37 @@ def write_file(filename,data):
       logger.debug('Arquivo %s salvo' %(filename))
 
 
-def ftp_explicity_ssl_huawei(host,port,user,pswd,directory,timeout):
+def ftp_explicity_ssl_huawei(host,port,user,pswd,directory,timeout,localdir=None):
    '''
       ftp_explicity_ssl_huawei - função para acesso FTP explicito sobre SSL no MME Huawey
-        Versão: 1.0
+        Versão: 2.0
         Adicionado em: 15/12/2017 (Diogenes)
+        Modificado em: 19/10/2026 (Diogenes) - seleção por MLSD/MDTM, blocos grandes e retomada via REST
 
         @param host - endereço IP do servidor FTP 
         @param port - porta TCP
         @param user - usuário para acesso
         @param pswd - senha para acesso
         @param directory - diretório de armazenamento dos arquivos
-        @param filename - padrão de nome de arquivo para download
-   '''
-   import ftplib, ssl
-
-   ftps=ftplib.FTP_TLS()
-   logger.debug('FTP sobre SSL instanciado')
-   ctx = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-   ctx.set_ciphers('HIGH:!DH:!aNULL')
-   ftps = ftplib.FTP_TLS(context=ctx)
-   logger.debug('Alterado cifra do contexto SSL para permitir chaves pequenas')
-   ftps.connect(host,port,timeout=timeout)
-   ftps.login(user,pswd)
+        @param timeout - timeout da conexão em segundos
+        @param localdir - diretório local de destino (padrão: diretório corrente)
+        @returns filename - nome do arquivo baixado
+   '''
+   import os
+   from connect_ftps import MyFTPS
+
+   ftps = MyFTPS()
+   if not ftps.connect(host,port,user,pswd,timeout):
+      raise IOError('Falha na conexão FTP com %s:%s' %(host,port))
    logger.debug('Conexão FTP efetuada!')
-   ftps.prot_p()
-   logger.debug('Ativado conexão segura de dados')
-   ftps.cwd(directory)
-   logger.debug('Acesso ao diretório: %s' %(directory))
-   files = ftps.nlst()
-   logger.debug('Arquivos listados:\n %s' %(files))
-   filename = sorted(files)[-1]
-   logger.debug('Arquivo mais recente: %s' %(filename))
-   myfile = open(filename, 'wb')
-   ftps.retrbinary('RETR %s' % filename, myfile.write)
+   try:
+      localfile = ftps.fetch_latest(directory,localdir or os.getcwd())
+   finally:
+      ftps.close()
+   if localfile is None:
+      return None
    logger.debug('Arquivo baixado com sucesso')
-   #ftps.delete(filename)
-   ftps.close()
-   return filename
+   return os.path.basename(localfile)
 
 
 def sftp_hosts(hostname=None,user=None,keyfilename=None,remotefile=None,localfile=None,passwd=None,port=22,removefile=0):
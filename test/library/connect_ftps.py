@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe permite baixar arquivos de um servidor FTP explícito sobre SSL (FTPS),
+com seleção do arquivo mais recente por metadados (MLSD/MDTM), escrita em blocos
+grandes direto no diretório de destino e retomada de transferências interrompidas (REST).
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import ftplib
+import json
+import logging
+import os
+import socket
+import ssl
+import time
+import calendar
+from multiprocessing.pool import ThreadPool
+
+
+# ================================================================
+# class MyFTPS
+# ================================================================
+class MyFTPS:
+    '''
+    Cria uma conexão FTPS para um servidor e baixa arquivos.
+    Uso típico:
+
+        ftps = MyFTPS()
+        if not ftps.connect('host', 990, 'user', 'password'):
+            sys.exit('Connection failed')
+
+        # Baixa o arquivo mais recente do diretório remoto para /var/dumps
+        filename = ftps.fetch_latest('/export/home/omc', '/var/dumps')
+        ftps.close()
+
+    Para testes contra um servidor FTP local sem SSL, use MyFTPS(secure=False).
+    '''
+    def __init__(self, secure=True, blocksize=1048576, retries=3, ciphers='HIGH:!DH:!aNULL'):
+        '''
+        Configuração inicial da conexão e logger.
+
+        @param secure     - Habilita/desabilita FTP explícito sobre SSL (padrão=True).
+        @param blocksize  - tamanho do bloco de leitura/escrita em bytes (padrão=1MB).
+        @param retries    - número de tentativas de retomada após falha na transferência.
+        @param ciphers    - cifras do contexto SSL (padrão permite chaves pequenas do MME).
+        '''
+        self.ftp = None
+        self.secure = secure
+        self.blocksize = blocksize
+        self.retries = retries
+        self.ciphers = ciphers
+        self.params = None
+        self.directory = None
+
+        # Conecta o logger ao módulo raiz (script que chama a classe)
+        self.logger = logging.getLogger('root')
+        # Define métodos para chamada do logger
+        self.info = self.logger.info
+        self.debug = self.logger.debug
+        self.error = self.logger.error
+
+
+    def __del__(self):
+        self.close()
+
+
+    def close(self):
+        if self.ftp is not None:
+            try:
+                self.ftp.quit()
+            except Exception:
+                try:
+                    self.ftp.close()
+                except Exception:
+                    pass
+            self.ftp = None
+
+
+    def connect(self, host, port, user, pswd, timeout=30):
+        '''
+        Conecta a um servidor FTP/FTPS.
+
+        @param host    -  endereço do servidor.
+        @param port    -  porta TCP.
+        @param user    -  usuário para acesso.
+        @param pswd    -  senha para acesso.
+        @param timeout -  timeout em segundos (padrão=30).
+
+        @returns True se a conexão foi bem-sucedida ou False caso contrário.
+        '''
+        self.params = (host, port, user, pswd, timeout)
+        self.debug('conectando FTP %s@%s:%d' % (user, host, port))
+        try:
+            if self.secure:
+                ctx = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+                ctx.set_ciphers(self.ciphers)
+                self.debug('Alterado cifra do contexto SSL para permitir chaves pequenas')
+                self.ftp = ftplib.FTP_TLS(context=ctx)
+            else:
+                self.ftp = ftplib.FTP()
+            self.ftp.connect(host, port, timeout=timeout)
+            self.ftp.login(user, pswd)
+            if self.secure:
+                self.ftp.prot_p()
+                self.debug('Ativado conexão segura de dados')
+            self.ftp.voidcmd('TYPE I')
+            self.debug('bem-sucedido: %s@%s:%d' % (user, host, port))
+        except (socket.error, ftplib.Error, EOFError) as e:
+            self.ftp = None
+            self.error('falha na conexão FTP: %s@%s:%d: %s' % (user, host, port, str(e)))
+        return self.ftp is not None
+
+
+    def connected(self):
+        '''
+        Estou conectado no servidor?
+
+        @returns True se connectado ou False caso contrário.
+        '''
+        return self.ftp is not None
+
+
+    def reconnect(self):
+        '''
+        Reabre a conexão com os parâmetros da última chamada a connect().
+        '''
+        self.close()
+        host, port, user, pswd, timeout = self.params
+        return self.connect(host, port, user, pswd, timeout)
+
+
+    def listdir(self, directory):
+        '''
+        Lista os arquivos de um diretório remoto com seus metadados.
+
+        Usa MLSD (uma única listagem com data e tamanho de todos os arquivos). Se o
+        servidor não suportar MLSD, usa NLST seguido de MDTM/SIZE para cada arquivo.
+
+        @param directory  -  diretório remoto.
+        @returns files    -  dicionário {nome: {'modify': epoch ou None, 'size': bytes ou None}}.
+        '''
+        self.ftp.cwd(directory)
+        self.directory = directory
+        self.debug('Acesso ao diretório: %s' % (directory))
+        files = {}
+        lines = []
+        try:
+            self.ftp.retrlines('MLSD', lines.append)
+            for line in lines:
+                facts, _, name = line.partition(' ')
+                facts = dict(f.split('=', 1) for f in facts.split(';') if '=' in f)
+                facts = dict((k.lower(), v) for k, v in facts.items())
+                if facts.get('type', 'file').lower() != 'file':
+                    continue
+                files[name] = {'modify': _parse_time(facts.get('modify')),
+                               'size': int(facts['size']) if 'size' in facts else None}
+            self.debug('Arquivos listados via MLSD: %d' % (len(files)))
+            return files
+        except ftplib.error_perm:
+            self.debug('Servidor não suporta MLSD. Usando NLST/MDTM')
+
+        names = self.ftp.nlst()
+        self.ftp.voidcmd('TYPE I')          # a listagem deixa a sessão em ASCII, onde SIZE é recusado
+        for name in names:
+            files[name] = {'modify': self._mdtm(name), 'size': self._size(name)}
+        self.debug('Arquivos listados via NLST: %d' % (len(files)))
+        return files
+
+
+    def latest(self, directory, prefix=None):
+        '''
+        Seleciona o arquivo mais recente de um diretório remoto pela data de modificação.
+        Se o servidor não informar datas, adota-se a ordem lexical dos nomes.
+
+        @param directory  -  diretório remoto.
+        @param prefix     -  filtra apenas arquivos cujo nome começa com prefix (opcional).
+        @returns (nome, metadados) ou (None, None) se o diretório estiver vazio.
+        '''
+        files = self.listdir(directory)
+        if prefix:
+            files = dict((k, v) for k, v in files.items() if k.startswith(prefix))
+        if not files:
+            return None, None
+        name = max(files, key=lambda k: (files[k]['modify'] or 0, k))
+        self.debug('Arquivo mais recente: %s' % (name))
+        return name, files[name]
+
+
+    def download(self, remotename, localdir, size=None, modify=None):
+        '''
+        Baixa um arquivo para o diretório local, retomando transferências interrompidas.
+
+        O arquivo é escrito como <nome>.part e renomeado ao final. Se já existir um
+        <nome>.part, a transferência continua do ponto em que parou (comando REST),
+        desde que o arquivo remoto tenha o mesmo tamanho e data do início do download
+        (gravados em <nome>.part.src); caso contrário o .part é descartado.
+        Se o arquivo final já existir com o mesmo tamanho remoto, nada é baixado.
+
+        @param remotename -  nome do arquivo no diretório remoto corrente.
+        @param localdir   -  diretório local de destino.
+        @param size       -  tamanho remoto em bytes (opcional, consultado via SIZE se omitido).
+        @param modify     -  data de modificação remota em epoch (opcional).
+        @returns localfile - caminho do arquivo baixado.
+        '''
+        if size is None:
+            size = self._size(remotename)
+        if modify is None:
+            modify = self._mdtm(remotename)
+        localfile = os.path.join(localdir, os.path.basename(remotename))
+        partfile = localfile + '.part'
+        srcfile = partfile + '.src'
+
+        if size is not None and os.path.exists(localfile) and os.path.getsize(localfile) == size:
+            self.info('Arquivo %s já baixado (%d bytes)' % (localfile, size))
+            return localfile
+
+        source = {'size': size, 'modify': modify}
+        if os.path.exists(partfile) and not self._same_source(srcfile, source):
+            self.info('Arquivo remoto %s alterado desde o download interrompido. Descartando %s'
+                      % (remotename, partfile))
+            os.remove(partfile)
+        if not os.path.exists(partfile):
+            with open(srcfile, 'w') as f:
+                json.dump(source, f)
+
+        attempt = 0
+        while True:
+            offset = os.path.getsize(partfile) if os.path.exists(partfile) else 0
+            if size is not None and offset > size:
+                self.debug('Arquivo parcial maior que o remoto. Reiniciando download')
+                os.remove(partfile)
+                offset = 0
+            try:
+                if self.ftp is None:
+                    raise socket.error('conexão não estabelecida')
+                self._retrieve(remotename, partfile, offset)
+                break
+            except (socket.error, ftplib.Error, EOFError) as e:
+                attempt += 1
+                self.error('Falha no download de %s (tentativa %d/%d): %s' % (remotename, attempt, self.retries, str(e)))
+                if attempt > self.retries:
+                    raise
+                time.sleep(min(2 ** attempt, 30))
+                if self.reconnect() and self.directory:
+                    self.ftp.cwd(self.directory)
+
+        got = os.path.getsize(partfile)
+        if size is not None and got != size:
+            raise IOError('Tamanho divergente para %s: %d de %d bytes' % (remotename, got, size))
+        os.rename(partfile, localfile)
+        os.remove(srcfile)
+        if modify:
+            os.utime(localfile, (modify, modify))
+        self.info('Arquivo baixado com sucesso: %s (%d bytes)' % (localfile, got))
+        return localfile
+
+
+    def fetch_latest(self, directory, localdir, prefix=None):
+        '''
+        Baixa o arquivo mais recente de um diretório remoto.
+
+        @param directory  -  diretório remoto.
+        @param localdir   -  diretório local de destino.
+        @param prefix     -  filtra apenas arquivos cujo nome começa com prefix (opcional).
+        @returns localfile - caminho do arquivo baixado ou None se não houver arquivos.
+        '''
+        name, facts = self.latest(directory, prefix)
+        if name is None:
+            self.info('Nenhum arquivo em %s' % (directory))
+            return None
+        return self.download(name, localdir, facts['size'], facts['modify'])
+
+
+    def _same_source(self, srcfile, source):
+        '''
+        O .part foi iniciado a partir da mesma versão do arquivo remoto (tamanho e data)?
+        Sem tamanho e data remotos não há como saber, e o .part não é aproveitado.
+        '''
+        if source['size'] is None and source['modify'] is None:
+            return False
+        try:
+            with open(srcfile) as f:
+                return json.load(f) == source
+        except (IOError, OSError, ValueError):
+            return False
+
+
+    def _retrieve(self, remotename, partfile, offset):
+        '''
+        Executa o RETR a partir de offset, escrevendo em blocos grandes no arquivo parcial.
+        '''
+        self.debug('RETR %s a partir do byte %d' % (remotename, offset))
+        with open(partfile, 'ab' if offset else 'wb', self.blocksize) as outfile:
+            self.ftp.retrbinary('RETR %s' % remotename, outfile.write,
+                                self.blocksize, offset or None)
+
+
+    def _mdtm(self, name):
+        try:
+            resp = self.ftp.sendcmd('MDTM %s' % name)
+            return _parse_time(resp.split()[-1])
+        except ftplib.Error:
+            return None
+
+
+    def _size(self, name):
+        try:
+            return self.ftp.size(name)
+        except ftplib.Error:
+            return None
+
+
+def _parse_time(value):
+    '''
+    Converte data no formato YYYYMMDDHHMMSS[.sss] (UTC) do MLSD/MDTM para epoch.
+    '''
+    if not value:
+        return None
+    try:
+        return calendar.timegm(time.strptime(value[:14], '%Y%m%d%H%M%S'))
+    except ValueError:
+        return None
+
+
+def fetch_latest_many(servers, localdir, workers=4, secure=True):
+    '''
+    fetch_latest_many - função para baixar o arquivo mais recente de vários servidores em paralelo
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param servers  - lista de dicionários com host, port, user, pswd, directory e,
+                        opcionalmente, timeout, prefix e localdir
+      @param localdir - diretório local base; cada servidor grava em <localdir>/<host>
+                        se não informar o próprio localdir
+      @param workers  - número de servidores baixados simultaneamente
+      @param secure   - habilita/desabilita FTP explícito sobre SSL
+      @returns - dicionário {host: arquivo baixado ou None em caso de falha}
+    '''
+    logger = logging.getLogger('root')
+
+    def fetch(server):
+        target = server.get('localdir') or os.path.join(localdir, server['host'])
+        if not os.path.exists(target):
+            os.makedirs(target)
+        ftps = MyFTPS(secure=secure)
+        try:
+            if not ftps.connect(server['host'], int(server['port']), server['user'],
+                                server['pswd'], server.get('timeout', 30)):
+                return server['host'], None
+            return server['host'], ftps.fetch_latest(server['directory'], target, server.get('prefix'))
+        except Exception:
+            logger.error('Erro no download do servidor %s' % (server['host']), exc_info=True)
+            return server['host'], None
+        finally:
+            ftps.close()
+
+    pool = ThreadPool(max(1, min(workers, len(servers))))
+    try:
+        return dict(pool.map(fetch, servers))
+    finally:
+        pool.close()
+        pool.join()
@@ -123,7 +123,7 @@ class MySSH:
         return self.transport is not None
 
  
-    def run(self, cmd, input_data=None, timeout=10):
+    def run(self, cmd, input_data=None, timeout=10, pty=True):
         '''
         Executa um comando com entrada de dados opcional.
  
@@ -143,6 +143,8 @@ class MySSH:
         @param cmd         -  comando para executar.
         @param input_data  -  dados de entrada (padrão é None).
         @param timeout     -  timeout em segundos (padrão é 10 seconds).
+        @param pty         -  aloca um terminal (padrão). Sem terminal, a saída não traz
+                              banner nem eco e o status é o do comando.
         @returns (status, output) - retorna o status e a saída da execução do comando (stdout e stderr combinados).
         '''
         self.debug('executando comando: (%d) %s' % (timeout, cmd))
@@ -160,7 +162,8 @@ class MySSH:
         self.debug('inicializando a sessão')
         session = self.transport.open_session()
         session.set_combine_stderr(True)
-        session.get_pty()
+        if pty:
+            session.get_pty()
         session.exec_command(cmd)
         output = self._run_poll(session, timeout, input_data)
         status = session.recv_exit_status()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  domwatch.py - biblioteca para aguardar mudanças de estado das VMs por eventos.
+
+  Em vez de executar 'virsh domstate' uma vez por segundo, o processo assina os
+  eventos de ciclo de vida do libvirt e acorda as threads que aguardam uma VM no
+  instante em que ela desliga ou liga. Usa o event loop do módulo libvirt quando
+  ele está instalado; caso contrário mantém um único 'virsh event --loop' para
+  todas as VMs. Uma consulta de segurança a cada poll_interval segundos cobre
+  eventos perdidos.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import atexit
+import logging
+import re
+import subprocess
+import threading
+import time
+
+try:
+    import libvirt
+except ImportError:
+    libvirt = None
+
+# Conecta o logger ao módulo raiz (script que chama a classe)
+logger = logging.getLogger('root')
+
+# Eventos de ciclo de vida -> estado reportado pelo 'virsh domstate'
+EVENT_STATES = {
+    'Started': 'running',
+    'Resumed': 'running',
+    'Suspended': 'paused',
+    'Stopped': 'shut off',
+    'PMSuspended': 'pmsuspended',
+    'Crashed': 'crashed',
+}
+LIBVIRT_EVENTS = ['Defined', 'Undefined', 'Started', 'Suspended', 'Resumed',
+                  'Stopped', 'Shutdown', 'PMSuspended', 'Crashed']
+VIRSH_EVENT = re.compile(r"event 'lifecycle' for domain '?(.+?)'?: (\w+)")
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def domstate(name):
+    '''
+    domstate - função para consultar o estado atual de uma VM
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param name - nome do domínio no libvirt
+      @returns - estado (running, shut off, paused...) ou None se a VM não existe
+    '''
+    proc = subprocess.Popen(['virsh', 'domstate', name], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output = proc.communicate()[0].decode('utf-8', 'replace').strip()
+    if proc.returncode != 0:
+        return None
+    return output
+
+
+def get_watcher(uri='qemu:///system'):
+    '''
+    get_watcher - função para obter o DomainWatcher compartilhado do processo
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param uri - URI do libvirt (usada apenas com o módulo libvirt)
+      @returns - DomainWatcher já iniciado
+    '''
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = DomainWatcher(uri)
+            _watcher.start()
+            atexit.register(_watcher.stop)
+        return _watcher
+
+
+# ================================================================
+# class DomainWatcher
+# ================================================================
+class DomainWatcher:
+    '''
+    Estado das VMs atualizado por eventos de ciclo de vida.
+    Uso típico:
+
+        watcher = get_watcher()
+        virsh('shutdown', 'VMSnipeit')
+        if watcher.wait_for_state('VMSnipeit', ('shut off',), 600):
+            ...
+    '''
+    def __init__(self, uri='qemu:///system', poll_interval=30):
+        '''
+        @param uri            - URI do libvirt.
+        @param poll_interval  - segundos entre consultas de segurança ao virsh.
+        '''
+        self.uri = uri
+        self.poll_interval = poll_interval
+        self.states = {}
+        # Data da última mudança de estado, da última vez em running e da saída do running
+        self.changed = {}
+        self.seen_running = {}
+        self.left_running = {}
+        self.cond = threading.Condition()
+        self.backend = None
+        self.proc = None
+        self.conn = None
+        self.running = False
+
+    def start(self):
+        '''
+        Assina os eventos pelo módulo libvirt ou, na falta dele, pelo virsh.
+        '''
+        self.running = True
+        if libvirt is not None:
+            try:
+                libvirt.virEventRegisterDefaultImpl()
+                self.conn = libvirt.openReadOnly(self.uri)
+                self.conn.domainEventRegisterAny(None, libvirt.VIR_DOMAIN_EVENT_ID_LIFECYCLE,
+                                                 self._lifecycle, None)
+                self.backend = 'libvirt'
+                self._spawn(self._libvirt_loop)
+                return
+            except libvirt.libvirtError as e:
+                logger.debug('Eventos do libvirt indisponíveis (%s), usando virsh event' % e)
+        try:
+            # stderr vai para o mesmo pipe: um stderr não lido travaria o virsh com o pipe cheio
+            self.proc = subprocess.Popen(['virsh', 'event', '--all', '--loop', '--event', 'lifecycle'],
+                                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            self.backend = 'virsh'
+            self._spawn(self._virsh_loop)
+        except OSError as e:
+            # Sem eventos: wait_for_state continua funcionando pelas consultas periódicas
+            logger.debug('virsh event indisponível (%s), usando consultas periódicas' % e)
+            self.backend = 'poll'
+
+    def stop(self):
+        self.running = False
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            self.proc.wait()
+
+    def _spawn(self, target):
+        t = threading.Thread(target=target, name='domwatch-%s' % self.backend)
+        t.daemon = True
+        t.start()
+
+    def _libvirt_loop(self):
+        while self.running:
+            libvirt.virEventRunDefaultImpl()
+
+    def _lifecycle(self, conn, dom, event, detail, opaque):
+        if 0 <= event < len(LIBVIRT_EVENTS):
+            self._event(dom.name(), LIBVIRT_EVENTS[event])
+
+    def _virsh_loop(self):
+        message = ''
+        for line in iter(self.proc.stdout.readline, b''):
+            line = line.decode('utf-8', 'replace').strip()
+            match = VIRSH_EVENT.search(line)
+            if match:
+                self._event(match.group(1), match.group(2))
+            elif line:
+                message = line      # mensagens do virsh (ex: erro de conexão)
+        # O virsh terminou: as esperas seguem pelas consultas periódicas
+        status = self.proc.wait()
+        if self.running:
+            logger.error('virsh event encerrado (código %s): %s' % (status, message or 'sem mensagem'))
+        else:
+            logger.debug('virsh event encerrado (código %s)' % status)
+        self.backend = 'poll'
+
+    def _event(self, name, event):
+        state = EVENT_STATES.get(event)
+        logger.debug('Evento %s da VM %s' % (event, name))
+        if state is not None:
+            self._update(name, state, exact=True)
+
+    def _update(self, name, state, exact=False):
+        '''
+        @param exact  - estado recebido por evento (no instante da mudança); nas consultas,
+                        a saída do running é a última consulta que ainda a encontrou em running.
+        '''
+        now = time.time()
+        with self.cond:
+            previous = self.states.get(name)
+            if state != previous:
+                if previous == 'running':
+                    self.left_running[name] = now if exact else self.seen_running.get(name, now)
+                self.changed[name] = now
+            if state == 'running':
+                self.seen_running[name] = now
+            self.states[name] = state
+            self.cond.notify_all()
+
+    def refresh(self, name):
+        '''
+        Consulta o estado atual da VM no virsh e atualiza o cache.
+        '''
+        state = domstate(name)
+        if state is not None:
+            self._update(name, state)
+        return state
+
+    def state(self, name):
+        with self.cond:
+            if name in self.states:
+                return self.states[name]
+        return self.refresh(name)
+
+    def downtime(self, name):
+        '''
+        Intervalo da última parada observada da VM: da saída do estado running até a volta a ele.
+
+        @returns (saída, volta) em epoch, com volta None se a VM ainda não voltou, ou None
+                 se nenhuma saída do running foi observada.
+        '''
+        with self.cond:
+            left = self.left_running.get(name)
+            if left is None:
+                return None
+            if self.states.get(name) == 'running' and self.changed.get(name, 0) >= left:
+                return left, self.changed[name]
+            return left, None
+
+    def wait_for_state(self, name, states, timeout):
+        '''
+        Aguarda a VM entrar em um dos estados.
+
+        @param name     - nome do domínio.
+        @param states   - estados aceitos (ex: ('shut off',)).
+        @param timeout  - segundos máximos de espera.
+        @returns True se a VM chegou a um dos estados dentro do timeout ou False caso contrário.
+        '''
+        deadline = time.time() + timeout
+        # A consulta inicial é feita depois da assinatura: nenhum evento se perde
+        self.refresh(name)
+        interval = self.poll_interval if self.backend != 'poll' else min(self.poll_interval, 5)
+        next_poll = time.time() + interval
+        with self.cond:
+            while self.states.get(name) not in states:
+                now = time.time()
+                if now >= deadline:
+                    return False
+                if now >= next_poll:
+                    self.cond.release()
+                    try:
+                        self.refresh(name)
+                    finally:
+                        self.cond.acquire()
+                    next_poll = time.time() + interval
+                    continue
+                self.cond.wait(min(deadline, next_poll) - now)
+            return True
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  iogovernor.py - biblioteca para limitar o impacto dos backups no disco das VMs.
+
+  Cada job de backup recebe um IOGovernor com dois token buckets (leitura da imagem
+  e escrita do artefato) e uma janela de blocos em voo ajustada por AIMD: a janela
+  cresce um bloco por rodada enquanto a latência de escrita no destino fica abaixo
+  do alvo e cai pela metade quando o destino começa a segurar as escritas. A
+  latência é a do disco de destino, e não a da cópia para o cache de páginas: as
+  escritas são descarregadas em lotes com fdatasync e o tempo de cada lote é
+  dividido pelos blocos dele. A
+  prioridade de I/O (ioprio_set) e o nice são aplicados à thread do job e herdados
+  pelas threads de compressão criadas por ela.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import ctypes
+import logging
+import os
+import platform
+import threading
+import time
+
+# Conecta o logger ao módulo raiz (script que chama a classe)
+logger = logging.getLogger('root')
+
+MB = 1024 * 1024
+# Bytes gravados entre dois fdatasync do artefato (lote medido pelo AIMD)
+SYNC_BYTES = 32 * MB
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+# linux/ioprio.h
+IOPRIO_CLASS = {'realtime': 1, 'best-effort': 2, 'idle': 3}
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+PRIO_PROCESS = 0
+
+# Números das syscalls (ioprio_set, gettid) por arquitetura
+_SYSCALLS = {
+    'x86_64': (251, 186),
+    'amd64': (251, 186),
+    'i386': (289, 224),
+    'i686': (289, 224),
+    'aarch64': (30, 178),
+    'armv7l': (314, 224),
+}
+
+
+def _libc():
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def thread_id():
+    '''
+    thread_id - função para obter o id da thread no kernel (tid)
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @returns - tid da thread atual ou None se não for possível obtê-lo
+    '''
+    if hasattr(threading, 'get_native_id'):
+        return threading.get_native_id()
+    numbers = _SYSCALLS.get(platform.machine())
+    if numbers is None:
+        return None
+    return _libc().syscall(numbers[1])
+
+
+def set_io_priority(ioclass='best-effort', level=7, nice=10):
+    '''
+    set_io_priority - função para reduzir a prioridade de disco e CPU da thread atual
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      As threads criadas depois da chamada herdam a prioridade, por isso ela deve
+      ser feita antes de iniciar o pool de compressão.
+
+      @param ioclass - idle | best-effort | realtime | none
+      @param level   - nível dentro da classe (0 = maior prioridade, 7 = menor)
+      @param nice    - valor de nice da thread (None mantém o atual)
+      @returns - True se a prioridade foi aplicada ou False caso contrário
+    '''
+    tid = thread_id()
+    if tid is None:
+        logger.debug('Arquitetura %s sem suporte a ioprio_set' % platform.machine())
+        return False
+    libc = _libc()
+    ok = True
+    if ioclass and ioclass != 'none':
+        numbers = _SYSCALLS.get(platform.machine())
+        value = (IOPRIO_CLASS[ioclass] << IOPRIO_CLASS_SHIFT) | (0 if ioclass == 'idle' else level)
+        if numbers is None or libc.syscall(numbers[0], IOPRIO_WHO_PROCESS, tid, value) != 0:
+            logger.debug('ioprio_set falhou: %s' % os.strerror(ctypes.get_errno()))
+            ok = False
+    # No Linux o nice é por thread quando aplicado ao tid
+    if nice is not None and libc.setpriority(PRIO_PROCESS, tid, int(nice)) != 0:
+        logger.debug('setpriority falhou: %s' % os.strerror(ctypes.get_errno()))
+        ok = False
+    return ok
+
+
+# ================================================================
+# class TokenBucket
+# ================================================================
+class TokenBucket:
+    '''
+    Limitador de taxa (bytes por segundo) seguro entre threads.
+    Uso típico:
+
+        bucket = TokenBucket(50 * MB)
+        bucket.consume(len(data))   # bloqueia o tempo necessário para respeitar a taxa
+    '''
+    def __init__(self, rate, burst=None):
+        '''
+        @param rate   - bytes por segundo (0 = sem limite).
+        @param burst  - bytes acumuláveis quando ocioso (padrão: 1 segundo de taxa).
+        '''
+        self.rate = float(rate or 0)
+        self.burst = float(burst or self.rate)
+        self.tokens = self.burst
+        self.stamp = time.time()
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    def consume(self, nbytes):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            # O saldo pode ficar negativo: blocos maiores que o burst também passam
+            self.tokens -= nbytes
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+            self.waited += delay
+        if delay > 0:
+            time.sleep(delay)
+
+
+# ================================================================
+# class IOGovernor
+# ================================================================
+class IOGovernor:
+    '''
+    Controle de banda, prioridade e concorrência de um job de backup.
+    Uso típico:
+
+        gov = IOGovernor(read_rate=80 * MB, write_rate=60 * MB, target_latency=0.2, max_window=8)
+        gov.apply_priority()
+        gov.read(len(data))                      # depois de ler um bloco da imagem
+        gov.write(outfile, out)                  # grava; a cada lote, fdatasync e latência no destino
+        gov.write(chunk, out, sync=True)         # arquivo de um bloco só: fdatasync em seguida
+        while len(pending) >= gov.window(): ...  # blocos em voo
+    '''
+    def __init__(self, read_rate=0, write_rate=0, target_latency=0.2, max_window=2,
+                 ioclass='best-effort', level=7, nice=10, sync_bytes=SYNC_BYTES):
+        '''
+        @param read_rate       - bytes/s lidos da imagem (0 = sem limite).
+        @param write_rate      - bytes/s gravados no destino (0 = sem limite).
+        @param target_latency  - segundos aceitáveis por escrita de bloco (0 desliga o AIMD).
+        @param max_window      - máximo de blocos em voo (padrão do pool: 2 x workers).
+        @param ioclass         - classe de ioprio da thread do job.
+        @param level           - nível de ioprio.
+        @param nice            - nice da thread do job.
+        @param sync_bytes      - bytes gravados entre dois fdatasync do artefato.
+        '''
+        self.reads = TokenBucket(read_rate)
+        self.writes = TokenBucket(write_rate)
+        self.target_latency = target_latency
+        self.max_window = max(1, max_window)
+        self.cwnd = float(self.max_window)
+        self.ioclass = ioclass
+        self.level = level
+        self.nice = nice
+        self.slow_writes = 0
+        self.sync_bytes = sync_bytes
+        # Lote ainda não descarregado: bytes, blocos e segundos gastos no write()
+        self.batch = [0, 0, 0.0]
+        # observe() é chamado pelas threads de compressão do repositório de blocos
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, io, workers=1):
+        '''
+        Cria o governor a partir de um IOConfig (vmconfig).
+        '''
+        return cls(io.read_limit * MB, io.write_limit * MB, io.target_latency_ms / 1000.0,
+                   2 * max(1, workers), io.ioprio_class, io.ioprio_level, io.nice)
+
+    def apply_priority(self):
+        return set_io_priority(self.ioclass, self.level, self.nice)
+
+    def read(self, nbytes):
+        self.reads.consume(nbytes)
+
+    def write(self, outfile, data, sync=False):
+        '''
+        Grava data respeitando a taxa de escrita e ajusta a janela pela latência do disco.
+
+        @param sync  - descarrega e mede já este bloco (arquivos de um bloco, gravados por
+                       várias threads); sem ele, o artefato é descarregado a cada sync_bytes.
+        '''
+        self.writes.consume(len(data))
+        started = time.time()
+        outfile.write(data)
+        spent = time.time() - started
+        if sync:
+            started = time.time()
+            outfile.flush()
+            _fdatasync(outfile.fileno())
+            self.observe(spent + time.time() - started)
+            return
+        with self.lock:
+            self.batch[0] += len(data)
+            self.batch[1] += 1
+            self.batch[2] += spent
+            due = self.batch[0] >= self.sync_bytes
+        if due:
+            self.flush(outfile)
+
+    def flush(self, outfile):
+        '''
+        Descarrega o lote no disco (fdatasync) e ajusta a janela pelo tempo médio por bloco.
+        '''
+        started = time.time()
+        outfile.flush()
+        _fdatasync(outfile.fileno())
+        with self.lock:
+            nbytes, blocks, spent = self.batch
+            self.batch = [0, 0, 0.0]
+        if blocks:
+            self.observe((spent + time.time() - started) / blocks)
+
+    def observe(self, latency):
+        '''
+        AIMD: +1 bloco por janela completa abaixo do alvo, metade acima dele.
+        '''
+        if self.target_latency <= 0:
+            return
+        with self.lock:
+            if latency > self.target_latency:
+                self.slow_writes += 1
+                self.cwnd = max(1.0, self.cwnd / 2)
+            else:
+                self.cwnd = min(float(self.max_window), self.cwnd + 1.0 / self.cwnd)
+
+    def window(self):
+        return int(self.cwnd)
+
+    def stats(self):
+        '''
+        @returns - dicionário com o tempo de espera imposto e o estado da janela.
+        '''
+        return {'read_wait': round(self.reads.waited, 3), 'write_wait': round(self.writes.waited, 3),
+                'slow_writes': self.slow_writes, 'window': self.window()}
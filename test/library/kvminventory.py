@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  kvminventory.py - biblioteca de inventário de recursos das VMs KVM.
+
+  Os dados de todas as VMs (estado, vCPUs, memória e discos) vêm de uma única
+  consulta em lote (getAllDomainStats do libvirt ou 'virsh domstats'). O tamanho
+  virtual dos discos das VMs ligadas já vem na consulta; os das VMs desligadas são
+  lidos com 'qemu-img info' em paralelo e guardados num cache indexado pelo mtime
+  da imagem, de forma que execuções seguidas não releem imagens que não mudaram.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import json
+import logging
+import multiprocessing
+import os
+import stat
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+try:
+    import libvirt
+except ImportError:
+    libvirt = None
+
+# Conecta o logger ao módulo raiz (script que chama a classe)
+logger = logging.getLogger('root')
+
+GB = 1024.0 ** 3
+DEFAULT_CACHE = '/var/cache/kvm-inventory.json'
+# virDomainState -> texto do 'virsh domstate'
+STATES = ['no state', 'running', 'idle', 'paused', 'in shutdown', 'shut off', 'crashed', 'pmsuspended']
+
+
+def _run(args):
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output, error = proc.communicate()
+    return proc.returncode, output.decode('utf-8', 'replace'), error.decode('utf-8', 'replace')
+
+
+def parse_domstats(text):
+    '''
+    parse_domstats - função para interpretar a saída do 'virsh domstats --raw'
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param text - saída do comando
+      @returns - dicionário {nome da VM: {chave: valor}}
+    '''
+    domains = {}
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('Domain:'):
+            current = domains.setdefault(line.split(':', 1)[1].strip().strip("'"), {})
+        elif current is not None and '=' in line:
+            key, value = line.split('=', 1)
+            current[key] = int(value) if value.lstrip('-').isdigit() else value
+    return domains
+
+
+def domain_stats(uri='qemu:///system'):
+    '''
+    domain_stats - função para obter estado, vCPUs, memória e discos de todas as VMs
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param uri - URI do libvirt (usada apenas com o módulo libvirt)
+      @returns - dicionário {nome da VM: {chave: valor}} no formato do domstats
+    '''
+    if libvirt is not None:
+        try:
+            conn = libvirt.openReadOnly(uri)
+            try:
+                flags = (libvirt.VIR_DOMAIN_STATS_STATE | libvirt.VIR_DOMAIN_STATS_VCPU |
+                         libvirt.VIR_DOMAIN_STATS_BALLOON | libvirt.VIR_DOMAIN_STATS_BLOCK)
+                return dict((dom.name(), stats) for dom, stats in conn.getAllDomainStats(flags))
+            finally:
+                conn.close()
+        except libvirt.libvirtError as e:
+            logger.debug('getAllDomainStats indisponível (%s), usando virsh domstats' % e)
+    status, output, error = _run(['virsh', 'domstats', '--raw', '--state', '--vcpu', '--balloon', '--block'])
+    if status != 0:
+        raise RuntimeError('virsh domstats: %s' % error.strip())
+    return parse_domstats(output)
+
+
+def image_info(path):
+    '''
+    image_info - função para ler tamanho virtual, alocado e formato de uma imagem
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param path - caminho da imagem ou dispositivo de bloco
+      @returns - dicionário com virtual_bytes, actual_bytes e format
+    '''
+    st = os.stat(path)
+    if stat.S_ISBLK(st.st_mode):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.lseek(fd, 0, os.SEEK_END)
+        finally:
+            os.close(fd)
+        return {'virtual_bytes': size, 'actual_bytes': size, 'format': 'block'}
+    # -U: lê a imagem mesmo com a VM ligada (sem o lock de escrita do qemu)
+    status, output, error = _run(['qemu-img', 'info', '-U', '--output=json', path])
+    if status == 0:
+        info = json.loads(output)
+        return {'virtual_bytes': info.get('virtual-size', st.st_size),
+                'actual_bytes': info.get('actual-size', st.st_blocks * 512),
+                'format': info.get('format')}
+    logger.debug('qemu-img info %s falhou: %s' % (path, error.strip()))
+    return {'virtual_bytes': st.st_size, 'actual_bytes': st.st_blocks * 512, 'format': None}
+
+
+# ================================================================
+# class KVMInventory
+# ================================================================
+class KVMInventory:
+    '''
+    Inventário dos recursos alocados às VMs do host.
+    Uso típico:
+
+        inventory = KVMInventory().collect()
+        for vm in inventory['vms']:
+            print vm['name'], vm['vcpus'], vm['memory_gb'], vm['disk_gb']
+        print inventory['totals']['vcpus']
+    '''
+    def __init__(self, cache_file=DEFAULT_CACHE, workers=8):
+        '''
+        @param cache_file  - arquivo JSON com as informações das imagens (None desliga o cache).
+        @param workers     - imagens inspecionadas em paralelo.
+        '''
+        self.cache_file = cache_file
+        self.workers = max(1, workers)
+        self.cache = {}
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file) as f:
+                    self.cache = json.load(f)
+            except ValueError:
+                logger.debug('Cache %s inválido, descartado' % cache_file)
+
+    def save_cache(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file + '.part', 'w') as f:
+                json.dump(self.cache, f)
+            os.rename(self.cache_file + '.part', self.cache_file)
+        except (IOError, OSError) as e:
+            logger.debug('Não foi possível gravar o cache %s: %s' % (self.cache_file, e))
+
+    def lookup(self, path):
+        '''
+        Informações da imagem, relidas apenas se o mtime ou o tamanho mudaram.
+        '''
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = [st.st_mtime, st.st_size]
+        cached = self.cache.get(path)
+        if cached is not None and cached['key'] == key:
+            return cached['info']
+        info = image_info(path)
+        self.cache[path] = {'key': key, 'info': info}
+        return info
+
+    def collect(self):
+        '''
+        @returns - dicionário com host, vms e totals.
+        '''
+        stats = domain_stats()
+        vms = []
+        pending = []
+        for name in sorted(stats):
+            s = stats[name]
+            vm = {
+                'name': name,
+                'state': STATES[s.get('state.state', 0)] if s.get('state.state', 0) < len(STATES) else 'unknown',
+                'vcpus': s.get('vcpu.current', s.get('vcpu.maximum', 0)),
+                'memory_gb': round(s.get('balloon.maximum', 0) / 1024.0 / 1024.0, 2),
+                'disks': [],
+            }
+            for i in range(s.get('block.count', 0)):
+                path = s.get('block.%d.path' % i)
+                if not path:
+                    continue    # CD-ROM vazio
+                disk = {'target': s.get('block.%d.name' % i), 'path': path,
+                        'virtual_bytes': s.get('block.%d.capacity' % i),
+                        'actual_bytes': s.get('block.%d.allocation' % i)}
+                vm['disks'].append(disk)
+                # VMs ligadas já informam o tamanho; as demais são lidas em paralelo
+                if disk['virtual_bytes'] is None:
+                    pending.append(disk)
+            vms.append(vm)
+
+        pool = ThreadPool(self.workers)
+        try:
+            for disk, info in zip(pending, pool.map(self.lookup, [d['path'] for d in pending])):
+                disk.update(info or {'virtual_bytes': 0, 'actual_bytes': 0})
+        finally:
+            pool.close()
+            pool.join()
+        self.save_cache()
+
+        for vm in vms:
+            vm['disk_gb'] = round(sum(d['virtual_bytes'] or 0 for d in vm['disks']) / GB, 2)
+        return {'host': host_resources(), 'vms': vms, 'totals': {
+            'vcpus': sum(vm['vcpus'] for vm in vms),
+            'memory_gb': round(sum(vm['memory_gb'] for vm in vms), 2),
+            'disk_gb': round(sum(vm['disk_gb'] for vm in vms), 2),
+        }}
+
+
+def host_resources():
+    '''
+    @returns - CPUs e memória total do host (GB).
+    '''
+    mem_kb = 0
+    with open('/proc/meminfo') as f:
+        for line in f:
+            if line.startswith('MemTotal:'):
+                mem_kb = int(line.split()[1])
+                break
+    return {'cpus': multiprocessing.cpu_count(), 'memory_gb': round(mem_kb / 1024.0 / 1024.0, 2)}
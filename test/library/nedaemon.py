@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe mantém o backupNE.py residente: agenda o backup de cada NE pelo
+seu próprio intervalo e atende pedidos de backup imediato recebidos num socket
+Unix local, sem pagar a inicialização do interpretador, a leitura do INI e os
+handshakes SSH a cada execução.
+
+Protocolo do socket (uma linha por pedido, uma linha de resposta):
+
+    backup <seção>   ->  OK <mensagem> | ERRO <mensagem>
+    status           ->  uma linha por NE: <seção> <próximo backup> <último resultado>
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import logging
+import os
+import socket
+import threading
+import time
+
+try:
+    import SocketServer as socketserver
+except ImportError:
+    import socketserver
+
+# Nova tentativa após falha, em segundos (ou o intervalo do NE, se menor)
+RETRY_INTERVAL = 300
+
+
+def _native(data):
+    return data if isinstance(data, str) else data.decode('utf-8')
+
+
+def request_backup(socket_path, host, timeout=300):
+    '''
+    request_backup - função para pedir ao daemon o backup imediato de um NE
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param socket_path - socket Unix do daemon
+      @param host        - seção do NE no arquivo INI ('status' lista o agendamento)
+      @param timeout     - segundos aguardando a resposta
+      @returns - resposta do daemon
+    '''
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        line = 'status\n' if host == 'status' else 'backup %s\n' % host
+        sock.sendall(line if isinstance(line, bytes) else line.encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+        return _native(b''.join(chunks)).strip()
+    finally:
+        sock.close()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # Texto nativo (bytes no python 2, unicode no 3), como as mensagens do backupNE.py
+        line = _native(self.rfile.readline()).strip()
+        reply = self.server.owner.command(line) + '\n'
+        self.wfile.write(reply if isinstance(reply, bytes) else reply.encode('utf-8'))
+
+
+# ================================================================
+# class BackupDaemon
+# ================================================================
+class BackupDaemon:
+    '''
+    Agendador residente dos backups de NEs.
+    Uso típico:
+
+        daemon = BackupDaemon(backup, '/home/goku/scripts/backupNE.sock')
+        daemon.schedule('SW1-TI', 1440 * 60, last=catalog.latest_good('ne', 'SW1-TI')['created'])
+        daemon.serve_forever()          # até daemon.stop() (ex: no SIGTERM)
+
+    onde backup(host) executa o backup e retorna (True|False, mensagem).
+    '''
+    def __init__(self, backup, socket_path):
+        '''
+        @param backup       - função chamada com a seção do NE, retorna (sucesso, mensagem).
+        @param socket_path  - socket Unix dos pedidos de backup imediato.
+        '''
+        self.backup = backup
+        self.socket_path = socket_path
+        self.intervals = {}
+        self.due = {}
+        self.results = {}
+        self.locks = {}
+        self.server = None
+        self._wakeup = threading.Event()
+        self._running = False
+
+        # Conecta o logger ao módulo raiz (script que chama a classe)
+        self.logger = logging.getLogger('root')
+        # Define métodos para chamada do logger
+        self.info = self.logger.info
+        self.debug = self.logger.debug
+        self.error = self.logger.error
+
+    def schedule(self, host, interval, last=None):
+        '''
+        Agenda o NE. O primeiro backup é feito um intervalo após o último backup
+        registrado (ou imediatamente, se não houver), de forma que reiniciar o
+        daemon não refaz os backups ainda válidos.
+
+        @param interval  - segundos entre backups.
+        @param last      - data (epoch) do último backup bem-sucedido.
+        '''
+        self.intervals[host] = interval
+        self.due[host] = (last or 0) + interval
+        self.locks.setdefault(host, threading.Lock())
+        self._wakeup.set()
+
+    def unschedule(self, host):
+        self.intervals.pop(host, None)
+        self.due.pop(host, None)
+        self.results.pop(host, None)
+
+    def run(self, host):
+        '''
+        Executa o backup do NE, serializado com outros pedidos para o mesmo NE.
+
+        @returns (sucesso, mensagem)
+        '''
+        with self.locks[host]:
+            started = time.time()
+            try:
+                ok, msg = self.backup(host)
+            except Exception as e:
+                self.error('Falha inesperada no backup do NE %s' % host, exc_info=True)
+                ok, msg = False, str(e)
+            self.results[host] = (time.time(), ok, msg)
+            if host in self.intervals:
+                retry = self.intervals[host] if ok else min(RETRY_INTERVAL, self.intervals[host])
+                self.due[host] = time.time() + retry
+            self.debug('Backup do NE %s: %s em %.2fs' % (host, msg, time.time() - started))
+            return ok, msg
+
+    def command(self, line):
+        '''
+        Atende um pedido recebido no socket.
+        '''
+        parts = line.split(None, 1)
+        if parts == ['status']:
+            lines = []
+            for host in sorted(self.intervals):
+                when, ok, msg = self.results.get(host, (None, None, '-'))
+                lines.append('%s %s %s' % (host, time.strftime('%Y-%m-%d %H:%M', time.localtime(self.due[host])),
+                                           msg if ok is None else ('OK ' if ok else 'ERRO ') + msg))
+            return '\n'.join(lines) or 'nenhum NE agendado'
+        if len(parts) != 2 or parts[0] != 'backup':
+            return 'ERRO pedido inválido: %s' % line
+        host = parts[1]
+        if host not in self.intervals:
+            return 'ERRO NE desconhecido: %s' % host
+        self.info('Backup imediato do NE %s solicitado via socket' % host)
+        ok, msg = self.run(host)
+        return ('OK ' if ok else 'ERRO ') + msg
+
+    def start_server(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server = _Server(self.socket_path, _Handler)
+        self.server.owner = self
+        os.chmod(self.socket_path, 0o600)
+        thread = threading.Thread(target=self.server.serve_forever, name='backupNE-socket')
+        thread.daemon = True
+        thread.start()
+        self.info('Aguardando pedidos em %s' % self.socket_path)
+
+    def serve_forever(self):
+        '''
+        Executa os backups agendados até stop().
+        '''
+        self.start_server()
+        self._running = True
+        try:
+            while self._running:
+                now = time.time()
+                pending = sorted((due, host) for host, due in list(self.due.items()) if due <= now)
+                for due, host in pending:
+                    if not self._running:
+                        break
+                    self.run(host)
+                if pending:
+                    continue
+                self._wakeup.clear()
+                next_due = min(list(self.due.values()) or [now + 3600])
+                self._wakeup.wait(max(0.1, next_due - time.time()))
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.info('Daemon finalizado')
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
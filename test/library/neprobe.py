@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  neprobe.py - biblioteca da sondagem de alteração dos NEs (probe_command do backupNE.py).
+
+  A sondagem executa um comando curto no NE (commit, data da última alteração,
+  checksum) e o sha256 da saída é o marcador de alteração: marcador igual ao do
+  último backup dispensa a transferência da configuração completa. Uma saída que
+  não é confiável (status diferente de zero, vazia, com erro ou timeout) não gera
+  marcador, e a configuração é transferida.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import hashlib
+import logging
+import re
+
+# Conecta o logger ao módulo raiz (script que chama a classe)
+logger = logging.getLogger('root')
+
+# Linhas de saída que indicam erro do NE (em vez de um marcador)
+PROBE_ERROR = re.compile(r'^\s*(%|\^|error|erro|invalid|unknown|syntax error|command not found)', re.I | re.M)
+# Prompt do NE ao final da saída de uma sessão com terminal (type_cmd 0)
+PROBE_PROMPT = re.compile(r'^\S*[#>] ?$')
+# Dias sem transferir a configuração completa, mesmo com o marcador inalterado
+PROBE_MAX_DAYS = 7
+
+
+def command_failed(output):
+    '''
+    command_failed - função para identificar a saída de um comando que não terminou
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param output - saída do MySSH (o timeout e a falha de conexão são anexados como "ERRO: ...")
+      @returns True se a saída está incompleta ou é uma mensagem de erro
+    '''
+    return 'ERRO:' in output
+
+
+def strip_session(output, command):
+    '''
+    strip_session - função para isolar a saída de um comando numa sessão com terminal
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param output  - saída da sessão: banner, prompt com o eco do comando, saída e prompt final
+      @param command - comando enviado
+      @returns - linhas entre o eco do comando e o prompt final ou None se algum deles falta
+    '''
+    lines = [l.rstrip() for l in output.replace('\r', '').split('\n')]
+    echo = [i for i, l in enumerate(lines) if l.endswith(command.strip())]
+    while lines and not lines[-1].strip():
+        lines.pop()
+    if not echo or not lines or echo[-1] == len(lines) - 1 or not PROBE_PROMPT.match(lines[-1]):
+        return None
+    return '\n'.join(lines[echo[-1] + 1:-1])
+
+
+def probe_marker(ssh, host, probe_command, type_cmd, timeout):
+    '''
+    probe_marker - função para executar a sondagem de alteração do NE
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      NE tipo 1: o comando é executado sem terminal, e a saída é só a do comando.
+      NE tipo 0: o comando é enviado à sessão com terminal; o banner, o eco do comando
+      e o prompt final são removidos e apenas a saída entre eles compõe o marcador.
+
+      @param ssh - objeto MySSH conectado
+      @returns marker - sha256 da saída da sondagem ou None se ela não é confiável
+                        (status diferente de zero, saída vazia, erro ou timeout)
+    '''
+    if type_cmd:
+        status, output = ssh.run(probe_command, timeout=timeout, pty=False)
+    else:
+        # A sessão é encerrada ao encontrar o prompt, sem status de saída (-1)
+        status, output = ssh.run(probe_command, probe_command, timeout, pty=True)
+    if command_failed(output) or (type_cmd and status != 0):
+        logger.info('Sondagem do NE %s falhou (status %d)' % (host, status))
+        return None
+    if not type_cmd:
+        output = strip_session(output, probe_command)
+        if output is None:
+            logger.info('Sondagem do NE %s sem eco do comando ou sem prompt final' % host)
+            return None
+    output = output.strip()
+    if not output or PROBE_ERROR.search(output):
+        logger.info('Sondagem do NE %s sem marcador válido: %r' % (host, output[:80]))
+        return None
+    if not isinstance(output, bytes):
+        output = output.encode('utf-8')
+    return hashlib.sha256(output).hexdigest()
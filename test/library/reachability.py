@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  reachability.py - biblioteca de teste de alcance (TCP) e timeouts adaptativos dos NEs.
+
+  O teste abre conexões TCP não bloqueantes para todos os endereço:porta de uma vez
+  e aguarda as respostas num único select, de forma que um NE fora do ar custa no
+  máximo o timeout do teste, em paralelo com os demais, e não um timeout de conexão
+  SSH inteiro. As latências observadas (conexão SSH e comandos) são guardadas em
+  JSON entre as execuções e os timeouts de cada NE passam a ser
+  max(timeout configurado, p99 das latências x margem).
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import errno
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+
+# Conecta o logger ao módulo raiz (script que chama a classe)
+logger = logging.getLogger('root')
+
+DEFAULT_SCAN_TIMEOUT = 1.0
+
+
+def scan(targets):
+    '''
+    scan - função para testar o alcance TCP de vários endereços ao mesmo tempo
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param targets - lista de (nome, endereço, porta, timeout em segundos)
+      @returns - dicionário nome -> (latência em segundos ou None, erro ou None)
+    '''
+    results = {}
+    pending = {}
+    for name, address, port, limit in targets:
+        try:
+            family, socktype, proto, _, sockaddr = socket.getaddrinfo(address, port, 0, socket.SOCK_STREAM)[0]
+            sock = socket.socket(family, socktype, proto)
+        except socket.error as e:
+            results[name] = (None, str(e))
+            continue
+        sock.setblocking(0)
+        started = time.time()
+        err = sock.connect_ex(sockaddr)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+            results[name] = (None, os.strerror(err))
+            sock.close()
+            continue
+        pending[sock] = (name, started, started + limit)
+
+    while pending:
+        now = time.time()
+        for sock, (name, started, deadline) in list(pending.items()):
+            if now >= deadline:
+                results[name] = (None, 'timeout após %.1fs' % (deadline - started))
+                sock.close()
+                del pending[sock]
+        if not pending:
+            break
+        wait = min(deadline for _, _, deadline in pending.values()) - now
+        _, writable, failed = select.select([], list(pending), list(pending), max(0, wait))
+        for sock in set(writable) | set(failed):
+            name, started, _ = pending.pop(sock)
+            err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err == 0:
+                results[name] = (time.time() - started, None)
+            else:
+                results[name] = (None, os.strerror(err))
+            sock.close()
+    return results
+
+
+# ================================================================
+# class LatencyHistory
+# ================================================================
+class LatencyHistory:
+    '''
+    Latências recentes por NE e timeouts derivados delas.
+    Uso típico:
+
+        history = LatencyHistory('/home/goku/scripts/latency.json')
+        timeout = history.timeout('SW1-TI', 'command', 10)
+        history.add('SW1-TI', 'command', 2.4)
+        history.save()
+    '''
+    def __init__(self, path, samples=50, margin=3.0, ceiling=300):
+        '''
+        @param path     - arquivo JSON das latências (criado no primeiro save).
+        @param samples  - amostras mantidas por NE e tipo.
+        @param margin   - multiplicador aplicado ao p99.
+        @param ceiling  - limite superior dos timeouts calculados, em segundos.
+        '''
+        self.path = path
+        self.samples = samples
+        self.margin = margin
+        self.ceiling = ceiling
+        self.data = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.data = json.load(f)
+            except ValueError:
+                logger.error('Histórico de latências %s inválido, descartado' % path)
+
+    def add(self, host, kind, seconds):
+        '''
+        @param kind  - tcp | connect (conexão SSH) | command.
+        '''
+        with self._lock:
+            values = self.data.setdefault(host, {}).setdefault(kind, [])
+            values.append(round(seconds, 3))
+            del values[:-self.samples]
+
+    def percentile(self, host, kind, p=0.99):
+        values = sorted(self.data.get(host, {}).get(kind, []))
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(p * len(values)))]
+
+    def timeout(self, host, kind, configured):
+        '''
+        @returns - max(configured, p99 x margem), limitado ao teto (ou ao configurado, se maior).
+        '''
+        p99 = self.percentile(host, kind)
+        if p99 is None:
+            return configured
+        return max(configured, min(self.ceiling, p99 * self.margin))
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.data, sort_keys=True)
+        try:
+            with open(self.path + '.part', 'w') as f:
+                f.write(data)
+            os.rename(self.path + '.part', self.path)
+        except (IOError, OSError) as e:
+            logger.error('Não foi possível gravar o histórico de latências %s: %s' % (self.path, e))
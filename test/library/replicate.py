@@ -0,0 +1,443 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe replica os backups registrados no catálogo (VMs e NEs) para um
+servidor remoto por SFTP.
+
+Cada arquivo é dividido em blocos de tamanho fixo identificados pelo SHA-256 e
+gravados uma única vez no servidor remoto; blocos que o servidor já tem (de
+outro backup ou de uma execução anterior) não são reenviados. Os blocos são
+enviados por várias conexões SSH em paralelo, para ocupar o link WAN, e
+gravados como <bloco>.part: uma execução interrompida continua do ponto em que
+parou. Cada arquivo é lido uma única vez: o SHA-256 de cada bloco e o do arquivo
+são calculados durante a leitura que alimenta o envio. Cada bloco é conferido no
+servidor (sha256sum) antes de ser renomeado, e o backup só é dado como replicado
+(manifesto gravado) se o arquivo confere com o checksum gravado no catálogo.
+
+Layout no servidor remoto:
+
+    <remote_dir>/chunks/<aa>/<sha256>                    - blocos
+    <remote_dir>/manifests/<tipo>/<origem>/<nome>.json   - arquivos e blocos de cada backup
+
+O manifesto é gravado por último: a sua presença indica backup replicado por completo.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import collections
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import threading
+import time
+import paramiko
+from multiprocessing.pool import ThreadPool
+from backupstream import BLOCK_SIZE, MANIFEST_SUFFIX, read_manifest
+from iogovernor import MB, TokenBucket
+
+try:
+    from shlex import quote
+except ImportError:
+    from pipes import quote
+
+# Tentativas de envio de cada bloco (as seguintes continuam do .part)
+ATTEMPTS = 3
+
+
+class ReplicationError(Exception):
+    '''
+    Falha de envio ou de conferência de um bloco ou arquivo.
+    '''
+    pass
+
+
+# ================================================================
+# class Replicator
+# ================================================================
+class Replicator:
+    '''
+    Réplica externa dos backups do catálogo.
+    Uso típico:
+
+        replicator = Replicator(BackupCatalog(path), config.replica, ChunkStore(root))
+        summary = replicator.run()
+        print summary['artifacts'], summary['sent_bytes'], summary['failed']
+        replicator.restore('vm', 'VMSnipeit', 'VMSnipeit-full-20261019_030000', '/tmp/restore')
+        replicator.close()
+    '''
+    def __init__(self, catalog, replica, chunk_store=None):
+        '''
+        @param catalog      - BackupCatalog com os backups a replicar.
+        @param replica      - ReplicaConfig (servidor, diretório remoto, conexões, blocos).
+        @param chunk_store  - ChunkStore dos backups com store: chunks (opcional).
+        '''
+        self.catalog = catalog
+        self.replica = replica
+        self.chunk_store = chunk_store
+        self.chunk_size = replica.chunk_mb * MB
+        self.bucket = TokenBucket(replica.rate_limit * MB)
+        self.known = set()
+        self._dirs = set()
+        self._digest_locks = {}
+        self._clients = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._remote_hash = True
+        self._gate = None
+
+        # Conecta o logger ao módulo raiz (script que chama a classe)
+        self.logger = logging.getLogger('root')
+        # Define métodos para chamada do logger
+        self.info = self.logger.info
+        self.debug = self.logger.debug
+        self.error = self.logger.error
+
+    def _session(self):
+        '''
+        @returns (SSHClient, SFTPClient) da thread atual, reconectando se necessário.
+        '''
+        client = getattr(self._local, 'client', None)
+        if client is None or not client.get_transport() or not client.get_transport().is_active():
+            # Como o MySSH.connect, mas sem compressão: os backups já estão compactados
+            client = paramiko.SSHClient()
+            client.load_system_host_keys()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(hostname=self.replica.host, port=self.replica.port, username=self.replica.user,
+                           key_filename=self.replica.keyfilename, timeout=30, compress=False)
+            client.get_transport().set_keepalive(30)
+            self._local.client = client
+            self._local.sftp = client.open_sftp()
+            with self._lock:
+                self._clients.append(client)
+        return client, self._local.sftp
+
+    def _drop_session(self):
+        client = getattr(self._local, 'client', None)
+        if client is not None:
+            client.close()
+        self._local.client = None
+
+    def close(self):
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients = []
+
+    def _remote(self, *parts):
+        return posixpath.join(self.replica.remote_dir, *parts)
+
+    def chunk_path(self, digest):
+        return self._remote('chunks', digest[:2], digest)
+
+    def manifest_path(self, kind, source, name):
+        return self._remote('manifests', kind, source, name + '.json')
+
+    def _makedirs(self, sftp, path):
+        if path in self._dirs or path in ('', '/'):
+            return
+        self._makedirs(sftp, posixpath.dirname(path))
+        try:
+            sftp.mkdir(path)
+        except IOError:
+            sftp.stat(path)         # já existe (ou erro real, propagado pelo stat)
+        with self._lock:
+            self._dirs.add(path)
+
+    def _remote_sha256(self, client, path):
+        '''
+        @returns SHA-256 do arquivo calculado no servidor ou None se o servidor não tem shell (só SFTP).
+        '''
+        if not self._remote_hash:
+            return None
+        stdin, stdout, stderr = client.exec_command('sha256sum %s' % quote(path), timeout=600)
+        output = stdout.read()
+        if stdout.channel.recv_exit_status() != 0 or not output:
+            self.error('sha256sum indisponível em %s, blocos conferidos apenas pelo tamanho' % self.replica.host)
+            self._remote_hash = False
+            return None
+        return output.split()[0].decode('ascii')
+
+    def load_index(self):
+        '''
+        Lista os blocos já presentes no servidor remoto.
+        '''
+        client, sftp = self._session()
+        root = self._remote('chunks')
+        try:
+            buckets = sftp.listdir(root)
+        except IOError:
+            buckets = []
+        for bucket in buckets:
+            self.known.update(f for f in sftp.listdir(posixpath.join(root, bucket)) if not f.endswith('.part'))
+            self._dirs.add(posixpath.join(root, bucket))
+        self.info('Réplica: %d blocos já presentes em %s:%s' % (len(self.known), self.replica.host, root))
+
+    def artifact_files(self, row):
+        '''
+        @returns - arquivos locais de um backup: o artefato, o manifesto do .gz e, nos
+                   backups do repositório de blocos, os blocos referenciados.
+        '''
+        if row['store'] == 'chunks':
+            if self.chunk_store is None:
+                raise ReplicationError('repositório de blocos não informado para %s' % row['name'])
+            with open(row['path']) as f:
+                digests = sorted(set(d for d in json.load(f)['chunks'] if d))
+            return [row['path']] + [self.chunk_store.chunk_path(d) for d in digests]
+        files = [row['path']]
+        if os.path.isfile(row['path'] + MANIFEST_SUFFIX):
+            files.append(row['path'] + MANIFEST_SUFFIX)
+        return files
+
+    def expected_sha256(self, row):
+        '''
+        @returns - checksum gravado do artefato (catálogo ou manifesto do .gz) ou None.
+        '''
+        if row['artifact_sha256']:
+            return row['artifact_sha256']
+        if row['store'] == 'file':          # configuração de NE: gravada sem compressão
+            return row['sha256']
+        if row['store'] == 'gzip':
+            return (read_manifest(row['path']) or {}).get('artifact_sha256')
+        return None
+
+    def split(self, path, send):
+        '''
+        Lê o arquivo uma única vez, em blocos: cada bloco é entregue a send(dados, sha256)
+        assim que lido, e o SHA-256 do arquivo é calculado na mesma leitura.
+
+        @param send  - função chamada com os dados e o SHA-256 de cada bloco.
+        @returns dicionário com path, size, sha256 e chunks [sha256 de cada bloco]
+        '''
+        whole = hashlib.sha256()
+        chunks = []
+        size = 0
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                digest = hashlib.sha256(data).hexdigest()
+                whole.update(data)
+                chunks.append(digest)
+                size += len(data)
+                send(data, digest)
+        return {'path': path, 'size': size, 'sha256': whole.hexdigest(), 'chunks': chunks}
+
+    def _digest_lock(self, digest):
+        with self._lock:
+            return self._digest_locks.setdefault(digest, threading.Lock())
+
+    def upload(self, data, digest, path=''):
+        '''
+        Envia um bloco, continuando o .part de uma tentativa anterior, e confere o
+        checksum no servidor antes de renomeá-lo.
+
+        @param data    - conteúdo do bloco.
+        @param digest  - SHA-256 do bloco.
+        @param path    - arquivo de origem (apenas para o log).
+        @returns bytes enviados (0 se o servidor já tinha o bloco).
+        '''
+        with self._digest_lock(digest):
+            if digest in self.known:
+                return 0
+            sent = 0
+            for attempt in range(1, ATTEMPTS + 1):
+                try:
+                    sent += self._upload(data, digest)
+                    break
+                except (IOError, EOFError, paramiko.SSHException, ReplicationError) as e:
+                    self.error('Réplica: bloco %s de %s, tentativa %d: %s' % (digest[:12], path, attempt, e))
+                    self._drop_session()
+                    if attempt == ATTEMPTS:
+                        raise
+            with self._lock:
+                self.known.add(digest)
+            return sent
+
+    def _upload(self, data, digest):
+        client, sftp = self._session()
+        final = self.chunk_path(digest)
+        part = final + '.part'
+        length = len(data)
+        self._makedirs(sftp, posixpath.dirname(final))
+        try:
+            done = sftp.stat(part).st_size
+        except IOError:
+            done = 0
+        if done > length:
+            done = 0
+        if done:
+            self.info('Réplica: retomando bloco %s em %d de %d bytes' % (digest[:12], done, length))
+        with sftp.open(part, 'r+' if done else 'w') as dst:
+            dst.set_pipelined(True)
+            dst.seek(done)
+            for offset in range(done, length, BLOCK_SIZE):
+                piece = data[offset:offset + BLOCK_SIZE]
+                self.bucket.consume(len(piece))
+                dst.write(piece)
+        remote = self._remote_sha256(client, part)
+        if remote is None:
+            if sftp.stat(part).st_size != length:
+                sftp.remove(part)
+                raise ReplicationError('tamanho divergente no servidor')
+        elif remote != digest:
+            sftp.remove(part)
+            raise ReplicationError('checksum divergente no servidor')
+        sftp.posix_rename(part, final)
+        return length - done
+
+    def submit(self, row, pool):
+        '''
+        Lê os arquivos do backup e entrega os blocos às conexões paralelas à medida que
+        são lidos (no máximo channels + 1 blocos em memória). O artefato é conferido contra
+        o checksum gravado ao fim da leitura; se divergir, o backup não é replicado (os
+        blocos já enviados ficam no servidor sem manifesto).
+
+        @returns (lista de arquivos (ver split), resultados dos envios)
+        '''
+        results = []
+
+        def send(data, digest):
+            self._gate.acquire()
+            try:
+                results.append(pool.apply_async(self._send, (data, digest, path)))
+            except Exception:
+                self._gate.release()
+                raise
+
+        files = []
+        for path in self.artifact_files(row):
+            if not os.path.isfile(path):
+                raise ReplicationError('%s não encontrado' % path)
+            files.append(self.split(path, send))
+        expected = self.expected_sha256(row)
+        if expected is not None and files[0]['sha256'] != expected:
+            raise ReplicationError('checksum de %s diverge do catálogo, backup não replicado' % row['path'])
+        return files, results
+
+    def _send(self, data, digest, path):
+        try:
+            return self.upload(data, digest, path)
+        finally:
+            self._gate.release()
+
+    def _write_manifest(self, row, files):
+        client, sftp = self._session()
+        path = self.manifest_path(row['kind'], row['source'], row['name'])
+        self._makedirs(sftp, posixpath.dirname(path))
+        manifest = {
+            'kind': row['kind'],
+            'source': row['source'],
+            'name': row['name'],
+            'store': row['store'],
+            'created': row['created'],
+            'replicated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'files': [{'path': f['path'], 'size': f['size'], 'sha256': f['sha256'],
+                       'chunks': f['chunks']} for f in files],
+        }
+        with sftp.open(path + '.part', 'w') as f:
+            f.write(json.dumps(manifest).encode('utf-8'))
+        sftp.posix_rename(path + '.part', path)
+
+    def run(self, kind=None, until=None):
+        '''
+        Replica os backups válidos ainda não replicados, dos mais antigos aos mais novos.
+        Os blocos de vários backups são enviados ao mesmo tempo pelas conexões paralelas.
+
+        @param kind   - vm | ne (padrão: ambos).
+        @param until  - data (epoch) após a qual nenhum backup novo é iniciado.
+        @returns - Counter com artifacts, sent_bytes, skipped_bytes, failed e deferred.
+        '''
+        rows = self.catalog.pending_replication(kind)
+        summary = collections.Counter()
+        self.info('Réplica: %d backups pendentes' % len(rows))
+        if not rows:
+            return summary
+        try:
+            self.load_index()
+        except (IOError, EOFError, paramiko.SSHException) as e:
+            raise ReplicationError('conexão com %s falhou: %s' % (self.replica.host, e))
+        pool = ThreadPool(self.replica.channels)
+        self._gate = threading.BoundedSemaphore(self.replica.channels + 1)
+        pending = collections.deque()
+        started = time.time()
+        try:
+            for i, row in enumerate(rows):
+                if until is not None and time.time() > until:
+                    summary['deferred'] = len(rows) - i
+                    self.info('Réplica: horário limite atingido, %d backups adiados' % summary['deferred'])
+                    break
+                try:
+                    files, results = self.submit(row, pool)
+                except (IOError, OSError, ValueError, ReplicationError) as e:
+                    self.error('Réplica de %s: %s' % (row['name'], e))
+                    summary['failed'] += 1
+                    continue
+                pending.append((row, files, results))
+                # Mantém no máximo 2 backups por conexão em andamento
+                while pending and (len(pending) > 2 * self.replica.channels or all(r.ready() for r in pending[0][2])):
+                    self._finish(pending.popleft(), summary)
+            while pending:
+                self._finish(pending.popleft(), summary)
+        finally:
+            pool.close()
+            pool.join()
+        elapsed = max(time.time() - started, 0.001)
+        self.info('Réplica: %d backups, %s MB enviados (%.1f MB/s), %s MB já presentes, %d falhas'
+                  % (summary['artifacts'], summary['sent_bytes'] // MB, summary['sent_bytes'] / MB / elapsed,
+                     summary['skipped_bytes'] // MB, summary['failed']))
+        return summary
+
+    def _finish(self, item, summary):
+        row, files, results = item
+        sent = 0
+        try:
+            for r in results:
+                sent += r.get()
+            self._write_manifest(row, files)
+        except (IOError, EOFError, paramiko.SSHException, ReplicationError) as e:
+            self.error('Réplica de %s: %s' % (row['name'], e))
+            summary['failed'] += 1
+            return
+        self.catalog.record_replicated(row['id'])
+        total = sum(f['size'] for f in files)
+        summary['artifacts'] += 1
+        summary['sent_bytes'] += sent
+        summary['skipped_bytes'] += total - sent
+        self.debug('Réplica de %s: %d de %d bytes enviados' % (row['name'], sent, total))
+
+    def restore(self, kind, source, name, target):
+        '''
+        Remonta os arquivos de um backup replicado em target (mantendo os caminhos
+        originais abaixo dele) e confere o SHA-256 de cada arquivo.
+
+        @returns lista dos arquivos restaurados.
+        '''
+        client, sftp = self._session()
+        with sftp.open(self.manifest_path(kind, source, name)) as f:
+            manifest = json.loads(f.read().decode('utf-8'))
+        restored = []
+        for entry in manifest['files']:
+            path = os.path.join(target, entry['path'].lstrip('/'))
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            digest = hashlib.sha256()
+            with open(path, 'wb') as outfile:
+                for chunk in entry['chunks']:
+                    with sftp.open(self.chunk_path(chunk)) as f:
+                        f.prefetch()
+                        data = f.read()
+                    if hashlib.sha256(data).hexdigest() != chunk:
+                        raise ReplicationError('bloco %s corrompido no servidor' % chunk)
+                    digest.update(data)
+                    outfile.write(data)
+            if digest.hexdigest() != entry['sha256']:
+                raise ReplicationError('checksum divergente na restauração de %s' % entry['path'])
+            restored.append(path)
+        self.info('Réplica: %s restaurado em %s (%d arquivos)' % (name, target, len(restored)))
+        return restored
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe reverifica os backups armazenados (scrub) a partir do catálogo.
+
+Os artefatos .gz de VMs e as configurações de NEs são relidos em paralelo e
+comparados com o SHA-256 gravado na escrita; os blocos do repositório deduplicado
+são conferidos uma única vez cada. A leitura é limitada por um token bucket e
+feita com prioridade de I/O idle, para não disputar o disco com as VMs. O
+resultado de cada verificação fica no catálogo (verified, verify_status).
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import collections
+import hashlib
+import logging
+import os
+import zlib
+from multiprocessing.pool import ThreadPool
+from backupstream import BLOCK_SIZE, read_manifest
+from iogovernor import TokenBucket, set_io_priority
+
+
+# ================================================================
+# class Scrubber
+# ================================================================
+class Scrubber:
+    '''
+    Verificação periódica dos backups registrados no catálogo.
+    Uso típico:
+
+        scrubber = Scrubber(BackupCatalog(path), ChunkStore(root), workers=4, read_rate=50 * MB)
+        summary = scrubber.run(interval_days=7)
+        print summary['corrupt'], summary['missing']
+    '''
+    def __init__(self, catalog, chunk_store=None, workers=2, read_rate=0, deep=False):
+        '''
+        @param catalog      - BackupCatalog com os backups a verificar.
+        @param chunk_store  - ChunkStore dos backups com store: chunks (opcional).
+        @param workers      - arquivos verificados em paralelo.
+        @param read_rate    - bytes/s lidos no total (0 = sem limite).
+        @param deep         - também descompacta os .gz e confere o SHA-256 da imagem.
+        '''
+        self.catalog = catalog
+        self.chunk_store = chunk_store
+        self.workers = max(1, workers)
+        self.bucket = TokenBucket(read_rate)
+        self.deep = deep
+
+        # Conecta o logger ao módulo raiz (script que chama a classe)
+        self.logger = logging.getLogger('root')
+        # Define métodos para chamada do logger
+        self.info = self.logger.info
+        self.debug = self.logger.debug
+        self.error = self.logger.error
+
+    def _read(self, f, size):
+        data = f.read(size)
+        self.bucket.consume(len(data))
+        return data
+
+    def check_file(self, row):
+        '''
+        Relê um artefato e compara com o checksum da escrita (catálogo ou manifesto).
+
+        @returns (situação, sha256 lido, bytes lidos)
+        '''
+        path = row['path']
+        if not os.path.isfile(path):
+            return 'missing', None, 0
+        manifest = read_manifest(path) if row['store'] == 'gzip' else None
+        expected = row['artifact_sha256'] or (manifest or {}).get('artifact_sha256')
+        members = (manifest or {}).get('members') if self.deep else None
+        digest = hashlib.sha256()
+        image = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, 'rb') as f:
+                if members:
+                    # Uma única leitura: checksum do .gz e, descompactando cada membro, da imagem
+                    for n in members:
+                        data = self._read(f, n)
+                        digest.update(data)
+                        image.update(zlib.decompress(data, 16 + zlib.MAX_WBITS))
+                        size += len(data)
+                    data = f.read()
+                    digest.update(data)
+                    size += len(data)
+                else:
+                    for data in iter(lambda: self._read(f, BLOCK_SIZE), b''):
+                        digest.update(data)
+                        size += len(data)
+        except (IOError, OSError, zlib.error) as e:
+            self.error('Falha ao ler %s: %s' % (path, e))
+            return 'corrupt', None, size
+        if expected is not None and digest.hexdigest() != expected:
+            return 'corrupt', digest.hexdigest(), size
+        if members and image.hexdigest() != (row['sha256'] or manifest.get('source_sha256')):
+            return 'corrupt', digest.hexdigest(), size
+        return 'ok', digest.hexdigest(), size
+
+    def check_chunks(self, rows, bad):
+        '''
+        Verifica os manifestos do repositório de blocos contra os blocos corrompidos.
+
+        @returns lista de (row, situação)
+        '''
+        results = []
+        for row in rows:
+            if not os.path.isfile(row['path']):
+                results.append((row, 'missing'))
+                continue
+            name = os.path.basename(row['path'])[:-5]
+            chunks = set(self.chunk_store.load(name)['chunks'])
+            if self.chunk_store.verify(name):
+                results.append((row, 'missing'))
+            elif chunks & bad:
+                results.append((row, 'corrupt'))
+            else:
+                results.append((row, 'ok'))
+        return results
+
+    def run(self, interval_days=7, kind=None):
+        '''
+        Verifica os backups não verificados nos últimos interval_days dias.
+
+        @returns - Counter com ok, corrupt, missing e bytes lidos.
+        '''
+        set_io_priority('idle', nice=19)
+        due = self.catalog.due_for_scrub(interval_days, kind)
+        files = [r for r in due if r['store'] != 'chunks']
+        chunked = [r for r in due if r['store'] == 'chunks']
+        summary = collections.Counter()
+        self.info('Scrub: %d arquivos e %d backups no repositório de blocos' % (len(files), len(chunked)))
+
+        pool = ThreadPool(self.workers)
+        try:
+            for row, (status, digest, size) in pool.imap_unordered(lambda r: (r, self.check_file(r)), files):
+                self.catalog.record_verify(row['id'], status, digest)
+                self._report(row, status, summary)
+                summary['bytes'] += size
+        finally:
+            pool.close()
+            pool.join()
+
+        if chunked and self.chunk_store is not None:
+            bad = self.chunk_store.scrub(self.workers, self.bucket)
+            for row, status in self.check_chunks(chunked, bad):
+                self.catalog.record_verify(row['id'], status)
+                self._report(row, status, summary)
+        return summary
+
+    def _report(self, row, status, summary):
+        summary[status] += 1
+        if status == 'ok':
+            self.debug('Scrub %s: ok' % row['path'])
+        else:
+            self.error('Scrub %s (%s %s): %s' % (row['path'], row['kind'], row['source'], status))
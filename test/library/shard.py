@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe divide as seções do INI do backupNE.py entre várias instâncias
+(processos no mesmo servidor ou em servidores diferentes com um diretório
+compartilhado), sem dividir o arquivo INI à mão.
+
+Cada instância mantém um arquivo de lease no diretório de coordenação, renovado
+por um heartbeat; as instâncias com lease válido formam um anel de hash
+consistente e cada seção pertence à instância indicada pelo anel. Se uma
+instância para de renovar o lease, as suas seções passam para as demais, movendo
+apenas as seções dela. Um flock por seção impede que duas instâncias copiem o
+mesmo NE durante um rebalanceamento, e um registro por seção (última tentativa)
+faz com que cada NE seja tentado uma única vez por execução: a execução começa no
+início da instância mais antiga do anel (menos o tempo de espera do join), de modo
+que o intervalo do agendamento (cron) não precisa ser informado. Uma janela fixa
+pode ser definida em window.
+
+Layout do diretório de coordenação:
+
+    <dir>/members/<instância>.lease    - JSON com host, pid e heartbeat
+    <dir>/sections/<seção>.lock         - flock durante o backup da seção
+    <dir>/sections/<seção>.json         - última tentativa (instância, data, sucesso)
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import bisect
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+
+def _hash(key):
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+# ================================================================
+# class HashRing
+# ================================================================
+class HashRing:
+    '''
+    Anel de hash consistente.
+    Uso típico:
+
+        ring = HashRing(['srv1:101', 'srv2:202'])
+        print ring.owner('SW1-TI')
+    '''
+    def __init__(self, members, replicas=64):
+        '''
+        @param members   - identificadores das instâncias.
+        @param replicas  - pontos de cada instância no anel (distribuição mais uniforme).
+        '''
+        points = sorted((_hash('%s#%d' % (m, i)), m) for m in members for i in range(replicas))
+        self.keys = [p[0] for p in points]
+        self.members = [p[1] for p in points]
+
+    def owner(self, key):
+        if not self.keys:
+            return None
+        return self.members[bisect.bisect(self.keys, _hash(key)) % len(self.keys)]
+
+
+# ================================================================
+# class ShardCoordinator
+# ================================================================
+class ShardCoordinator:
+    '''
+    Coordenação das instâncias do backupNE.py por leases num diretório compartilhado.
+    Uso típico:
+
+        shard = ShardCoordinator('/opt/backup/shard')
+        shard.join(settle=5)
+        try:
+            shard.run(Config.sections(), lambda host: backup_host(Config, host, catalog)[0])
+        finally:
+            shard.leave()
+    '''
+    def __init__(self, directory, instance=None, ttl=30, window=None):
+        '''
+        @param directory  - diretório de coordenação (local ou compartilhado entre servidores).
+        @param instance   - identificador da instância (padrão: <hostname>:<pid>).
+        @param ttl        - segundos sem heartbeat após os quais a instância é considerada fora.
+        @param window     - segundos em que uma seção tentada não é tentada de novo
+                            (padrão: desde o início da execução atual, ver join).
+        '''
+        self.directory = directory
+        self.instance = instance or '%s:%d' % (socket.gethostname(), os.getpid())
+        self.ttl = ttl
+        self.window = window
+        self.members_dir = os.path.join(directory, 'members')
+        self.sections_dir = os.path.join(directory, 'sections')
+        for d in (self.members_dir, self.sections_dir):
+            if not os.path.isdir(d):
+                try:
+                    os.makedirs(d)
+                except OSError:
+                    if not os.path.isdir(d):
+                        raise
+        self.lease = os.path.join(self.members_dir, self.instance.replace('/', '_') + '.lease')
+        self.started = time.time()
+        self.since = self.started
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Conecta o logger ao módulo raiz (script que chama a classe)
+        self.logger = logging.getLogger('root')
+        # Define métodos para chamada do logger
+        self.info = self.logger.info
+        self.debug = self.logger.debug
+        self.error = self.logger.error
+
+    def _write_json(self, path, data):
+        tmp = '%s.%s.part' % (path, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.rename(tmp, path)
+
+    def _read_json(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def heartbeat(self):
+        self._write_json(self.lease, {'instance': self.instance, 'host': socket.gethostname(),
+                                      'pid': os.getpid(), 'started': self.started, 'heartbeat': time.time()})
+
+    def join(self, settle=0):
+        '''
+        Registra a instância e inicia o heartbeat.
+
+        @param settle  - segundos aguardando as demais instâncias iniciadas pelo mesmo agendamento.
+        '''
+        self.heartbeat()
+
+        def beat():
+            while not self._stop.wait(self.ttl / 3.0):
+                try:
+                    self.heartbeat()
+                except (IOError, OSError) as e:
+                    self.error('Falha ao renovar o lease %s: %s' % (self.lease, e))
+        self._thread = threading.Thread(target=beat, name='shard-heartbeat')
+        self._thread.daemon = True
+        self._thread.start()
+        if settle:
+            time.sleep(settle)
+        # Início da execução: a instância mais antiga do anel, iniciada pelo mesmo agendamento
+        self.since = min([self.started] + [l['started'] for l in self._leases()]) - settle
+        self.info('Instância %s no anel com %s' % (self.instance, ', '.join(self.members())))
+
+    def leave(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if os.path.exists(self.lease):
+            os.remove(self.lease)
+
+    def _leases(self):
+        '''
+        @returns - leases (dicionários) com heartbeat dentro do ttl.
+        '''
+        now = time.time()
+        live = []
+        for filename in os.listdir(self.members_dir):
+            if not filename.endswith('.lease'):
+                continue
+            data = self._read_json(os.path.join(self.members_dir, filename))
+            if data is not None and now - data['heartbeat'] <= self.ttl:
+                live.append(data)
+        return live
+
+    def members(self):
+        '''
+        @returns - instâncias com heartbeat dentro do ttl, ordenadas.
+        '''
+        live = [str(l['instance']) for l in self._leases()]
+        if self.instance not in live:
+            live.append(self.instance)
+        return sorted(live)
+
+    def _section_path(self, section, suffix):
+        return os.path.join(self.sections_dir, section.replace('/', '_') + suffix)
+
+    def attempt(self, section):
+        '''
+        @returns - última tentativa da seção (instância, data, sucesso) dentro da janela ou None.
+        '''
+        data = self._read_json(self._section_path(section, '.json'))
+        since = time.time() - self.window if self.window else self.since
+        if data is None or data['attempted'] < since:
+            return None
+        return data
+
+    def settled(self, section):
+        '''
+        @returns True se a seção já foi tentada (por qualquer instância) dentro da janela.
+        '''
+        return self.attempt(section) is not None
+
+    def claim(self, section):
+        '''
+        @returns - arquivo de lock da seção (flock exclusivo) ou None se outra instância a está copiando.
+        '''
+        lock = open(self._section_path(section, '.lock'), 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            lock.close()
+            return None
+        return lock
+
+    def finish(self, section, ok, lock):
+        self._write_json(self._section_path(section, '.json'),
+                         {'instance': self.instance, 'attempted': time.time(), 'ok': bool(ok)})
+        lock.close()
+
+    def run(self, sections, work, poll=2, max_wait=3600):
+        '''
+        Executa work(seção) para as seções desta instância até todas as seções do
+        INI estarem resolvidas. Enquanto houver seções pendentes de outras instâncias,
+        aguarda: se uma delas cair, as suas seções passam para esta.
+
+        @param work      - função chamada com a seção, retorna True em caso de sucesso.
+        @param max_wait  - segundos máximos aguardando seções de outras instâncias.
+        @returns - (seções executadas por esta instância, seções pendentes ao final)
+        '''
+        done = []
+        deadline = time.time() + max_wait
+        for s in sections:
+            data = self.attempt(s)
+            if data is not None:
+                self.info('Seção %s já tentada por %s em %s (%s), não será repetida' %
+                          (s, data['instance'], time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(data['attempted'])),
+                           'sucesso' if data['ok'] else 'falha'))
+        while True:
+            pending = [s for s in sections if not self.settled(s)]
+            if not pending:
+                break
+            ring = HashRing(self.members())
+            mine = [s for s in pending if ring.owner(s) == self.instance]
+            section = None
+            for s in mine:
+                lock = self.claim(s)
+                if lock is None:
+                    continue
+                if self.settled(s):     # resolvida por outra instância antes do lock
+                    lock.close()
+                    continue
+                section = s
+                break
+            if section is None:
+                if time.time() > deadline:
+                    self.error('Tempo esgotado aguardando %d seções de outras instâncias' % len(pending))
+                    break
+                time.sleep(poll)
+                continue
+            ok = False
+            try:
+                ok = work(section)
+            except Exception:
+                self.error('Falha inesperada na seção %s' % section, exc_info=True)
+            finally:
+                self.finish(section, ok, lock)
+            done.append(section)
+        return done, [s for s in sections if not self.settled(s)]
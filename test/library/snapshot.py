@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  snapshot.py - biblioteca para congelar a imagem de uma VM desligada em segundos.
+
+  Com a VM desligada, a imagem é clonada por reflink (ioctl FICLONE, copy-on-write
+  em XFS/Btrfs) ou, se o sistema de arquivos não suportar, a VM passa a gravar num
+  overlay qcow2 externo (virsh snapshot-create-as --disk-only) e a imagem base,
+  agora somente leitura, é referenciada por um hardlink. Em ambos os casos a VM
+  pode ser religada imediatamente e a exportação lenta é feita a partir da cópia
+  congelada. No modo overlay, release() consolida o overlay de volta na imagem
+  base com a VM ligada (virsh blockcommit --active --pivot).
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import errno
+import fcntl
+import logging
+import os
+import subprocess
+
+# Conecta o logger ao módulo raiz (script que chama a classe)
+logger = logging.getLogger('root')
+
+# _IOW(0x94, 9, int) - linux/fs.h
+FICLONE = 0x40049409
+
+
+class SnapshotError(Exception):
+    '''
+    Falha ao congelar ou liberar a imagem de uma VM.
+    '''
+    pass
+
+
+def _run(args):
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.communicate()[0].decode('utf-8', 'replace')
+    return proc.returncode, output
+
+
+def reflink(source, target):
+    '''
+    reflink - função para clonar um arquivo por reflink (copy-on-write)
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param source - arquivo de origem
+      @param target - clone a ser criado (no mesmo sistema de arquivos)
+      @returns - True se o clone foi criado ou False se o sistema de arquivos não suporta reflink
+    '''
+    with open(source, 'rb') as src:
+        with open(target, 'wb') as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return True
+            except (IOError, OSError) as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                    # Não deixa um clone vazio ou parcial no lugar da cópia congelada
+                    os.remove(target)
+                    raise
+    os.remove(target)
+    logger.debug('Reflink não suportado entre %s e %s' % (source, target))
+    return False
+
+
+def disk_target(vm_name, vm_file):
+    '''
+    disk_target - função para descobrir o dispositivo (vda, sda...) de uma imagem na VM
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param vm_name - nome do domínio no libvirt
+      @param vm_file - caminho da imagem de disco
+      @returns - nome do dispositivo ou None se a imagem não pertence à VM
+    '''
+    status, output = _run(['virsh', 'domblklist', vm_name])
+    if status != 0:
+        raise SnapshotError('virsh domblklist %s: %s' % (vm_name, output.strip()))
+    real = os.path.realpath(vm_file)
+    for line in output.splitlines()[2:]:
+        fields = line.split(None, 1)
+        if len(fields) == 2 and os.path.realpath(fields[1].strip()) == real:
+            return fields[0]
+    return None
+
+
+# ================================================================
+# class FrozenImage
+# ================================================================
+class FrozenImage:
+    '''
+    Cópia congelada da imagem de uma VM.
+    Uso típico:
+
+        frozen = FrozenImage('VMSnipeit', '/var/lib/libvirt/images/VMSnipeit.qcow2')
+        frozen.freeze()          # com a VM desligada
+        start_vm()               # a VM volta ao ar em seguida
+        stream_backup(frozen.path, '/opt/backup/...')
+        frozen.release()         # com a VM ligada
+    '''
+    def __init__(self, vm_name, vm_file, staging_dir=None, method='auto'):
+        '''
+        @param vm_name      - nome do domínio no libvirt.
+        @param vm_file      - caminho da imagem de disco.
+        @param staging_dir  - diretório da cópia congelada; precisa estar no mesmo
+                              sistema de arquivos da imagem (padrão: <dir da imagem>/.backup-snapshots).
+        @param method       - auto | reflink | overlay.
+        '''
+        self.vm_name = vm_name
+        self.vm_file = vm_file
+        self.staging_dir = staging_dir or os.path.join(os.path.dirname(vm_file), '.backup-snapshots')
+        self.method = method
+        self.used = None
+        self.path = os.path.join(self.staging_dir, os.path.basename(vm_file))
+        self.overlay = '%s.backup-overlay' % vm_file
+        self.target = None
+
+    def freeze(self):
+        '''
+        Congela a imagem. Deve ser chamado com a VM desligada.
+
+        @returns - método utilizado (reflink ou overlay).
+        '''
+        if not os.path.isdir(self.staging_dir):
+            os.makedirs(self.staging_dir)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        if self.method in ('auto', 'reflink'):
+            if reflink(self.vm_file, self.path):
+                self.used = 'reflink'
+                logger.debug('Imagem %s clonada por reflink em %s' % (self.vm_file, self.path))
+                return self.used
+            if self.method == 'reflink':
+                raise SnapshotError('Sistema de arquivos de %s não suporta reflink' % self.vm_file)
+
+        self.target = disk_target(self.vm_name, self.vm_file)
+        if self.target is None:
+            raise SnapshotError('Imagem %s não encontrada nos discos da VM %s' % (self.vm_file, self.vm_name))
+        if os.path.exists(self.overlay):
+            raise SnapshotError('Overlay de um backup anterior ainda existe: %s' % self.overlay)
+        status, output = _run(['virsh', 'snapshot-create-as', self.vm_name, '--disk-only', '--atomic',
+                               '--no-metadata', '--diskspec', '%s,snapshot=external,file=%s' % (self.target, self.overlay)])
+        if status != 0:
+            raise SnapshotError('Falha ao criar overlay de %s: %s' % (self.vm_name, output.strip()))
+        self.used = 'overlay'
+        try:
+            os.link(self.vm_file, self.path)
+        except (IOError, OSError) as e:
+            # A VM já grava no overlay: sem consolidá-lo, ela ficaria presa a ele e
+            # os próximos backups recusariam o snapshot (overlay anterior existente)
+            try:
+                self.release()
+            except (SnapshotError, IOError, OSError) as c:
+                raise SnapshotError('Falha ao referenciar a imagem base %s (%s) e ao consolidar o overlay: %s'
+                                    % (self.vm_file, e, c))
+            raise SnapshotError('Falha ao referenciar a imagem base %s: %s' % (self.vm_file, e))
+        logger.debug('VM %s gravando em %s; imagem base referenciada em %s' % (self.vm_name, self.overlay, self.path))
+        return self.used
+
+    def release(self):
+        '''
+        Remove a cópia congelada. No modo overlay, consolida as gravações feitas
+        durante o backup de volta na imagem original.
+        '''
+        if self.used is None:
+            return
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        if self.used == 'overlay':
+            # O blockcommit exige o domínio ativo; se a VM ficou desligada, ela é
+            # iniciada pausada (sem executar o sistema convidado) só para a consolidação
+            paused = 'running' not in _run(['virsh', 'domstate', self.vm_name])[1]
+            if paused:
+                _run(['virsh', 'start', '--paused', self.vm_name])
+            status, output = _run(['virsh', 'blockcommit', self.vm_name, self.target,
+                                   '--active', '--pivot', '--wait'])
+            if paused:
+                _run(['virsh', 'destroy', self.vm_name])
+            if status != 0:
+                raise SnapshotError('Falha ao consolidar overlay %s: %s' % (self.overlay, output.strip()))
+            os.remove(self.overlay)
+        self.used = None
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  tracing.py - biblioteca de registro das etapas (spans) dos backups de VMs.
+
+  Cada etapa do backup (desligamento, congelamento, espera pelo slot de cópia,
+  exportação, verificação, retenção, reinício...) gera uma linha JSON com início,
+  fim, duração, bytes processados e vazão. Ao final do backup de cada VM é gravado
+  um resumo da execução com o total por etapa e o tempo em que a VM ficou fora do
+  ar (da saída do estado running até a volta a ele). O arquivo acumula todas as
+  execuções, de forma que o efeito de cada ajuste na janela de domingo e as
+  regressões de cada VM podem ser comparados entre execuções (trace_report.py).
+
+  Formato (uma linha por registro):
+
+    {"type": "span", "run": ..., "vm": ..., "phase": "export", "start": ..., "end": ...,
+     "duration": ..., "status": "ok", "bytes": ..., "mb_s": ...}
+    {"type": "summary", "run": ..., "vm": ..., "result": "ok", "downtime": ...,
+     "duration": ..., "phases": {"export": {"duration": ..., "bytes": ..., "mb_s": ...}}}
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import contextlib
+import json
+import logging
+import threading
+import time
+
+MB = 1024 * 1024
+
+# Conecta o logger ao módulo raiz (script que chama a classe)
+logger = logging.getLogger('root')
+
+# As VMs processadas em paralelo gravam no mesmo arquivo
+_write_lock = threading.Lock()
+
+
+def _throughput(nbytes, seconds):
+    return round(nbytes / float(MB) / seconds, 1) if nbytes and seconds > 0 else None
+
+
+def load(path, vm=None, kind='summary', operation='backup'):
+    '''
+    load - função para ler os registros de um arquivo de spans
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param path - arquivo JSON-lines gravado pelo PhaseTracer
+      @param vm   - nome da VM (padrão: todas)
+      @param kind - summary | span
+      @param operation - backup | restore (registros sem operação são de backups)
+      @returns - registros em ordem de gravação (linhas inválidas são ignoradas)
+    '''
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('type') == kind and record.get('operation', 'backup') == operation and \
+               (vm is None or record.get('vm') == vm):
+                records.append(record)
+    return records
+
+
+# ================================================================
+# class PhaseTracer
+# ================================================================
+class PhaseTracer:
+    '''
+    Registro das etapas do backup de uma VM.
+    Uso típico:
+
+        tracer = PhaseTracer('/var/log/backup_trace.jsonl', 'VMSnipeit', '20261019_030000')
+        with tracer.span('export') as span:
+            manifest = stream_backup(...)
+            span['bytes'] = manifest['read_bytes']
+        tracer.summary('ok', downtime=352.4)
+    '''
+    def __init__(self, path, vm, run, operation='backup'):
+        '''
+        @param path       - arquivo JSON-lines (None desliga a gravação; o resumo continua disponível).
+        @param vm         - nome da VM.
+        @param run        - identificador da execução (comum a todas as VMs do lote).
+        @param operation  - backup | restore; as restaurações não entram nas comparações dos backups.
+        '''
+        self.path = path
+        self.vm = vm
+        self.run = run
+        self.operation = operation
+        self.started = time.time()
+        self.spans = []
+
+    def _write(self, record):
+        if self.path is None:
+            return
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with _write_lock:
+            try:
+                with open(self.path, 'a') as f:
+                    f.write(line)
+            except (IOError, OSError) as e:
+                logger.error('Não foi possível gravar o span em %s: %s' % (self.path, e))
+
+    def record(self, phase, start, end, status='ok', **attrs):
+        '''
+        Registra uma etapa já concluída (ex: downtime, medido pelos eventos da VM).
+
+        @returns - o span gravado (dicionário).
+        '''
+        span = dict(attrs)
+        span.update({'type': 'span', 'operation': self.operation, 'run': self.run, 'vm': self.vm, 'phase': phase,
+                     'start': round(start, 3), 'end': round(end, 3),
+                     'duration': round(end - start, 3), 'status': status})
+        if span.get('bytes'):
+            span['mb_s'] = _throughput(span['bytes'], end - start)
+        self.spans.append(span)
+        self._write(span)
+        return span
+
+    @contextlib.contextmanager
+    def span(self, phase, **attrs):
+        '''
+        Mede uma etapa. O bloco pode preencher bytes (processados), status e outros
+        atributos no dicionário retornado; uma exceção grava a etapa com status error.
+        '''
+        span = dict(attrs)
+        start = time.time()
+        try:
+            yield span
+        except Exception:
+            span['status'] = 'error'
+            raise
+        finally:
+            status = span.pop('status', 'ok')
+            self.record(phase, start, time.time(), status, **span)
+
+    def summary(self, result, downtime=None, **attrs):
+        '''
+        Grava o resumo da execução: duração e bytes somados por etapa e downtime da VM.
+
+        @param result    - ok | failed.
+        @param downtime  - segundos fora do ar (None se a VM não estava em execução).
+        @returns - o resumo gravado (dicionário).
+        '''
+        phases = {}
+        for span in self.spans:
+            if span['phase'] == 'downtime':     # informado à parte, sobrepõe as demais etapas
+                continue
+            total = phases.setdefault(span['phase'], {'duration': 0.0, 'bytes': 0, 'count': 0})
+            total['duration'] = round(total['duration'] + span['duration'], 3)
+            total['bytes'] += span.get('bytes') or 0
+            total['count'] += 1
+            if span['status'] != 'ok':
+                total['status'] = span['status']
+        for total in phases.values():
+            total['mb_s'] = _throughput(total['bytes'], total['duration'])
+        summary = dict(attrs)
+        summary.update({'type': 'summary', 'operation': self.operation, 'run': self.run, 'vm': self.vm, 'result': result,
+                        'start': round(self.started, 3), 'duration': round(time.time() - self.started, 3),
+                        'downtime': None if downtime is None else round(downtime, 3), 'phases': phases})
+        self._write(summary)
+        return summary
+
+
+def format_summary(summary):
+    '''
+    format_summary - função para descrever um resumo numa linha de log
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param summary - resumo gravado por PhaseTracer.summary
+      @returns - texto com a duração e a vazão de cada etapa, da mais longa para a mais curta
+    '''
+    parts = []
+    for phase, total in sorted(summary['phases'].items(), key=lambda p: -p[1]['duration']):
+        text = '%s %.1fs' % (phase, total['duration'])
+        if total['mb_s'] is not None:
+            text += ' (%.1f MB/s)' % total['mb_s']
+        parts.append(text)
+    downtime = 'sem downtime' if summary['downtime'] is None else 'downtime %.1fs' % summary['downtime']
+    return 'Total %.1fs, %s: %s' % (summary['duration'], downtime, ', '.join(parts))
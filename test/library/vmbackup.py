@@ -0,0 +1,657 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe realiza o backup offline de uma VM KVM/libvirt conforme o config.yaml,
+seguindo o fluxo do vm_backup.sh (espaço em disco, desligamento, cópia compactada,
+reinício, verificação e retenção) sobre a configuração já carregada.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import contextlib
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from admission import AdmissionController
+from backupstream import stream_backup, verify_artifact, MANIFEST_SUFFIX
+from catalog import BackupCatalog
+from chunkstore import ChunkStore
+from domwatch import get_watcher
+from iogovernor import IOGovernor
+from snapshot import FrozenImage, SnapshotError
+from tracing import PhaseTracer, format_summary
+
+
+GB = 1024 ** 3
+# Estados em que a imagem da VM não está mais em uso
+STOPPED = ('shut off', 'crashed')
+
+
+def run_cmd(args, indata=None):
+    '''
+    run_cmd - função para executar um comando local
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param args   - lista com o comando e seus argumentos
+      @param indata - dado de entrada enviado ao stdin (opcional)
+      @returns (status, output) - código de saída e saída (stdout e stderr combinados)
+    '''
+    try:
+        proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+    except OSError as e:
+        return 127, str(e)
+    output, _ = proc.communicate(indata.encode('utf-8') if indata is not None else None)
+    return proc.returncode, output.decode('utf-8', 'replace')
+
+
+def virsh(*args):
+    return run_cmd(['virsh'] + list(args))
+
+
+def human_size(nbytes):
+    '''
+    Formata um tamanho em bytes como o 'du -h' (K, M, G, T).
+    '''
+    for unit in ('B', 'K', 'M', 'G', 'T'):
+        if abs(nbytes) < 1024 or unit == 'T':
+            return ('%d%s' if unit == 'B' else '%.1f%s') % (nbytes, unit)
+        nbytes /= 1024.0
+
+
+# ================================================================
+# class VMBackup
+# ================================================================
+class VMBackup:
+    '''
+    Realiza o backup offline completo de uma VM.
+    Uso típico:
+
+        config = BackupConfig.load('config.yaml')
+        job = VMBackup(config, config.get_vm('VMSnipeit'))
+        if job.setup():
+            ok = job.run()
+    '''
+    def __init__(self, config, vm, run=None):
+        '''
+        @param config  - objeto BackupConfig com a configuração carregada.
+        @param vm      - objeto VMConfig da VM.
+        @param run     - identificador da execução nos spans (padrão: data/hora atual).
+        '''
+        self.config = config
+        self.vm = vm
+        self.btype = vm.backup_type('offline')
+        self.backup_name = '%s-full-%s' % (vm.name, time.strftime('%Y%m%d_%H%M%S'))
+        self.backup_file = os.path.join(vm.backup_dir, self.backup_name + '.qcow2.gz')
+        self.store = ChunkStore(config.chunk_store) if self.btype.store == 'chunks' else None
+        self.was_running = False
+        self.down = False
+        self.manifest = None
+        self.governor = IOGovernor.from_config(vm.io, self.btype.compress_workers)
+        self.catalog = BackupCatalog(config.catalog)
+        self.tracer = PhaseTracer(config.trace_file, vm.name, run or time.strftime('%Y%m%d_%H%M%S'))
+
+        # Log próprio da VM (<log_dir>/backup_<vm>_full.log) e saída padrão
+        self.logger = logging.getLogger('vmbackup.%s' % vm.name)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            # Na saída padrão as linhas levam o nome da VM, pois várias VMs rodam em paralelo
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(logging.Formatter('%%(asctime)s - %s - %%(message)s' % vm.name, '%Y-%m-%d %H:%M:%S'))
+            self.logger.addHandler(console)
+            handler = _file_handler(vm.log_file)
+            if handler is not None:
+                handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', '%Y-%m-%d %H:%M:%S'))
+                self.logger.addHandler(handler)
+
+    def log(self, msg):
+        self.logger.info(msg)
+
+    def notify(self, level, msg):
+        '''
+        Registra e envia uma notificação (info, warning, error, critical).
+        '''
+        self.log('[NOTIFY-%s] %s' % (level, msg))
+        notif = self.config.notification
+        if not notif.enabled:
+            return
+        if notif.method == 'email' and notif.recipient:
+            run_cmd(['mail', '-s', '[BACKUP-%s] VM %s' % (level, self.vm.name), notif.recipient], msg + '\n')
+
+    def setup(self):
+        '''
+        Valida a VM e prepara o diretório de backup.
+
+        @returns True se a VM pode ser copiada ou False caso contrário.
+        '''
+        if not self.vm.vm_file:
+            self.log('ERRO: Caminho do arquivo da VM não definido')
+            return False
+        if not os.path.isdir(self.vm.backup_dir):
+            os.makedirs(self.vm.backup_dir)
+        if not os.path.isfile(self.vm.vm_file):
+            self.log('ERRO: Arquivo da VM não existe: %s' % self.vm.vm_file)
+            return False
+        if virsh('dominfo', self.vm.name)[0] != 0:
+            self.log('ERRO: VM %s não existe no libvirt' % self.vm.name)
+            return False
+        return True
+
+    def is_running(self):
+        # Consulta pelo watcher: a última vez em running fica registrada para o downtime
+        return get_watcher().refresh(self.vm.name) == 'running'
+
+    def check_disk_space(self, reservation=None):
+        '''
+        Verifica se o backup cabe no destino, pela previsão do tamanho gravado.
+
+        @param reservation  - reserva feita para o lote (AdmissionController.admit); sem
+                              ela, a reserva é feita apenas para esta VM.
+        '''
+        if reservation is None:
+            reservation = self.admission().admit([self])[0]
+        r = reservation
+        if r['ratio'] is None:
+            basis = 'dados alocados da imagem, sem histórico'
+        else:
+            basis = 'imagem de %s x taxa %.2f de %d backups anteriores' % (human_size(r['image_bytes']),
+                                                                           r['ratio'], r['history'])
+        if not r['admitted']:
+            self.log('ALERTA: Espaço insuficiente para backup. Previsto: %s (%s), Disponível para a VM: %s'
+                     % (human_size(r['bytes']), basis, human_size(max(0, r['available']))))
+            self.notify('critical', 'Espaço em disco insuficiente para backup de %s' % self.vm.name)
+            return False
+        self.log('Espaço reservado para o backup: %s (%s), %s disponível'
+                 % (human_size(r['bytes']), basis, human_size(r['available'])))
+        return True
+
+    def admission(self):
+        return AdmissionController(int(self.config.min_free_gb * GB), self.config.space_margin / 100.0)
+
+    def safe_shutdown(self, timeout, grace_period=30):
+        '''
+        Desliga a VM via ACPI, escalando para shutdown forçado e destroy após o timeout.
+        As esperas terminam no evento de desligamento da VM, sem intervalos fixos.
+        '''
+        name = self.vm.name
+        watcher = get_watcher()
+        self.log('Iniciando desligamento seguro de %s...' % name)
+        self.notify('info', 'Iniciando desligamento de %s para backup offline' % name)
+        started = time.time()
+        virsh('shutdown', name)
+
+        elapsed = 0
+        while elapsed < timeout:
+            if watcher.wait_for_state(name, STOPPED, min(60, timeout - elapsed)):
+                self.log('VM %s desligou normalmente após %d segundos' % (name, time.time() - started))
+                return True
+            elapsed = int(time.time() - started)
+            if elapsed < timeout:
+                self.log('VM ainda em execução após %d segundos. Verificando estado...' % elapsed)
+                self.notify('info', 'VM ainda em processo de desligamento (%d segundos decorridos)' % elapsed)
+
+        self.log('Aviso: Timeout após %d segundos. Iniciando procedimento de emergência...' % timeout)
+        self.notify('warning', 'VM não desligou dentro do tempo previsto, tentando shutdown forçado')
+        self.log('Tentando shutdown forçado via ACPI...')
+        virsh('shutdown', '--mode', 'acpi', name)
+        if watcher.wait_for_state(name, STOPPED, grace_period):
+            self.log('VM desligou com shutdown forçado após período de graça')
+            return True
+
+        self.log('ALERTA: Shutdown forçado falhou. Executando destroy como último recurso')
+        self.notify('critical', 'Executando destroy na VM para realizar backup offline')
+        virsh('destroy', name)
+        if watcher.wait_for_state(name, STOPPED, 5):
+            self.log('VM foi desligada forçadamente usando destroy')
+            return True
+
+        self.log('ERRO CRÍTICO: Não foi possível desligar a VM de nenhuma forma')
+        return False
+
+    def start_vm(self):
+        '''
+        Inicia a VM e aguarda até 2 minutos pelo estado running.
+        '''
+        name = self.vm.name
+        self.log('Iniciando VM %s após backup...' % name)
+        virsh('start', name)
+        if get_watcher().wait_for_state(name, ('running',), 120):
+            self.log('VM %s iniciada com sucesso após backup' % name)
+            self.notify('info', 'VM %s iniciada com sucesso após backup offline' % name)
+            return True
+        self.log('ERRO: Falha ao iniciar VM %s após backup' % name)
+        self.notify('error', 'Falha ao iniciar VM após backup offline')
+        return False
+
+    def freeze(self):
+        '''
+        Congela a imagem da VM desligada (reflink ou overlay qcow2).
+
+        @returns FrozenImage ou None se não foi possível congelar a imagem.
+        '''
+        frozen = FrozenImage(self.vm.name, self.vm.vm_file, self.btype.snapshot_dir, self.btype.snapshot)
+        started = time.time()
+        with self.tracer.span('freeze') as span:
+            try:
+                method = frozen.freeze()
+            except (SnapshotError, IOError, OSError) as e:
+                span['status'] = 'failed'
+                self.log('AVISO: Falha ao congelar a imagem (%s). Backup seguirá com a VM desligada.' % e)
+                self.notify('warning', 'Snapshot indisponível para %s, backup com a VM desligada' % self.vm.name)
+                return None
+            span['method'] = method
+        self.log('Imagem congelada via %s em %.1fs: %s' % (method, time.time() - started, frozen.path))
+        return frozen
+
+    def release(self, frozen):
+        with self.tracer.span('release') as span:
+            try:
+                frozen.release()
+                self.log('Cópia congelada liberada (%s)' % frozen.path)
+            except (SnapshotError, IOError, OSError) as e:
+                span['status'] = 'failed'
+                self.log('ERRO: Falha ao liberar a cópia congelada: %s' % e)
+                self.notify('error', 'Falha ao consolidar o snapshot de %s: %s' % (self.vm.name, e))
+
+    def restart(self):
+        '''
+        Reinicia a VM se ela estava em execução antes do backup.
+        '''
+        if not self.was_running:
+            self.log('VM não estava em execução antes do backup. Mantendo desligada.')
+            return True
+        self.down = False
+        self.log('VM estava em execução antes do backup. Reiniciando...')
+        with self.tracer.span('restart') as span:
+            if not self.start_vm():
+                span['status'] = 'failed'
+                self.log('AVISO: Não foi possível reiniciar a VM automaticamente!')
+                self.notify('warning', 'VM não reiniciou automaticamente após backup')
+                return False
+        return True
+
+    def export(self, source):
+        '''
+        Copia, compacta e calcula o checksum da imagem numa única leitura da origem,
+        gravando um .gz ou, com store: chunks, apenas os blocos novos no repositório.
+
+        @param source  - imagem da VM ou sua cópia congelada.
+        '''
+        self.log('Iniciando backup offline completo (cópia e compactação em passagem única)...')
+        # Cópia, compactação e checksum são uma única passagem: uma etapa só, com os
+        # bytes lidos da imagem, os gravados e as esperas do limitador de I/O
+        with self.tracer.span('export', source=source) as span:
+            try:
+                if self.store is not None:
+                    self.manifest = self.store.backup(source, self.backup_name,
+                                                      workers=self.btype.compress_workers,
+                                                      governor=self.governor)
+                else:
+                    self.manifest = stream_backup(source, self.backup_file,
+                                                  workers=self.btype.compress_workers,
+                                                  governor=self.governor)
+            except (IOError, OSError) as e:
+                span['status'] = 'failed'
+                self.log('ERRO: %s' % e)
+                self.log('ERRO: Falha no backup offline da VM')
+                self.notify('critical', 'Falha no backup offline completo - erro na cópia do arquivo')
+                return False
+            m = self.manifest
+            span.update({'bytes': m['read_bytes'], 'source_bytes': m['source_bytes'],
+                         'written_bytes': self.stored_bytes(), 'workers': m['workers'],
+                         'read_wait': m['io']['read_wait'], 'write_wait': m['io']['write_wait']})
+        if self.store is not None:
+            self.log('Backup concluído com sucesso: %s (repositório %s)' % (self.backup_name, self.store.root))
+            self.log('Imagem: %s (%s lidos, %d blocos vazios), %d blocos novos gravados: %s, SHA-256 da imagem: %s (%.1fs, %d threads)'
+                     % (human_size(m['source_bytes']), human_size(m['read_bytes']), m['zero_blocks'],
+                        m['new_chunks'], human_size(m['new_bytes']), m['source_sha256'], m['duration'], m['workers']))
+        else:
+            self.log('Backup concluído com sucesso: %s' % self.backup_file)
+            self.log('Imagem: %s (%s lidos, %d blocos vazios), compactado: %s, SHA-256 da imagem: %s (%.1fs, %d threads)'
+                     % (human_size(m['source_bytes']), human_size(m['read_bytes']), m['zero_blocks'],
+                        human_size(m['artifact_bytes']), m['source_sha256'], m['duration'], m['workers']))
+        io = m['io']
+        if io['read_wait'] or io['write_wait'] or io['slow_writes']:
+            self.log('Limitação de I/O: %.1fs aguardando leitura, %.1fs aguardando escrita, %d escritas lentas (janela final: %d blocos)'
+                     % (io['read_wait'], io['write_wait'], io['slow_writes'], io['window']))
+        return True
+
+    def stored_bytes(self):
+        '''
+        @returns - bytes gravados por este backup (artefato .gz ou blocos novos).
+        '''
+        if self.store is not None:
+            return self.manifest['new_bytes']
+        return self.manifest['artifact_bytes']
+
+    def verify(self):
+        '''
+        Relê e descompacta o arquivo compactado, conferindo com os checksums da escrita. No
+        repositório de blocos, confere se todos os blocos do manifesto existem.
+        '''
+        with self.tracer.span('verify') as span:
+            if self.store is not None:
+                missing = self.store.verify(self.backup_name)
+                if missing:
+                    span['status'] = 'failed'
+                    self.log('ERRO: %d blocos ausentes no repositório' % len(missing))
+                    return False
+            else:
+                span['bytes'] = self.manifest['artifact_bytes']
+                if not verify_artifact(self.backup_file, self.manifest, self.btype.compress_workers):
+                    span['status'] = 'failed'
+                    return False
+        self.log('Verificação de integridade concluída com sucesso')
+        return True
+
+    def retention(self, keep=None):
+        '''
+        Mantém apenas os últimos keep (padrão: retention_count) backups da VM, escolhidos pelo catálogo.
+        '''
+        keep = self.btype.retention_count if keep is None else keep
+        name = self.vm.name
+        self.log('Removendo backups antigos (mantendo os últimos %d)...' % keep)
+        with self.tracer.span('retention', keep=keep):
+            if self.store is not None:
+                rows = self.catalog.expired('vm', name, keep=keep, store='chunks')
+                expired, chunks, freed = self.store.prune([r['name'] for r in rows])
+                self.catalog.mark_deleted('vm', name, [r['name'] for r in rows])
+                for backup in expired:
+                    self.log('Backup removido: %s' % backup)
+                self.log('Blocos sem referência removidos: %d (%s liberados)' % (chunks, human_size(freed)))
+                self.log('Tamanho total do repositório de blocos: %s' % human_size(self.store.stored_bytes()))
+                return
+            for row in self.catalog.prune('vm', name, keep=keep, sidecars=(MANIFEST_SUFFIX,), store='gzip'):
+                self.log('Backup removido: %s' % row['path'])
+        self.log('Tamanho total dos backups armazenados: %s' % human_size(self.catalog.total_bytes('vm', name)))
+
+    def adopt_legacy(self):
+        '''
+        Na primeira execução com o catálogo, registra os backups já existentes da VM.
+        '''
+        name = self.vm.name
+        if self.catalog.has('vm', name):
+            return
+        count = self.catalog.adopt('vm', name, self.vm.backup_dir, '%s-full-' % name, '.qcow2.gz', store='gzip')
+        if self.store is not None:
+            count += self.catalog.adopt('vm', name, self.store.manifest_dir, '%s-full-' % name, '.json', store='chunks')
+        self.log('Catálogo: %d backups existentes registrados em %s' % (count, self.catalog.path))
+
+    def record(self, status):
+        '''
+        Registra o backup no catálogo.
+        '''
+        m = self.manifest or {}
+        if self.store is not None:
+            path, store, stored = self.store.manifest_path(self.backup_name), 'chunks', m.get('new_bytes')
+        else:
+            path, store, stored = self.backup_file, 'gzip', m.get('artifact_bytes')
+        self.catalog.record('vm', self.vm.name, self.backup_name, path, status, store=store,
+                            source_bytes=m.get('source_bytes'), stored_bytes=stored,
+                            sha256=m.get('source_sha256'), duration=m.get('duration'),
+                            artifact_sha256=m.get('artifact_sha256'))
+
+    def stop(self):
+        '''
+        Desliga a VM se ela estiver em execução.
+
+        @returns True se a VM está desligada ou False se o desligamento falhou.
+        '''
+        if not self.was_running:
+            self.log('VM já está desligada. Prosseguindo com backup.')
+            return True
+        self.log('VM está em execução. Iniciando procedimento de desligamento seguro.')
+        with self.tracer.span('shutdown') as span:
+            stopped = self.safe_shutdown(self.btype.shutdown_timeout)
+            if not stopped:
+                span['status'] = 'failed'
+        if not stopped:
+            self.log('ERRO CRÍTICO: Falha no desligamento da VM. Abortando backup.')
+            self.notify('critical', 'Backup abortado - falha no desligamento da VM')
+            return False
+        self.down = True
+        return True
+
+    @contextlib.contextmanager
+    def slot(self, semaphore, stage, held=False):
+        '''
+        Ocupa um slot da etapa, registrando a espera na fila como span (wait_<etapa>).
+
+        @param held  - o slot já foi obtido pelo chamador (é apenas liberado ao final).
+        '''
+        if not held:
+            with self.tracer.span('wait_' + stage):
+                semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def backup_image(self, slots):
+        '''
+        Desliga a VM, exporta a imagem (ou a sua cópia congelada) e religa a VM.
+
+        @param slots  - StageSlots compartilhado entre as VMs processadas em paralelo.
+        @returns (exportado, religado) ou None se o desligamento falhou.
+        '''
+        frozen = None
+        held = False
+        if self.was_running and self.btype.snapshot != 'none':
+            # Modo snapshot: desligamento e congelamento fora do slot de cópia; a VM
+            # volta ao ar em segundos e a exportação aguarda a sua vez sem downtime
+            if not self.stop():
+                return None
+            frozen = self.freeze()
+            if frozen is None:
+                # Sem a cópia congelada a exportação é offline, e a VM não pode
+                # aguardar desligada na fila: segue se o slot está livre, senão
+                # volta ao ar e é desligada de novo quando chegar a sua vez
+                held = slots.copy.acquire(False)
+                if not held:
+                    self.log('Slot de cópia ocupado: religando a VM até a vez da exportação offline')
+                    if not self.restart():
+                        return False, False
+        if frozen is not None:
+            try:
+                restarted = self.restart()
+                with self.slot(slots.copy, 'copy'):
+                    exported = self.export(frozen.path)
+            finally:
+                self.release(frozen)
+        else:
+            # Sem snapshot a VM fica desligada durante a exportação: o slot de cópia é
+            # reservado antes do desligamento para que ela não fique parada na fila
+            with self.slot(slots.copy, 'copy', held):
+                if not self.down and not self.stop():
+                    return None
+                exported = self.export(self.vm.vm_file)
+            # A VM volta ao ar assim que a imagem foi lida; a verificação relê apenas o artefato
+            restarted = self.restart()
+        return exported, restarted
+
+    def trace_summary(self, success):
+        '''
+        Grava o resumo das etapas com o downtime da VM: da saída do estado running
+        (evento do libvirt) até a volta a ele, ou até agora se ela não voltou.
+        '''
+        downtime = None
+        window = get_watcher().downtime(self.vm.name) if self.was_running else None
+        if window is not None and window[0] >= self.tracer.started:
+            left, back = window
+            end = back or time.time()
+            self.tracer.record('downtime', left, end, 'ok' if back else 'down')
+            downtime = end - left
+        m = self.manifest or {}
+        summary = self.tracer.summary('ok' if success else 'failed', downtime, store=self.btype.store,
+                                      snapshot=self.btype.snapshot, source_bytes=m.get('source_bytes'))
+        self.log('Etapas do backup: %s' % format_summary(summary))
+
+    def run(self, slots=None, reservation=None):
+        '''
+        Executa o backup offline completo da VM, registrando o resumo das etapas.
+
+        @param slots        - StageSlots compartilhado entre as VMs processadas em paralelo.
+        @param reservation  - reserva de espaço feita para o lote (padrão: reserva só desta VM).
+        @returns True se o backup foi concluído com sucesso ou False caso contrário.
+        '''
+        success = False
+        try:
+            success = self._run(slots, reservation)
+        finally:
+            self.trace_summary(success)
+        return success
+
+    def _run(self, slots, reservation):
+        slots = slots or StageSlots()
+        name = self.vm.name
+        # Prioridade de disco/CPU da thread do job, herdada pelas threads de compressão
+        if not self.governor.apply_priority():
+            self.log('AVISO: Não foi possível ajustar a prioridade de I/O do backup')
+        self.log('====== INICIANDO BACKUP OFFLINE PARA %s ======' % name)
+        self.notify('info', 'Iniciando backup offline para %s' % name)
+
+        self.adopt_legacy()
+        if not self.check_disk_space(reservation):
+            self.log('ERRO: Abortando backup por falta de espaço')
+            self.notify('critical', 'Backup abortado: Espaço insuficiente para %s' % name)
+            return False
+
+        self.was_running = self.is_running()
+        try:
+            result = self.backup_image(slots)
+        finally:
+            # Uma exceção após o desligamento (exportação, snapshot, catálogo...) não
+            # pode deixar a VM fora do ar: ela é religada antes de a exceção seguir
+            if self.down:
+                self.restart()
+        if result is None:
+            return False
+        exported, restarted = result
+
+        success = False
+        if exported:
+            with self.slot(slots.verify, 'verify'):
+                verified = self.verify()
+            if not verified:
+                self.log('AVISO: Verificação de integridade falhou!')
+                self.notify('warning', 'Verificação de integridade do backup falhou')
+            else:
+                success = True
+                self.record('ok')
+                self.retention()
+                self.notify('info', 'Backup offline concluído com sucesso. Tamanho: %s'
+                            % human_size(self.stored_bytes()))
+
+        if not success:
+            self.record('failed')
+        if success and restarted:
+            self.log('====== BACKUP OFFLINE CONCLUÍDO COM SUCESSO ======')
+        else:
+            self.log('====== BACKUP OFFLINE CONCLUÍDO COM FALHAS ======')
+        return success and restarted
+
+
+# ================================================================
+# class StageSlots
+# ================================================================
+class StageSlots:
+    '''
+    Limites de concorrência por etapa do backup, compartilhados entre as VMs
+    processadas em paralelo. Desligamento, congelamento e reinício não têm limite;
+    a exportação (leitura da imagem e compactação) e a verificação (releitura e
+    descompactação do artefato) são limitadas por semáforos.
+    Uso típico:
+
+        slots = StageSlots(copy_slots=1, verify_slots=2)
+        with slots.copy:
+            job.export(path)
+    '''
+    def __init__(self, copy_slots=1, verify_slots=1):
+        '''
+        @param copy_slots    - exportações simultâneas (leitura pesada do disco das VMs).
+        @param verify_slots  - verificações simultâneas.
+        '''
+        self.copy = threading.BoundedSemaphore(max(1, copy_slots))
+        self.verify = threading.BoundedSemaphore(max(1, verify_slots))
+
+
+def _file_handler(filename):
+    try:
+        return logging.FileHandler(filename)
+    except (IOError, OSError):
+        return None
+
+
+def process_backups(config, target_vm='all'):
+    '''
+    process_backups - função para processar o backup de todas as VMs habilitadas ou de uma VM
+      Versão: 1.0
+      Adicionado em: 19/10/2026 (Diogenes)
+
+      @param config    - objeto BackupConfig com a configuração carregada
+      @param target_vm - nome da VM ou 'all' para todas as VMs habilitadas
+      @returns - código de saída (0 em caso de sucesso)
+    '''
+    if target_vm != 'all':
+        vm = config.get_vm(target_vm)
+        if vm is None:
+            print('ERRO: VM \'%s\' não encontrada na configuração' % target_vm)
+            return 1
+        if not vm.enabled:
+            print('VM \'%s\' está desabilitada na configuração' % target_vm)
+            return 0
+        vms = [vm]
+    else:
+        vms = config.enabled_vms()
+        if not vms:
+            print('Nenhuma VM habilitada encontrada na configuração')
+            return 0
+
+    jobs = []
+    failed = 0
+    run = time.strftime('%Y%m%d_%H%M%S')    # identificador comum nos spans de todas as VMs do lote
+    for vm in vms:
+        job = VMBackup(config, vm, run)
+        if not job.setup():
+            print('ERRO: Falha ao configurar ambiente para VM \'%s\'' % vm.name)
+            failed = 1
+            continue
+        job.adopt_legacy()
+        jobs.append(job)
+    if not jobs:
+        return failed if target_vm != 'all' else 0
+
+    # Espaço reservado para o lote inteiro antes de qualquer VM ser desligada: as VMs
+    # que não cabem são recusadas logo no início, e não no meio da execução
+    reservations = jobs[0].admission().admit(jobs)
+    slots = StageSlots(config.copy_slots, config.verify_slots)
+    parallel = min(len(jobs), config.parallel_vms or len(jobs))
+
+    def backup_vm(r):
+        job = r['job']
+        print('==== Iniciando backup para VM \'%s\' ====' % job.vm.name)
+        try:
+            return 0 if job.run(slots, r) else 1
+        except Exception as e:
+            job.log('ERRO: Falha inesperada no backup: %s' % e)
+            return 1
+
+    # As etapas das VMs são intercaladas: enquanto uma VM é exportada, as outras
+    # desligam, religam ou verificam os seus backups
+    pool = ThreadPool(parallel)
+    try:
+        result = max([failed] + pool.map(backup_vm, reservations))
+    finally:
+        pool.close()
+        pool.join()
+    # Como no vm_backup.sh, apenas o backup de uma VM específica reflete no código de saída
+    return result if target_vm != 'all' else 0
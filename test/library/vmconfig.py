@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+  vmconfig.py - modelo da configuração de backup de VMs (backup/config.yaml).
+
+  O arquivo YAML é lido uma única vez e convertido em objetos com os valores padrão
+  já aplicados, substituindo as dezenas de chamadas 'yq eval' do vm_backup_utils.sh.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import multiprocessing
+import os
+import re
+import yaml
+
+
+class ConfigError(Exception):
+    '''
+    Erro de leitura ou validação do arquivo de configuração.
+    '''
+    pass
+
+
+# ================================================================
+# class NotificationConfig
+# ================================================================
+class NotificationConfig:
+    '''
+    Configuração de notificações (seção global.notification).
+
+        enabled    - bool, notificações habilitadas
+        method     - str, email | slack | teams | none
+        recipient  - str, destinatário do método email
+    '''
+    def __init__(self, data):
+        data = data or {}
+        self.enabled = data.get('enabled') is True
+        self.method = data.get('method') or 'none'
+        self.recipient = (data.get('email') or {}).get('recipient') or ''
+
+
+# ================================================================
+# class IOConfig
+# ================================================================
+class IOConfig:
+    '''
+    Limites de I/O dos backups (seção global.io, sobrescrita por vms[].io).
+
+        read_limit         - int, MB/s lidos da imagem (0 = sem limite)
+        write_limit        - int, MB/s gravados no destino (0 = sem limite)
+        ioprio_class       - str, idle | best-effort | none
+        ioprio_level       - int, 0 (maior) a 7 (menor prioridade) na classe best-effort
+        nice               - int, nice das threads do backup
+        target_latency_ms  - int, latência de disco por bloco (escrita + fdatasync) acima da qual a concorrência é reduzida (0 desliga)
+    '''
+    def __init__(self, data, parent=None):
+        data = data or {}
+
+        def get(key, default):
+            return _default(data.get(key), getattr(parent, key) if parent is not None else default)
+
+        self.read_limit = int(get('read_limit', 0))
+        self.write_limit = int(get('write_limit', 0))
+        self.ioprio_class = get('ioprio_class', 'best-effort')
+        if self.ioprio_class not in ('idle', 'best-effort', 'none'):
+            raise ConfigError('Valor inválido para ioprio_class: %s' % self.ioprio_class)
+        self.ioprio_level = int(get('ioprio_level', 7))
+        if not 0 <= self.ioprio_level <= 7:
+            raise ConfigError('Valor inválido para ioprio_level: %s' % self.ioprio_level)
+        self.nice = int(get('nice', 10))
+        self.target_latency_ms = int(get('target_latency_ms', 200))
+
+
+# ================================================================
+# class ReplicaConfig
+# ================================================================
+class ReplicaConfig:
+    '''
+    Réplica externa dos backups por SFTP (seção global.replica).
+
+        enabled      - bool, réplica habilitada
+        host         - str, servidor SFTP remoto
+        port         - int, porta SSH (padrão: 22)
+        user         - str, usuário SSH
+        keyfilename  - str, chave privada (vazio = chaves do agente/~/.ssh)
+        remote_dir   - str, diretório raiz da réplica no servidor remoto
+        channels     - int, conexões SFTP em paralelo
+        chunk_mb     - int, tamanho dos blocos enviados, em MB
+        rate_limit   - int, MB/s enviados no total (0 = sem limite)
+        until        - str, HH:MM após o qual nenhum novo backup é iniciado (vazio = sem limite)
+    '''
+    def __init__(self, data):
+        data = data or {}
+        self.enabled = data.get('enabled') is True
+        self.host = data.get('host') or ''
+        self.port = int(_default(data.get('port'), 22))
+        self.user = data.get('user') or 'root'
+        self.keyfilename = data.get('keyfilename') or None
+        self.remote_dir = data.get('remote_dir') or ''
+        self.channels = max(1, int(_default(data.get('channels'), 4)))
+        self.chunk_mb = max(1, int(_default(data.get('chunk_mb'), 64)))
+        self.rate_limit = int(_default(data.get('rate_limit'), 0))
+        self.until = str(data.get('until') or '')
+        if self.until and not re.match(r'^\d{1,2}:\d{2}$', self.until):
+            raise ConfigError('Valor inválido para until: %s' % self.until)
+
+
+# ================================================================
+# class BackupType
+# ================================================================
+class BackupType:
+    '''
+    Tipo de backup de uma VM (item de vms[].backup_types).
+
+        type              - str, tipo do backup (offline)
+        enabled           - bool, tipo habilitado
+        schedule          - str, referência para o crontab (weekly)
+        retention_count   - int, número de backups mantidos
+        shutdown_timeout  - int, segundos aguardando o desligamento da VM
+        compress_workers  - int, threads de compressão (padrão: global.compress_workers)
+        store             - str, gzip (um .gz por backup) | chunks (repositório deduplicado)
+        snapshot          - str, none | auto | reflink | overlay (congela a imagem e religa a VM antes da exportação)
+        snapshot_dir      - str, diretório da cópia congelada, no mesmo sistema de arquivos da imagem
+    '''
+    def __init__(self, data, default_retention, default_workers=1):
+        self.type = data.get('type')
+        self.enabled = data.get('enabled', True) is True
+        self.schedule = data.get('schedule') or 'weekly'
+        self.retention_count = int(_default(data.get('retention_count'), default_retention))
+        self.shutdown_timeout = int(_default(data.get('shutdown_timeout'), 600))
+        self.compress_workers = max(1, int(_default(data.get('compress_workers'), default_workers)))
+        self.store = data.get('store') or 'gzip'
+        if self.store not in ('gzip', 'chunks'):
+            raise ConfigError('Valor inválido para store: %s' % self.store)
+        self.snapshot = data.get('snapshot') or 'none'
+        if self.snapshot not in ('none', 'auto', 'reflink', 'overlay'):
+            raise ConfigError('Valor inválido para snapshot: %s' % self.snapshot)
+        self.snapshot_dir = data.get('snapshot_dir')
+
+
+# ================================================================
+# class VMConfig
+# ================================================================
+class VMConfig:
+    '''
+    Configuração de uma VM (item de vms).
+
+        name          - str, nome do domínio no libvirt
+        enabled       - bool, VM habilitada para backup
+        description   - str, descrição
+        vm_file       - str, caminho da imagem de disco
+        backup_types  - list de BackupType
+        backup_dir    - str, diretório dos backups completos (<backup_base_dir>/<nome>/full)
+        log_file      - str, arquivo de log do backup (<log_dir>/backup_<nome>_full.log)
+        io            - IOConfig, limites de I/O (global.io sobrescrito por vms[].io)
+    '''
+    def __init__(self, data, config):
+        self.name = data.get('name')
+        if not self.name:
+            raise ConfigError('VM sem nome na configuração')
+        self.enabled = data.get('enabled') is True
+        self.description = data.get('description') or self.name
+        self.vm_file = data.get('vm_file') or ''
+        self.default_retention = config.default_retention
+        self.default_workers = config.compress_workers
+        self.backup_types = [BackupType(t, config.default_retention, config.compress_workers)
+                             for t in data.get('backup_types') or []]
+        self.backup_dir = os.path.join(config.backup_base_dir, self.name, 'full')
+        self.log_file = os.path.join(config.log_dir, 'backup_%s_full.log' % self.name)
+        self.io = IOConfig(data.get('io'), config.io)
+
+    def backup_type(self, name='offline'):
+        '''
+        Retorna o tipo de backup pelo nome. Se a VM não declarar o tipo, retorna um
+        tipo com os valores padrão, como o get_config do script shell.
+        '''
+        for t in self.backup_types:
+            if t.type == name:
+                return t
+        return BackupType({'type': name}, self.default_retention, self.default_workers)
+
+
+# ================================================================
+# class BackupConfig
+# ================================================================
+class BackupConfig:
+    '''
+    Configuração completa de backup de VMs.
+    Uso típico:
+
+        config = BackupConfig.load('/home/goku/scripts/backup/config.yaml')
+        for vm in config.enabled_vms():
+            print vm.name, vm.backup_type('offline').retention_count
+    '''
+    def __init__(self, data, path=None):
+        data = data or {}
+        glob = data.get('global') or {}
+        self.path = path
+        self.backup_base_dir = glob.get('backup_base_dir') or '/opt/backup'
+        self.log_dir = glob.get('log_dir') or '/var/log'
+        self.notification = NotificationConfig(glob.get('notification'))
+        self.compress_workers = int(_default(glob.get('compress_workers'), multiprocessing.cpu_count()))
+        self.chunk_store = glob.get('chunk_store') or os.path.join(self.backup_base_dir, 'chunkstore')
+        self.catalog = glob.get('catalog') or os.path.join(self.backup_base_dir, 'catalog.db')
+        self.parallel_vms = int(_default(glob.get('parallel_vms'), 0))
+        self.copy_slots = int(_default(glob.get('copy_slots'), 1))
+        self.verify_slots = int(_default(glob.get('verify_slots'), 2))
+        self.io = IOConfig(glob.get('io'))
+        self.min_free_gb = float(_default(glob.get('min_free_gb'), 1))
+        self.space_margin = int(_default(glob.get('space_margin'), 10))
+        self.replica = ReplicaConfig(glob.get('replica'))
+        self.trace_file = glob.get('trace_file') or os.path.join(self.log_dir, 'backup_trace.jsonl')
+        self.default_retention = int(_default((data.get('default_retention') or {}).get('weekly'), 8))
+        self.vms = [VMConfig(vm, self) for vm in data.get('vms') or []]
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Lê e valida o arquivo de configuração.
+
+        @param path  -  caminho do config.yaml.
+        @returns BackupConfig
+        '''
+        if not os.path.isfile(path):
+            raise ConfigError('Arquivo de configuração não encontrado: %s' % path)
+        try:
+            with open(path) as f:
+                data = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise ConfigError('Erro de sintaxe em %s: %s' % (path, e))
+        return cls(data, path)
+
+    def get_vm(self, name):
+        '''
+        Retorna a VM pelo nome ou None se ela não existir na configuração.
+        '''
+        for vm in self.vms:
+            if vm.name == name:
+                return vm
+        return None
+
+    def enabled_vms(self):
+        return [vm for vm in self.vms if vm.enabled]
+
+
+def _default(value, default):
+    if value is None or value == '':
+        return default
+    return value
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Esta classe restaura a imagem de uma VM a partir de um backup do catálogo
+(sucessor da restauração com cp -a e gzip serial do vm_backup_restore.sh).
+
+A imagem é remontada ao lado da original (mesmo sistema de arquivos), com os
+membros gzip ou blocos do repositório descompactados em paralelo, buracos no
+lugar das regiões de zeros e o SHA-256 conferido durante a escrita. Só então a
+VM é desligada e a imagem trocada com um rename atômico; a imagem anterior é
+mantida como <imagem>.pre-restore-<data> (hardlink, sem cópia). Se a troca
+falhar, a VM volta a ser ligada com a imagem original.
+
+As etapas (desligamento, religamento) são registradas no arquivo de spans como
+operação restore, fora das comparações entre backups do trace_report.py.
+
+  Desenvolvido por: Diogenes Reis
+  Email: diofolken@gmail.com
+  Data de criação: 19/10/2026
+  Última modificação: 19/10/2026
+  Versão: 1.0
+'''
+import grp
+import os
+import pwd
+import time
+import zlib
+from backupstream import read_manifest, restore_stream
+from chunkstore import ChunkStore
+from tracing import PhaseTracer
+from vmbackup import VMBackup, human_size, virsh
+
+
+# ================================================================
+# class VMRestore
+# ================================================================
+class VMRestore(VMBackup):
+    '''
+    Restaura a imagem de uma VM.
+    Uso típico:
+
+        config = BackupConfig.load('config.yaml')
+        job = VMRestore(config, config.get_vm('VMSnipeit'))
+        if job.setup():
+            ok = job.restore()                       # último backup válido
+            ok = job.restore('VMSnipeit-full-20261019_030000', workers=8)
+    '''
+    def __init__(self, config, vm, run=None):
+        VMBackup.__init__(self, config, vm, run)
+        self.tracer = PhaseTracer(config.trace_file, vm.name, self.tracer.run, operation='restore')
+
+    def setup(self):
+        '''
+        Valida a VM. Ao contrário do backup, a imagem pode não existir (perda do disco).
+        '''
+        if not self.vm.vm_file:
+            self.log('ERRO: Caminho do arquivo da VM não definido')
+            return False
+        if virsh('dominfo', self.vm.name)[0] != 0:
+            self.log('ERRO: VM %s não existe no libvirt' % self.vm.name)
+            return False
+        return True
+
+    def select(self, name=None):
+        '''
+        @param name  - nome do backup (padrão: último backup válido da VM).
+        @returns - registro do catálogo ou None se não encontrado.
+        '''
+        if name is None:
+            return self.catalog.latest_good('vm', self.vm.name)
+        return self.catalog.find('vm', self.vm.name, name)
+
+    def image_owner(self):
+        '''
+        @returns (uid, gid, mode) da imagem atual ou, se ela não existir, do usuário libvirt-qemu.
+        '''
+        if os.path.exists(self.vm.vm_file):
+            st = os.stat(self.vm.vm_file)
+            return st.st_uid, st.st_gid, st.st_mode & 0o7777
+        try:
+            return pwd.getpwnam('libvirt-qemu').pw_uid, grp.getgrnam('libvirt-qemu').gr_gid, 0o600
+        except KeyError:
+            return os.getuid(), os.getgid(), 0o600
+
+    def unpack(self, row, target, workers):
+        '''
+        Descompacta o backup em target conferindo o checksum da imagem.
+
+        @returns True se a imagem restaurada confere com o backup ou False caso contrário.
+        '''
+        if row['store'] == 'chunks':
+            if self.store is None:
+                self.store = ChunkStore(self.config.chunk_store)
+            return self.store.restore(row['name'], target, workers)
+        manifest = read_manifest(row['path'])
+        expected = (manifest or {}).get('source_sha256') or row['sha256']
+        digest, size = restore_stream(row['path'], target, manifest, workers=workers)
+        if expected is not None and digest != expected:
+            self.log('ERRO: Checksum divergente: %s, esperado %s' % (digest, expected))
+            return False
+        if expected is None:
+            self.log('AVISO: Backup sem checksum registrado; imagem restaurada sem conferência')
+        return True
+
+    def check_restore_space(self, row):
+        '''
+        Verifica se o sistema de arquivos da imagem comporta a imagem restaurada.
+        '''
+        needed = row['source_bytes'] or 0
+        st = os.statvfs(os.path.dirname(os.path.abspath(self.vm.vm_file)))
+        available = st.f_bavail * st.f_frsize
+        if available < needed:
+            self.log('ERRO: Espaço insuficiente para restauração. Necessário: até %s, Disponível: %s'
+                     % (human_size(needed), human_size(available)))
+            return False
+        return True
+
+    def restore(self, name=None, workers=None, keep_original=True, start=True):
+        '''
+        Restaura a imagem da VM.
+
+        @param name           - nome do backup (padrão: último backup válido).
+        @param workers        - threads de descompactação (padrão: compress_workers).
+        @param keep_original  - mantém a imagem anterior como <imagem>.pre-restore-<data>.
+        @param start          - religa a VM se ela estava em execução.
+        @returns True se a imagem foi restaurada ou False caso contrário.
+        '''
+        vm_name = self.vm.name
+        row = self.select(name)
+        if row is None:
+            self.log('ERRO: Backup %s não encontrado no catálogo' % (name or 'válido'))
+            return False
+        workers = workers or self.btype.compress_workers
+        self.log('====== INICIANDO RESTAURAÇÃO DE %s ======' % vm_name)
+        self.log('Backup: %s (%s, %s)' % (row['name'], row['store'], time.strftime('%d/%m/%Y %H:%M', time.localtime(row['created']))))
+        self.notify('info', 'Iniciando restauração de %s a partir de %s' % (vm_name, row['name']))
+        if not self.check_restore_space(row):
+            return False
+
+        # A imagem é remontada com a VM ainda ligada; o downtime é só a troca do arquivo
+        partfile = self.vm.vm_file + '.restore-part'
+        started = time.time()
+        try:
+            ok = self.unpack(row, partfile, workers)
+        except (IOError, OSError, EOFError, zlib.error) as e:
+            self.log('ERRO: Backup ilegível: %s' % e)
+            ok = False
+        if not ok:
+            if os.path.exists(partfile):
+                os.remove(partfile)
+            self.log('ERRO: Falha ao restaurar a imagem. Imagem atual mantida.')
+            self.notify('critical', 'Falha na restauração de %s' % vm_name)
+            return False
+        uid, gid, mode = self.image_owner()
+        os.chown(partfile, uid, gid)
+        os.chmod(partfile, mode)
+        self.log('Imagem restaurada e conferida em %.1fs (%d threads)' % (time.time() - started, workers))
+
+        self.was_running = self.is_running()
+        if not self.stop():
+            os.remove(partfile)
+            return False
+        previous = None
+        replaced = False
+        try:
+            if keep_original and os.path.exists(self.vm.vm_file):
+                previous = '%s.pre-restore-%s' % (self.vm.vm_file, time.strftime('%Y%m%d_%H%M%S'))
+                os.link(self.vm.vm_file, previous)
+            os.rename(partfile, self.vm.vm_file)
+            replaced = True
+            fd = os.open(os.path.dirname(os.path.abspath(self.vm.vm_file)), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except (IOError, OSError) as e:
+            self.log('ERRO: Falha ao substituir a imagem: %s' % e)
+        finally:
+            # Sem a troca, a VM volta com a imagem original, e a imagem remontada é descartada
+            if os.path.exists(partfile):
+                os.remove(partfile)
+            if not replaced and previous is not None and os.path.exists(previous):
+                os.remove(previous)
+            restarted = self.restart() if self.down and (start or not replaced) else True
+        if not replaced:
+            self.log('ERRO: Falha ao restaurar a imagem. Imagem atual mantida.')
+            self.notify('critical', 'Falha na restauração de %s' % vm_name)
+            return False
+        if previous is not None:
+            self.log('Imagem anterior mantida em %s' % previous)
+        self.log('Imagem %s substituída' % self.vm.vm_file)
+
+        self.notify('info', 'Restauração de %s concluída a partir de %s' % (vm_name, row['name']))
+        self.log('====== RESTAURAÇÃO CONCLUÍDA ======')
+        return restarted
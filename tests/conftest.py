@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+'''
+  conftest.py - configuração comum dos testes (pytest).
+
+  As bibliotecas ficam em test/library e são importadas pelos scripts pelo
+  sys.path; os testes fazem o mesmo.
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'test', 'library'))
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+MB = 1024 * 1024
+
+
+class FakeVirsh:
+    '''
+    Domínios do virsh de teste (fake_virsh.py) e registro das chamadas.
+    '''
+    def __init__(self, directory):
+        self.directory = directory
+
+    def define(self, name, state='running', disk=None):
+        with open(os.path.join(self.directory, name + '.state'), 'w') as f:
+            f.write(state)
+        if disk:
+            with open(os.path.join(self.directory, name + '.disk'), 'w') as f:
+                f.write(disk)
+
+    def flag(self, name, flag, on=True):
+        path = os.path.join(self.directory, '%s.%s' % (name, flag))
+        if on:
+            open(path, 'w').close()
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def state(self, name):
+        with open(os.path.join(self.directory, name + '.state')) as f:
+            return f.read().strip()
+
+    def calls(self, name=None):
+        '''
+        @returns - lista de (epoch, [argumentos]) das chamadas, opcionalmente só de uma VM.
+        '''
+        path = os.path.join(self.directory, 'calls.log')
+        if not os.path.exists(path):
+            return []
+        calls = []
+        with open(path) as f:
+            for line in f:
+                stamp, args = line.rstrip('\n').split(' ', 1)
+                args = args.split()
+                if name is None or name in args:
+                    calls.append((float(stamp), args))
+        return calls
+
+    def commands(self, name=None):
+        return [args[0] for stamp, args in self.calls(name) if args[0] != 'domstate']
+
+
+@pytest.fixture
+def virsh(tmp_path, monkeypatch):
+    '''
+    Instala o virsh de teste no PATH e um DomainWatcher novo (sem eventos, consultas a cada 50ms).
+    '''
+    import domwatch
+    state_dir = tmp_path / 'virsh'
+    bin_dir = tmp_path / 'bin'
+    state_dir.mkdir()
+    bin_dir.mkdir()
+    wrapper = bin_dir / 'virsh'
+    wrapper.write_text('#!/bin/sh\nexec "%s" "%s" "$@"\n' % (sys.executable, os.path.join(TESTS_DIR, 'fake_virsh.py')))
+    wrapper.chmod(0o755)
+    monkeypatch.setenv('PATH', '%s%s%s' % (bin_dir, os.pathsep, os.environ.get('PATH', '')))
+    monkeypatch.setenv('FAKE_VIRSH_DIR', str(state_dir))
+    watcher = domwatch.DomainWatcher(poll_interval=0.05)
+    watcher.backend = 'poll'
+    monkeypatch.setattr(domwatch, '_watcher', watcher)
+    return FakeVirsh(str(state_dir))
+
+
+def make_image(path, size=32 * MB, data_blocks=(0, 2, 5), block=4 * MB):
+    '''
+    Cria uma imagem esparsa com blocos de dados aleatórios nos índices informados.
+    '''
+    with open(path, 'wb') as f:
+        f.truncate(size)
+        for i in data_blocks:
+            f.seek(i * block)
+            f.write(os.urandom(block))
+    return path
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+'''
+  fake_virsh.py - virsh de teste, instalado no PATH pelos testes das VMs.
+
+  O estado de cada domínio fica em $FAKE_VIRSH_DIR/<vm>.state (a existência do
+  arquivo indica que o domínio existe) e cada chamada é registrada em
+  $FAKE_VIRSH_DIR/calls.log como "<epoch> <argumentos>". Arquivos de controle:
+
+    <vm>.disk          - imagem listada pelo domblklist (dispositivo vda)
+    <vm>.noshutdown    - shutdown (ACPI) é ignorado pelo sistema convidado
+    <vm>.nostart       - start falha
+    <vm>.nosnapshot    - snapshot-create-as falha
+'''
+import os
+import sys
+import time
+
+STATE_DIR = os.environ['FAKE_VIRSH_DIR']
+
+
+def path(vm, suffix):
+    return os.path.join(STATE_DIR, vm + suffix)
+
+
+def get_state(vm):
+    with open(path(vm, '.state')) as f:
+        return f.read().strip()
+
+
+def set_state(vm, state):
+    with open(path(vm, '.state'), 'w') as f:
+        f.write(state)
+
+
+def main(args):
+    with open(os.path.join(STATE_DIR, 'calls.log'), 'a') as f:
+        f.write('%.6f %s\n' % (time.time(), ' '.join(args)))
+    cmd = args[0]
+    if cmd == 'event':
+        return 0                # sem eventos: o watcher usa consultas periódicas
+    vm = [a for a in args[1:] if not a.startswith('-')][0]
+    if not os.path.exists(path(vm, '.state')):
+        sys.stderr.write("error: failed to get domain '%s'\n" % vm)
+        return 1
+    if cmd == 'domstate':
+        print(get_state(vm))
+    elif cmd == 'dominfo':
+        print('Name:           %s\nState:          %s' % (vm, get_state(vm)))
+    elif cmd == 'shutdown':
+        if not os.path.exists(path(vm, '.noshutdown')):
+            time.sleep(0.05)
+            set_state(vm, 'shut off')
+    elif cmd == 'destroy':
+        set_state(vm, 'shut off')
+    elif cmd == 'start':
+        if os.path.exists(path(vm, '.nostart')):
+            sys.stderr.write('error: Failed to start domain %s\n' % vm)
+            return 1
+        time.sleep(0.05)
+        set_state(vm, 'paused' if '--paused' in args else 'running')
+    elif cmd == 'domblklist':
+        with open(path(vm, '.disk')) as f:
+            disk = f.read().strip()
+        print(' Target   Source\n------------------------\n vda      %s' % disk)
+    elif cmd == 'snapshot-create-as':
+        if os.path.exists(path(vm, '.nosnapshot')):
+            sys.stderr.write('error: unsupported configuration\n')
+            return 1
+        spec = args[args.index('--diskspec') + 1]
+        overlay = spec.split('file=', 1)[1]
+        open(overlay, 'w').close()
+    elif cmd == 'blockcommit':
+        if get_state(vm) not in ('running', 'paused'):
+            sys.stderr.write('error: domain is not running\n')
+            return 1
+    else:
+        sys.stderr.write('fake virsh: comando não suportado: %s\n' % cmd)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+'''
+  sftp_server.py - servidor SSH/SFTP local (paramiko) para os testes da réplica.
+
+  Cada conexão do paramiko.SSHClient é atendida por um Transport em modo servidor
+  na outra ponta de um socketpair, sem rede. O servidor aceita qualquer chave,
+  expõe o sistema de arquivos local por SFTP e executa apenas "sha256sum <arquivo>".
+  Atributos de controle:
+
+    corrupt   - sha256sum devolve um checksum errado (bloco corrompido no servidor)
+    writes    - caminhos gravados por SFTP, na ordem (blocos enviados)
+'''
+import hashlib
+import os
+import shlex
+import socket
+import threading
+
+import paramiko
+from paramiko.sftp import SFTP_OK
+from paramiko.sftp_attr import SFTPAttributes
+from paramiko.sftp_handle import SFTPHandle
+from paramiko.sftp_server import SFTPServer
+from paramiko.sftp_si import SFTPServerInterface
+
+
+class Handle(SFTPHandle):
+    def stat(self):
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+class LocalSFTP(SFTPServerInterface):
+    def __init__(self, interface, *args, **kw):
+        SFTPServerInterface.__init__(self, interface, *args, **kw)
+        self.server = interface.server
+
+    def _convert(self, err):
+        return SFTPServer.convert_errno(err.errno)
+
+    def list_folder(self, path):
+        try:
+            result = []
+            for name in os.listdir(path):
+                attr = SFTPAttributes.from_stat(os.stat(os.path.join(path, name)))
+                attr.filename = name
+                result.append(attr)
+            return result
+        except OSError as e:
+            return self._convert(e)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(path))
+        except OSError as e:
+            return self._convert(e)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        try:
+            fd = os.open(path, flags, 0o644)
+        except OSError as e:
+            return self._convert(e)
+        if flags & os.O_WRONLY:
+            mode = 'ab' if flags & os.O_APPEND else 'wb'
+            self.server.writes.append(path)
+        elif flags & os.O_RDWR:
+            mode = 'a+b' if flags & os.O_APPEND else 'r+b'
+            self.server.writes.append(path)
+        else:
+            mode = 'rb'
+        handle = Handle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            return self._convert(e)
+        return SFTP_OK
+
+    def posix_rename(self, oldpath, newpath):
+        try:
+            os.rename(oldpath, newpath)
+        except OSError as e:
+            return self._convert(e)
+        return SFTP_OK
+
+    rename = posix_rename
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(path)
+        except OSError as e:
+            return self._convert(e)
+        return SFTP_OK
+
+
+class Interface(paramiko.ServerInterface):
+    def __init__(self, server):
+        self.server = server
+
+    def get_allowed_auths(self, username):
+        return 'publickey'
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == 'session' else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        args = shlex.split(command.decode('utf-8'))
+        if args[0] != 'sha256sum' or len(args) != 2:
+            return False
+        # A resposta ao exec só é enviada depois do retorno: a saída espera um pouco
+        threading.Timer(0.05, self._sha256sum, (channel, args[1])).start()
+        return True
+
+    def _sha256sum(self, channel, path):
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if self.server.corrupt:
+            digest = hashlib.sha256(digest.encode('ascii')).hexdigest()
+        channel.sendall(('%s  %s\n' % (digest, path)).encode('utf-8'))
+        channel.send_exit_status(0)
+        channel.close()
+
+
+class SFTPTestServer:
+    '''
+    Uso típico (com o monkeypatch do pytest):
+
+        server = SFTPTestServer()
+        server.install(monkeypatch)     # SSHClient.connect passa a usar o servidor local
+    '''
+    def __init__(self):
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.corrupt = False
+        self.writes = []
+        self.connections = 0
+        self.transports = []
+
+    def serve(self, sock):
+        transport = paramiko.Transport(sock)
+        transport.add_server_key(self.host_key)
+        transport.set_subsystem_handler('sftp', SFTPServer, LocalSFTP)
+        transport.start_server(server=Interface(self))
+        self.transports.append(transport)
+
+    def install(self, monkeypatch):
+        connect = paramiko.SSHClient.connect
+        server = self
+
+        def local_connect(client, hostname, *args, **kw):
+            ours, theirs = socket.socketpair()
+            server.connections += 1
+            threading.Thread(target=server.serve, args=(theirs,)).start()
+            kw['sock'] = ours
+            return connect(client, hostname, *args, **kw)
+        monkeypatch.setattr(paramiko.SSHClient, 'connect', local_connect)
+
+    def close(self):
+        for transport in self.transports:
+            transport.close()
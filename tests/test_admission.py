@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+'''
+  test_admission.py - testes da reserva de espaço do lote de backups (AdmissionController).
+'''
+import admission
+from admission import AdmissionController
+from conftest import MB
+from test_vmbackup import make_config
+from vmbackup import VMBackup
+
+
+def batch(tmp_path, monkeypatch, free):
+    '''
+    Lote de 3 VMs (imagens de 32 MB com 12 MB alocados); só a vm1 tem histórico (taxa 0,25).
+    O espaço livre do destino é free[0], que os testes alteram.
+    '''
+    config = make_config(tmp_path, [('vm1', 'none'), ('vm2', 'none'), ('vm3', 'none')])
+    jobs = [VMBackup(config, config.get_vm(name)) for name in ('vm1', 'vm2', 'vm3')]
+    jobs[0].catalog.record('vm', 'vm1', 'vm1-full-1', str(tmp_path / 'vm1-full-1.qcow2.gz'), store='gzip',
+                           source_bytes=32 * MB, stored_bytes=8 * MB)
+    monkeypatch.setattr(admission, 'free_bytes', lambda path: (1, free[0]))
+    return jobs
+
+
+def test_batch_is_admitted_within_budget(tmp_path, monkeypatch):
+    free = [10 * MB + int(8.8 * MB) + int(13.2 * MB) + 5 * MB]
+    # Vale para o lote inteiro: a falta de espaço para a vm3 antecipa a retenção de todas as VMs
+    monkeypatch.setattr(VMBackup, 'retention', lambda job, keep=None: None)
+    jobs = batch(tmp_path, monkeypatch, free)
+    reservations = AdmissionController(min_free=10 * MB, margin=0.1).admit(jobs)
+
+    assert [r['job'] for r in reservations] == jobs
+    assert reservations[0]['ratio'] == 0.25 and reservations[0]['bytes'] == int(8 * MB * 1.1)
+    # Sem histórico, a previsão é o que está alocado na imagem
+    assert reservations[1]['ratio'] is None and reservations[1]['bytes'] == int(12 * MB * 1.1)
+    assert [r['admitted'] for r in reservations] == [True, True, False]
+    # Cada VM vê o que sobrou das reservas anteriores
+    budget = free[0] - 10 * MB
+    assert [r['available'] for r in reservations] == [budget, budget - int(8.8 * MB), 5 * MB]
+
+
+def test_low_free_space_expires_backups_early(tmp_path, monkeypatch):
+    free = [10 * MB]
+    jobs = batch(tmp_path, monkeypatch, free)
+    calls = []
+
+    def retention(job, keep=None):
+        calls.append((job.vm.name, keep))
+        free[0] += 10 * MB
+    for job in jobs:
+        monkeypatch.setattr(job, 'retention', lambda keep=None, job=job: retention(job, keep))
+    keep = jobs[0].btype.retention_count
+
+    reservations = AdmissionController(min_free=5 * MB).admit(jobs)
+    # A retenção normal (3 x 10 MB) não basta para os ~40 MB previstos: o lote expira mais um de cada VM
+    assert calls == [(n, keep) for n in ('vm1', 'vm2', 'vm3')] + [(n, keep - 1) for n in ('vm1', 'vm2', 'vm3')]
+    assert [r['admitted'] for r in reservations] == [True, True, True]
+
+    # Sem espaço mesmo após a retenção: nenhuma VM do lote é admitida
+    del calls[:]
+    monkeypatch.setattr(admission, 'free_bytes', lambda path: (1, 10 * MB))
+    reservations = AdmissionController(min_free=5 * MB).admit(jobs)
+    assert len(calls) == 6
+    assert [r['admitted'] for r in reservations] == [False, False, False]
+    assert reservations[0]['available'] == 5 * MB
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+'''
+  test_backupstream.py - testes do backup em passagem única (gzip, checksums e verificação).
+'''
+import gzip
+import hashlib
+import os
+import subprocess
+
+from conftest import MB, make_image
+from backupstream import file_sha256, read_manifest, restore_stream, stream_backup, verify_artifact, write_manifest
+
+
+def backup(tmp_path, **kw):
+    source = make_image(str(tmp_path / 'vm.img'))
+    target = str(tmp_path / 'vm.img.gz')
+    return source, target, stream_backup(source, target, **kw)
+
+
+def test_round_trip_keeps_image_checksum(tmp_path):
+    source, target, manifest = backup(tmp_path)
+    sha256, size = file_sha256(source)
+    assert manifest['source_sha256'] == sha256 and manifest['source_bytes'] == size == 32 * MB
+    assert manifest['artifact_sha256'] == file_sha256(target)[0]
+    assert read_manifest(target) == manifest
+    assert not os.path.exists(target + '.part')
+
+    assert restore_stream(target, str(tmp_path / 'restored.img')) == (sha256, size)
+    assert file_sha256(str(tmp_path / 'restored.img')) == (sha256, size)
+
+
+def test_artifact_is_plain_gzip(tmp_path):
+    source, target, manifest = backup(tmp_path)
+    assert subprocess.call(['gzip', '-t', target]) == 0
+    with gzip.open(target, 'rb') as f:
+        image = hashlib.sha256()
+        for data in iter(lambda: f.read(MB), b''):
+            image.update(data)
+    assert image.hexdigest() == manifest['source_sha256']
+
+
+def test_verify_detects_flipped_byte_and_truncation(tmp_path):
+    source, target, manifest = backup(tmp_path)
+    assert verify_artifact(target)
+    with open(target, 'rb') as f:
+        data = bytearray(f.read())
+
+    # Byte alterado no meio de um membro com dados, mesmo com o checksum do .gz atualizado
+    flipped = bytearray(data)
+    flipped[manifest['members'][0] // 2] ^= 0xff
+    with open(target, 'wb') as f:
+        f.write(flipped)
+    assert not verify_artifact(target)
+    forged = dict(manifest, artifact_sha256=hashlib.sha256(flipped).hexdigest())
+    assert not verify_artifact(target, forged)
+
+    # Último membro truncado
+    with open(target, 'wb') as f:
+        f.write(data[:-10])
+    assert subprocess.call(['gzip', '-t', target], stderr=subprocess.DEVNULL) != 0
+    assert not verify_artifact(target)
+    write_manifest(target, dict(manifest, artifact_sha256=hashlib.sha256(data[:-10]).hexdigest(),
+                                artifact_bytes=len(data) - 10))
+    assert not verify_artifact(target)
+
+
+def test_parallel_members_match_serial_backup(tmp_path):
+    source = make_image(str(tmp_path / 'vm.img'), size=30 * MB + 123, data_blocks=(0, 1, 3, 4, 7))
+    serial = stream_backup(source, str(tmp_path / 'serial.gz'))
+    parallel = stream_backup(source, str(tmp_path / 'parallel.gz'), workers=4)
+    # Um membro gzip por bloco, na ordem, independente do número de threads
+    assert parallel['members'] == serial['members'] and len(parallel['members']) == 8
+    assert parallel['artifact_sha256'] == serial['artifact_sha256']
+    assert subprocess.call(['gzip', '-t', str(tmp_path / 'parallel.gz')]) == 0
+
+    sha256, size = file_sha256(source)
+    assert restore_stream(str(tmp_path / 'parallel.gz'), str(tmp_path / 'restored.img'), workers=4) == (sha256, size)
+    assert verify_artifact(str(tmp_path / 'parallel.gz'), workers=4)
+    # Sem manifesto, a restauração lê o .gz como um gzip comum
+    os.remove(str(tmp_path / 'parallel.gz.manifest'))
+    assert restore_stream(str(tmp_path / 'parallel.gz'), str(tmp_path / 'plain.img')) == (sha256, size)
+
+
+def test_holes_are_not_read_and_restore_stays_sparse(tmp_path):
+    source = make_image(str(tmp_path / 'vm.img'))
+    with open(source, 'r+b') as f:
+        f.seek(6 * 4 * MB)
+        f.write(b'\0' * 4 * MB)     # bloco alocado, mas só com zeros
+    manifest = stream_backup(source, str(tmp_path / 'vm.img.gz'))
+    # Só os blocos alocados são lidos (3 com dados + 1 de zeros); 5 de 8 viram membros de zeros
+    assert manifest['read_bytes'] == 4 * 4 * MB
+    assert manifest['zero_blocks'] == 5
+    assert manifest['source_sha256'] == file_sha256(source)[0]
+
+    restored = str(tmp_path / 'restored.img')
+    assert restore_stream(str(tmp_path / 'vm.img.gz'), restored) == file_sha256(source)
+    st = os.stat(restored)
+    assert st.st_size == 32 * MB
+    # Apenas os 3 blocos com dados ocupam disco
+    assert st.st_blocks * 512 <= 3 * 4 * MB + MB
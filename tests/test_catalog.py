@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+'''
+  test_catalog.py - testes do BackupCatalog (migrações concorrentes, atualização e retenção).
+'''
+import multiprocessing
+import os
+import sqlite3
+import time
+
+from catalog import MIGRATIONS, BackupCatalog
+
+
+def open_catalog(path, go, errors):
+    go.wait()
+    try:
+        BackupCatalog(path).close()
+    except sqlite3.Error as e:
+        errors.put(str(e))
+
+
+def test_concurrent_open_applies_each_migration_once(tmp_path):
+    ctx = multiprocessing.get_context('fork')
+    for attempt in range(5):
+        path = str(tmp_path / ('catalog%d.db' % attempt))
+        go, errors = ctx.Event(), ctx.Queue()
+        procs = [ctx.Process(target=open_catalog, args=(path, go, errors)) for i in range(6)]
+        for proc in procs:
+            proc.start()
+        go.set()
+        for proc in procs:
+            proc.join(30)
+        assert errors.empty()
+        db = sqlite3.connect(path)
+        assert db.execute('pragma user_version').fetchone()[0] == len(MIGRATIONS)
+        db.close()
+
+
+def test_open_upgrades_old_catalog(tmp_path):
+    path = str(tmp_path / 'catalog.db')
+    BackupCatalog(path).close()
+    db = sqlite3.connect(path)
+    db.execute('pragma user_version = 1')
+    db.execute('alter table artifacts drop column replicated')
+    db.execute('alter table artifacts drop column marker')
+    db.execute('alter table artifacts drop column checked')
+    db.commit()
+    db.close()
+    catalog = BackupCatalog(path)
+    catalog.record('ne', 'SW1-TI', 'sw1-ti_1', '/backup/sw1-ti_1.cnf', marker='abc')
+    assert catalog.latest_good('ne', 'SW1-TI')['marker'] == 'abc'
+    catalog.close()
+
+
+def test_record_again_keeps_verification_and_replica(tmp_path):
+    catalog = BackupCatalog(str(tmp_path / 'catalog.db'))
+    path = str(tmp_path / 'vm1-full-1.qcow2.gz')
+    first = catalog.record('vm', 'vm1', 'vm1-full-1', path, store='gzip', artifact_sha256='aa')
+    catalog.record_verify(first, 'ok')
+    catalog.record_replicated(first)
+    catalog.record_check(first)
+
+    # Registrado de novo (ex: adotado), com o mesmo conteúdo: nada se perde
+    again = catalog.record('vm', 'vm1', 'vm1-full-1', path, store='gzip', stored_bytes=10)
+    row = catalog.latest_good('vm', 'vm1')
+    assert again == first == row['id']
+    assert row['verify_status'] == 'ok' and row['replicated'] and row['checked'] and row['artifact_sha256'] == 'aa'
+    assert row['stored_bytes'] == 10
+
+    # Conteúdo diferente: a verificação e a réplica anteriores não valem mais
+    catalog.record('vm', 'vm1', 'vm1-full-1', path, store='gzip', artifact_sha256='bb')
+    row = catalog.latest_good('vm', 'vm1')
+    assert row['verified'] is None and row['verify_status'] is None and row['replicated'] is None
+    assert catalog.pending_replication('vm')[0]['id'] == first
+    catalog.close()
+
+
+def test_failed_backups_expire(tmp_path):
+    catalog = BackupCatalog(str(tmp_path / 'catalog.db'))
+    now = time.time()
+
+    def backup(name, age_days, status='ok'):
+        path = str(tmp_path / (name + '.qcow2.gz'))
+        with open(path, 'w') as f:
+            f.write(name)
+        with open(path + '.manifest', 'w') as f:
+            f.write('{}')
+        catalog.record('vm', 'vm1', name, path, status, store='gzip', created=now - age_days * 86400)
+        return path
+
+    old_failed = backup('vm1-full-1', 5, 'failed')
+    good = [backup('vm1-full-2', 4), backup('vm1-full-3', 3)]
+    new_failed = backup('vm1-full-4', 1, 'failed')
+
+    removed = catalog.prune('vm', 'vm1', keep=2, sidecars=('.manifest',), store='gzip')
+    # A falha anterior ao último backup válido é removida; a mais nova fica até haver um válido depois dela
+    assert [r['name'] for r in removed] == ['vm1-full-1']
+    assert not os.path.exists(old_failed) and not os.path.exists(old_failed + '.manifest')
+    assert all(os.path.exists(p) for p in good + [new_failed])
+    assert len(catalog.artifacts('vm', 'vm1')) == 2
+
+    # Pela idade, a falha também expira
+    removed = catalog.prune('vm', 'vm1', max_age_days=0.5, store='gzip')
+    assert sorted(r['name'] for r in removed) == ['vm1-full-2', 'vm1-full-3', 'vm1-full-4']
+    assert catalog.artifacts('vm', 'vm1', status='failed') == []
+    catalog.close()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+'''
+  test_chunkstore.py - testes do repositório de blocos (contagem de referências e limpeza).
+'''
+import os
+
+from conftest import MB, make_image
+from chunkstore import ChunkStore
+from vmbackup import VMBackup
+from vmconfig import BackupConfig
+
+
+def image(tmp_path, name, blocks, block=4 * MB):
+    '''
+    Imagem esparsa em que o bloco i tem o conteúdo blocks[i] (None = buraco).
+    '''
+    path = str(tmp_path / name)
+    with open(path, 'wb') as f:
+        for i, fill in enumerate(blocks):
+            if fill is not None:
+                f.seek(i * block)
+                f.write(fill * block)
+        f.truncate(len(blocks) * block)
+    return path
+
+
+def chunk_files(store):
+    return sorted(f for d, _, names in os.walk(store.chunk_dir) for f in names)
+
+
+def test_refcounts_and_prune_free_only_orphaned_chunks(tmp_path):
+    store = ChunkStore(str(tmp_path / 'store'))
+    store.backup(image(tmp_path, 'a.img', [b'A', b'S', None]), 'vm1-full-1')
+    store.backup(image(tmp_path, 'b.img', [b'B', b'S', None]), 'vm1-full-2')
+    store.backup(image(tmp_path, 'c.img', [b'C', b'B', None]), 'vm1-full-3')
+    assert sorted(store.refcounts().values()) == [1, 1, 2, 2]      # A, C únicos; S e B compartilhados
+    assert len(chunk_files(store)) == 4
+
+    # Remove o 1: A deixa de ser referenciado, S continua no 2
+    expired, removed, freed = store.prune(['vm1-full-1'])
+    assert expired == ['vm1-full-1'] and removed == 1 and freed > 0
+    assert len(chunk_files(store)) == 3
+    assert store.verify('vm1-full-2') == [] and store.verify('vm1-full-3') == []
+    assert store.restore('vm1-full-2', str(tmp_path / 'b.restored'))
+
+    # Remove o 2: S fica órfão, B continua referenciado pelo 3
+    expired, removed, freed = store.prune(['vm1-full-2', 'inexistente'])
+    assert expired == ['vm1-full-2'] and removed == 1
+    assert store.verify('vm1-full-3') == []
+    assert store.restore('vm1-full-3', str(tmp_path / 'c.restored'))
+    assert store.refcounts() and set(store.refcounts().values()) == {1}
+
+
+def test_retention_keeps_last_good_backups_by_catalog(tmp_path):
+    config = BackupConfig({
+        'global': {'backup_base_dir': str(tmp_path / 'backup'), 'log_dir': str(tmp_path),
+                   'chunk_store': str(tmp_path / 'store'), 'catalog': str(tmp_path / 'catalog.db'),
+                   'trace_file': None, 'min_free_gb': 0},
+        'vms': [{'name': 'vm1', 'enabled': True, 'vm_file': make_image(str(tmp_path / 'vm1.img')),
+                 'backup_types': [{'type': 'offline', 'store': 'chunks', 'retention_count': 2}]}]})
+    job = VMBackup(config, config.get_vm('vm1'))
+    store = job.store
+
+    def backup(name, fills, status, created):
+        store.backup(image(tmp_path, name + '.img', fills), name)
+        job.catalog.record('vm', 'vm1', name, store.manifest_path(name), status, store='chunks', created=created)
+
+    backup('vm1-full-1', [b'1', b'S'], 'ok', 1000)
+    backup('vm1-full-2', [b'2', b'S'], 'ok', 2000)
+    # Os mais novos falharam (ex: verificação) e não contam para a retenção
+    backup('vm1-full-3', [b'3', b'S'], 'failed', 3000)
+    backup('vm1-full-4', [b'4', b'S'], 'failed', 4000)
+
+    job.retention()
+    # Os 2 últimos backups válidos continuam íntegros; as falhas mais novas ficam até haver um válido depois
+    assert store.manifests() == ['vm1-full-1', 'vm1-full-2', 'vm1-full-3', 'vm1-full-4']
+    assert store.verify('vm1-full-1') == [] and store.verify('vm1-full-2') == []
+
+    backup('vm1-full-5', [b'5', b'S'], 'ok', 5000)
+    job.retention()
+    # O 1 sai pela retenção e as falhas anteriores ao 5 saem com ele; S (compartilhado) fica
+    assert store.manifests() == ['vm1-full-2', 'vm1-full-5']
+    assert store.verify('vm1-full-2') == [] and store.verify('vm1-full-5') == []
+    assert len(chunk_files(store)) == 3
+    assert [r['name'] for r in job.catalog.artifacts('vm', 'vm1')] == ['vm1-full-5', 'vm1-full-2']
+    assert job.catalog.artifacts('vm', 'vm1', status='failed') == []
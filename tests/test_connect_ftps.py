@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+'''
+  test_connect_ftps.py - testes do MyFTPS contra um servidor FTP local (pyftpdlib, sem SSL).
+'''
+import json
+import os
+import threading
+import time
+
+import pytest
+
+pyftpdlib = pytest.importorskip('pyftpdlib')
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.filesystems import AbstractedFS
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import FTPServer
+
+import connect_ftps
+from connect_ftps import MyFTPS
+
+USER, PSWD = 'omc', 'secret'
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 123)
+
+
+class DropFS(AbstractedFS):
+    '''
+    Derruba a conexão de controle no meio do primeiro RETR de um arquivo marcado.
+    '''
+    drop_after = None
+
+    def open(self, filename, mode):
+        f = AbstractedFS.open(self, filename, mode)
+        if DropFS.drop_after is None or not filename.endswith('drop.bin'):
+            return f
+        limit, DropFS.drop_after = DropFS.drop_after, None
+        cmd_channel = self.cmd_channel
+
+        class Dropping(object):
+            sent = 0
+
+            def __getattr__(self, name):
+                return getattr(f, name)
+
+            def read(self, n=-1):
+                if self.sent >= limit:
+                    cmd_channel.close()
+                    return b''
+                data = f.read(min(n, limit - self.sent))
+                self.sent += len(data)
+                return data
+        return Dropping()
+
+
+def make_handler(mlsd=True):
+    class Handler(FTPHandler):
+        abstracted_fs = DropFS
+        use_sendfile = False            # RETR passa pelo read() do DropFS
+        commands = []
+
+        def pre_process_command(self, line, cmd, arg):
+            Handler.commands.append((cmd, arg))
+            return FTPHandler.pre_process_command(self, line, cmd, arg)
+
+        if not mlsd:
+            def ftp_MLSD(self, path):
+                self.respond('502 Command "MLSD" not implemented.')
+    return Handler
+
+
+@pytest.fixture
+def server(request, tmp_path):
+    root = tmp_path / 'remote'
+    root.mkdir()
+    authorizer = DummyAuthorizer()
+    authorizer.add_user(USER, PSWD, str(root), perm='elr')
+    handler = make_handler(getattr(request, 'param', True))
+    handler.authorizer = authorizer
+    srv = FTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=srv.serve_forever, kwargs={'timeout': 0.05})
+    thread.daemon = True
+    thread.start()
+    yield root, srv.address[1], handler
+    srv.close_all()
+    thread.join(5)
+
+
+def connect(port, **kw):
+    ftps = MyFTPS(secure=False, blocksize=65536, **kw)
+    assert ftps.connect('127.0.0.1', port, USER, PSWD)
+    return ftps
+
+
+def write_remote(root, name, data, mtime):
+    path = root / name
+    path.write_bytes(data)
+    os.utime(str(path), (mtime, mtime))
+    return path
+
+
+@pytest.mark.parametrize('server', [True, False], ids=['mlsd', 'nlst'], indirect=True)
+def test_listdir_and_latest(server):
+    root, port, handler = server
+    write_remote(root, 'dump_a.zip', b'a' * 10, 1700000000)
+    write_remote(root, 'dump_b.zip', b'b' * 20, 1700000500)
+    write_remote(root, 'other.txt', b'c', 1700009999)
+    if handler.ftp_MLSD is FTPHandler.ftp_MLSD:
+        (root / 'subdir').mkdir()       # diretórios só são distinguidos pelo MLSD
+
+    ftps = connect(port)
+    files = ftps.listdir('/')
+    assert files == {'dump_a.zip': {'modify': 1700000000, 'size': 10},
+                     'dump_b.zip': {'modify': 1700000500, 'size': 20},
+                     'other.txt': {'modify': 1700009999, 'size': 1}}
+    assert ftps.latest('/', prefix='dump_') == ('dump_b.zip', files['dump_b.zip'])
+    ftps.close()
+    used = set(cmd for cmd, arg in handler.commands)
+    if handler.ftp_MLSD is FTPHandler.ftp_MLSD:
+        assert 'NLST' not in used
+    else:
+        assert set(['NLST', 'MDTM', 'SIZE']) <= used
+
+
+def test_fetch_latest_downloads_and_sets_mtime(server, tmp_path):
+    root, port, handler = server
+    write_remote(root, 'dump.zip', PAYLOAD, 1700000000)
+    local = tmp_path / 'local'
+    local.mkdir()
+
+    ftps = connect(port)
+    path = ftps.fetch_latest('/', str(local))
+    ftps.close()
+    assert open(path, 'rb').read() == PAYLOAD
+    assert os.path.getmtime(path) == 1700000000
+    assert sorted(os.listdir(str(local))) == ['dump.zip']
+
+
+def test_resume_part_with_rest(server, tmp_path):
+    root, port, handler = server
+    write_remote(root, 'dump.zip', PAYLOAD, 1700000000)
+    local = tmp_path / 'local'
+    local.mkdir()
+    (local / 'dump.zip.part').write_bytes(PAYLOAD[:1000000])
+    (local / 'dump.zip.part.src').write_text(json.dumps({'size': len(PAYLOAD), 'modify': 1700000000}))
+
+    ftps = connect(port)
+    path = ftps.fetch_latest('/', str(local))
+    ftps.close()
+    assert open(path, 'rb').read() == PAYLOAD
+    assert ('REST', '1000000') in handler.commands
+    assert sorted(os.listdir(str(local))) == ['dump.zip']
+
+
+def test_stale_part_is_discarded_when_remote_changed(server, tmp_path):
+    root, port, handler = server
+    write_remote(root, 'dump.zip', PAYLOAD, 1700000900)
+    local = tmp_path / 'local'
+    local.mkdir()
+    # .part de uma versão anterior do arquivo remoto (mesmo tamanho, outra data)
+    (local / 'dump.zip.part').write_bytes(b'x' * 1000000)
+    (local / 'dump.zip.part.src').write_text(json.dumps({'size': len(PAYLOAD), 'modify': 1700000000}))
+
+    ftps = connect(port)
+    path = ftps.fetch_latest('/', str(local))
+    ftps.close()
+    assert open(path, 'rb').read() == PAYLOAD
+    assert not [arg for cmd, arg in handler.commands if cmd == 'REST']
+
+
+def test_part_without_source_is_discarded(server, tmp_path):
+    root, port, handler = server
+    write_remote(root, 'dump.zip', PAYLOAD, 1700000000)
+    local = tmp_path / 'local'
+    local.mkdir()
+    (local / 'dump.zip.part').write_bytes(b'x' * 1000)
+
+    ftps = connect(port)
+    path = ftps.fetch_latest('/', str(local))
+    ftps.close()
+    assert open(path, 'rb').read() == PAYLOAD
+
+
+def test_reconnect_and_resume_after_drop(server, tmp_path, monkeypatch):
+    root, port, handler = server
+    write_remote(root, 'drop.bin', PAYLOAD, 1700000000)
+    local = tmp_path / 'local'
+    local.mkdir()
+    monkeypatch.setattr(DropFS, 'drop_after', 1048576)
+    monkeypatch.setattr(connect_ftps.time, 'sleep', lambda s: None)
+
+    ftps = connect(port, retries=2)
+    path = ftps.fetch_latest('/', str(local))
+    ftps.close()
+    assert open(path, 'rb').read() == PAYLOAD
+    assert [cmd for cmd, arg in handler.commands].count('USER') == 2
+    rest = [int(arg) for cmd, arg in handler.commands if cmd == 'REST']
+    assert len(rest) == 1 and 0 < rest[0] <= 1048576
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+'''
+  test_domwatch.py - testes do DomainWatcher com um 'virsh event' de teste.
+'''
+import logging
+import os
+import time
+
+import domwatch
+
+# Mais que o buffer de um pipe (64 KB) em stderr antes do evento, e um erro ao sair
+VIRSH = '''#!/bin/sh
+[ "$1" = event ] || exit 1
+head -c 100000 /dev/zero | tr '\\0' x >&2
+echo >&2
+echo "event 'lifecycle' for domain 'vm1': Stopped Shutdown"
+echo "error: Disconnected from qemu:///system due to end of file" >&2
+exit 1
+'''
+
+
+def test_virsh_event_stderr_does_not_block_events(tmp_path, monkeypatch, caplog):
+    wrapper = tmp_path / 'virsh'
+    wrapper.write_text(VIRSH)
+    wrapper.chmod(0o755)
+    monkeypatch.setenv('PATH', '%s%s%s' % (tmp_path, os.pathsep, os.environ.get('PATH', '')))
+    monkeypatch.setattr(domwatch, 'libvirt', None)
+
+    watcher = domwatch.DomainWatcher(poll_interval=30)
+    with caplog.at_level(logging.DEBUG):
+        watcher.start()
+        try:
+            assert watcher.backend == 'virsh'
+            # O evento chega mesmo com o virsh tendo escrito muito em stderr antes
+            assert watcher.wait_for_state('vm1', ('shut off',), 5)
+            deadline = time.time() + 5
+            while watcher.backend != 'poll' and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+    assert watcher.backend == 'poll'
+    errors = [r.getMessage() for r in caplog.records if r.levelno == logging.ERROR]
+    assert errors == ['virsh event encerrado (código 1): '
+                      'error: Disconnected from qemu:///system due to end of file']
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+'''
+  test_iogovernor.py - testes da janela AIMD do IOGovernor.
+'''
+import time
+
+import iogovernor
+from conftest import MB
+from iogovernor import IOGovernor
+
+
+def test_slow_fdatasync_shrinks_window(tmp_path, monkeypatch):
+    # O write() vai para o cache de páginas; a demora do disco só aparece no fdatasync
+    monkeypatch.setattr(iogovernor, '_fdatasync', lambda fd: time.sleep(0.2))
+    gov = IOGovernor(target_latency=0.02, max_window=8, sync_bytes=4 * MB)
+    with open(str(tmp_path / 'out'), 'wb') as f:
+        for i in range(4):
+            gov.write(f, b'x' * MB)
+    assert gov.slow_writes == 1
+    assert gov.window() == 4
+
+
+def test_fast_disk_keeps_window(tmp_path):
+    gov = IOGovernor(target_latency=5, max_window=8, sync_bytes=2 * MB)
+    with open(str(tmp_path / 'out'), 'wb') as f:
+        for i in range(8):
+            gov.write(f, b'x' * MB)
+        gov.flush(f)
+    assert gov.slow_writes == 0
+    assert gov.window() == 8
+
+
+def test_sync_write_observes_each_block(tmp_path, monkeypatch):
+    monkeypatch.setattr(iogovernor, '_fdatasync', lambda fd: time.sleep(0.05))
+    gov = IOGovernor(target_latency=0.01, max_window=64)
+    for i in range(3):
+        with open(str(tmp_path / ('chunk%d' % i)), 'wb') as f:
+            gov.write(f, b'x' * 1024, sync=True)
+    assert gov.slow_writes == 3
+    assert gov.window() == 8
+
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+'''
+  test_kvminventory.py - testes do inventário de VMs com saída do 'virsh domstats' gravada.
+'''
+import os
+
+import kvminventory
+from conftest import MB, TESTS_DIR
+from kvminventory import GB, KVMInventory, parse_domstats
+
+DOMSTATS = '''Domain: 'VMSnipeit'
+  state.state=1
+  state.reason=1
+  vcpu.current=2
+  vcpu.maximum=4
+  vcpu.0.state=1
+  vcpu.0.time=1250000000
+  balloon.current=4194304
+  balloon.maximum=4194304
+  block.count=2
+  block.0.name=vda
+  block.0.path=/var/lib/libvirt/images/VMSnipeit.qcow2
+  block.0.allocation=3221225472
+  block.0.capacity=21474836480
+  block.0.physical=3221225472
+  block.1.name=hda
+
+Domain: 'VM Zabbix'
+  state.state=5
+  state.reason=1
+  vcpu.current=1
+  vcpu.maximum=1
+  balloon.maximum=2097152
+  block.count=1
+  block.0.name=vda
+  block.0.path=%s
+
+'''
+
+
+def test_parse_domstats():
+    domains = parse_domstats(DOMSTATS % '/var/lib/libvirt/images/zabbix.qcow2')
+    assert sorted(domains) == ['VM Zabbix', 'VMSnipeit']
+    snipeit = domains['VMSnipeit']
+    assert snipeit['state.state'] == 1 and snipeit['vcpu.current'] == 2
+    assert snipeit['block.0.capacity'] == 20 * GB
+    assert snipeit['block.0.path'] == '/var/lib/libvirt/images/VMSnipeit.qcow2'
+    assert snipeit['block.1.name'] == 'hda' and 'block.1.path' not in snipeit
+    assert 'block.0.capacity' not in domains['VM Zabbix']
+    assert parse_domstats('') == {}
+
+
+def test_collect_reads_stopped_images_once(tmp_path, monkeypatch):
+    image = str(tmp_path / 'zabbix.img')
+    with open(image, 'wb') as f:
+        f.truncate(8 * 1024 * MB)
+    monkeypatch.setattr(kvminventory, 'domain_stats', lambda: parse_domstats(DOMSTATS % image))
+    reads = []
+
+    def image_info(path):
+        reads.append(path)
+        return {'virtual_bytes': os.stat(path).st_size, 'actual_bytes': 0, 'format': 'raw'}
+    monkeypatch.setattr(kvminventory, 'image_info', image_info)
+
+    cache = str(tmp_path / 'cache.json')
+    inventory = KVMInventory(cache, workers=2).collect()
+    vms = dict((vm['name'], vm) for vm in inventory['vms'])
+    assert vms['VMSnipeit']['state'] == 'running' and vms['VM Zabbix']['state'] == 'shut off'
+    assert vms['VMSnipeit']['memory_gb'] == 4 and vms['VMSnipeit']['disk_gb'] == 20
+    # O CD-ROM vazio é ignorado; o disco da VM desligada vem da imagem
+    assert [d['target'] for d in vms['VMSnipeit']['disks']] == ['vda']
+    assert vms['VM Zabbix']['disk_gb'] == 8
+    assert inventory['totals'] == {'vcpus': 3, 'memory_gb': 6, 'disk_gb': 28}
+    assert reads == [image]
+
+    # Próxima execução: imagem inalterada vem do cache; alterada é relida
+    assert KVMInventory(cache).collect()['totals']['disk_gb'] == 28
+    assert reads == [image]
+    with open(image, 'r+b') as f:
+        f.truncate(10 * 1024 * MB)
+    assert KVMInventory(cache).collect()['totals']['disk_gb'] == 30
+    assert reads == [image, image]
+
+
+def test_checker_is_executable():
+    assert os.access(os.path.join(TESTS_DIR, os.pardir, 'kvm-resource-checker.py'), os.X_OK)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+'''
+  test_neprobe.py - testes da sondagem de alteração dos NEs com saídas de sessão simuladas.
+'''
+import hashlib
+
+from neprobe import command_failed, probe_marker, strip_session
+
+COMMAND = 'show system commit | nomore'
+COMMIT = '0   2026-10-19 10:00:00 UTC by goku via cli'
+
+
+class FakeSSH:
+    '''
+    MySSH simulado: devolve sempre o mesmo (status, saída) e registra as chamadas.
+    '''
+    def __init__(self, status, output):
+        self.result = (status, output)
+        self.calls = []
+
+    def run(self, cmd, input_data=None, timeout=10, pty=True):
+        self.calls.append((cmd, input_data, pty))
+        return self.result
+
+
+def session(body, banner='Welcome to Junos'):
+    return '%s\r\n\r\ngoku@SW1> %s\r\n%s\r\n\r\ngoku@SW1> ' % (banner, COMMAND, body)
+
+
+def test_pty_session_hashes_only_command_output():
+    first = probe_marker(FakeSSH(-1, session(COMMIT)), 'SW1-TI', COMMAND, 0, 3)
+    # Banner diferente (ex: mensagem do dia) não muda o marcador
+    second = probe_marker(FakeSSH(-1, session(COMMIT, banner='Last login: ontem')), 'SW1-TI', COMMAND, 0, 3)
+    assert first == second == hashlib.sha256(COMMIT.encode('utf-8')).hexdigest()
+    assert strip_session(session(COMMIT), COMMAND).strip() == COMMIT
+
+
+def test_pty_session_without_echo_or_prompt_is_rejected():
+    assert probe_marker(FakeSSH(-1, 'Welcome\r\n' + COMMIT + '\r\ngoku@SW1> '), 'SW1-TI', COMMAND, 0, 3) is None
+    assert probe_marker(FakeSSH(-1, 'goku@SW1> %s\r\n%s\r\n' % (COMMAND, COMMIT)), 'SW1-TI', COMMAND, 0, 3) is None
+
+
+def test_error_output_is_rejected():
+    for error in ('error: syntax error', "% Invalid input detected at '^' marker.",
+                  '              ^\r\nunknown command.'):
+        assert probe_marker(FakeSSH(-1, session(error)), 'SW1-TI', COMMAND, 0, 3) is None
+        assert probe_marker(FakeSSH(0, error + '\n'), 'SW2-TI', COMMAND, 1, 3) is None
+
+
+def test_timeout_and_status_are_rejected():
+    timeout = session(COMMIT) + '\nERRO: timeout após 3 segundos\n'
+    assert command_failed(timeout)
+    assert probe_marker(FakeSSH(-1, timeout), 'SW1-TI', COMMAND, 0, 3) is None
+    assert probe_marker(FakeSSH(1, COMMIT + '\n'), 'SW2-TI', COMMAND, 1, 3) is None
+    assert probe_marker(FakeSSH(0, '  \n'), 'SW2-TI', COMMAND, 1, 3) is None
+
+
+def test_exec_probe_runs_without_pty():
+    ssh = FakeSSH(0, COMMIT + '\n')
+    assert probe_marker(ssh, 'SW2-TI', COMMAND, 1, 3) == hashlib.sha256(COMMIT.encode('utf-8')).hexdigest()
+    assert ssh.calls == [(COMMAND, None, False)]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+'''
+  test_reachability.py - testes do teste de alcance TCP e dos timeouts adaptativos.
+'''
+import socket
+import time
+
+import pytest
+
+from reachability import LatencyHistory, scan
+
+
+@pytest.fixture
+def ports():
+    '''
+    (porta aberta, porta que não responde, porta fechada) em 127.0.0.1.
+
+    A porta que não responde tem a fila de conexões cheia: o kernel descarta os
+    SYNs seguintes e o connect só termina pelo timeout, como num NE fora do ar.
+    '''
+    opened = socket.socket()
+    opened.bind(('127.0.0.1', 0))
+    opened.listen(5)
+    full = socket.socket()
+    full.bind(('127.0.0.1', 0))
+    full.listen(0)
+    queued = []
+    for i in range(2):
+        sock = socket.socket()
+        sock.settimeout(0.2)
+        try:
+            sock.connect(full.getsockname())
+        except socket.timeout:
+            pass
+        queued.append(sock)
+    closed = socket.socket()
+    closed.bind(('127.0.0.1', 0))
+    port = closed.getsockname()[1]
+    closed.close()
+    yield opened.getsockname()[1], full.getsockname()[1], port
+    for sock in [opened, full] + queued:
+        sock.close()
+
+
+def test_scan_waits_for_all_targets_in_one_select(ports):
+    opened, full, closed = ports
+    started = time.time()
+    results = scan([('SW1-TI', '127.0.0.1', opened, 2), ('SW2-TI', '127.0.0.1', closed, 2)]
+                   + [('SW%d-TI' % i, '127.0.0.1', full, 0.5) for i in range(3, 7)])
+    elapsed = time.time() - started
+    # 4 NEs sem resposta custam um único timeout, não a soma deles
+    assert 0.5 <= elapsed < 1.0
+    assert results['SW1-TI'][0] is not None and results['SW1-TI'][1] is None
+    assert results['SW2-TI'] == (None, 'Connection refused')
+    for i in range(3, 7):
+        assert results['SW%d-TI' % i] == (None, 'timeout após 0.5s')
+
+
+def test_closed_port_fails_without_waiting_timeout(ports):
+    started = time.time()
+    results = scan([('SW2-TI', '127.0.0.1', ports[2], 5), ('SW3-TI', 'ne.invalid', 22, 5)])
+    assert time.time() - started < 1
+    assert results['SW2-TI'] == (None, 'Connection refused')
+    assert results['SW3-TI'][0] is None and results['SW3-TI'][1]
+
+
+def test_timeout_follows_observed_latency(tmp_path):
+    path = str(tmp_path / 'latency.json')
+    history = LatencyHistory(path, samples=10, margin=3.0, ceiling=60)
+    assert history.timeout('SW1-TI', 'command', 10) == 10
+    for seconds in [1.0] * 9 + [8.0]:
+        history.add('SW1-TI', 'command', seconds)
+    history.save()
+
+    history = LatencyHistory(path, samples=10, margin=3.0, ceiling=60)
+    # p99 = 8 s -> 24 s; nunca abaixo do configurado nem acima do teto
+    assert history.timeout('SW1-TI', 'command', 10) == 24
+    assert history.timeout('SW1-TI', 'command', 30) == 30
+    history.add('SW1-TI', 'command', 40)
+    assert history.timeout('SW1-TI', 'command', 10) == 60
+    # Só as últimas amostras contam
+    for i in range(10):
+        history.add('SW1-TI', 'command', 1.0)
+    assert history.timeout('SW1-TI', 'command', 1) == 3
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+'''
+  test_replicate.py - testes do Replicator com um servidor SSH/SFTP local (paramiko).
+'''
+import hashlib
+import json
+import os
+
+import paramiko
+import pytest
+
+import replicate as replicate_module
+from catalog import BackupCatalog
+from conftest import MB
+from replicate import ReplicationError, Replicator
+from sftp_server import SFTPTestServer
+from vmconfig import ReplicaConfig
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = SFTPTestServer()
+    server.install(monkeypatch)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def env(tmp_path, server):
+    key = str(tmp_path / 'id_rsa')
+    paramiko.RSAKey.generate(2048).write_private_key_file(key)
+    replica = ReplicaConfig({'enabled': True, 'host': 'replica.test', 'user': 'backup', 'keyfilename': key,
+                             'remote_dir': str(tmp_path / 'remote'), 'channels': 2, 'chunk_mb': 1})
+    catalog = BackupCatalog(str(tmp_path / 'catalog.db'))
+    (tmp_path / 'local').mkdir()
+    yield tmp_path, replica, catalog
+    catalog.close()
+
+
+def artifact(tmp_path, catalog, name, data, sha256=None):
+    '''
+    Grava uma configuração de NE (store file) e a registra no catálogo.
+    '''
+    path = str(tmp_path / 'local' / (name + '.cnf'))
+    with open(path, 'wb') as f:
+        f.write(data)
+    catalog.record('ne', 'SW1-TI', name, path, store='file', sha256=sha256 or hashlib.sha256(data).hexdigest())
+    return path
+
+
+def remote_chunks(tmp_path):
+    root = tmp_path / 'remote' / 'chunks'
+    if not root.exists():
+        return []
+    return sorted(f.name for d in root.iterdir() for f in d.iterdir())
+
+
+def replicate(replica, catalog):
+    replicator = Replicator(catalog, replica)
+    try:
+        return replicator.run()
+    finally:
+        replicator.close()
+
+
+def test_chunks_already_on_remote_are_skipped(env, server, monkeypatch):
+    tmp_path, replica, catalog = env
+    base = os.urandom(2 * MB)
+    first = artifact(tmp_path, catalog, 'sw1-ti_1', base + os.urandom(MB))
+    artifact(tmp_path, catalog, 'sw1-ti_2', base + os.urandom(MB // 2))
+    reads = []
+
+    def counting_open(path, *args, **kw):
+        reads.append(path)
+        return open(path, *args, **kw)
+    monkeypatch.setattr(replicate_module, 'open', counting_open, raising=False)
+
+    summary = replicate(replica, catalog)
+    assert summary['artifacts'] == 2 and summary['failed'] == 0
+    # Cada artefato é lido uma única vez (checksum calculado durante o envio)
+    assert reads.count(first) == 1
+    # Os 2 blocos em comum são enviados uma única vez
+    assert summary['sent_bytes'] == 3 * MB + MB // 2
+    assert summary['skipped_bytes'] == 2 * MB
+    assert len(remote_chunks(tmp_path)) == 4
+    assert catalog.pending_replication() == []
+    manifest = tmp_path / 'remote' / 'manifests' / 'ne' / 'SW1-TI' / 'sw1-ti_2.json'
+    assert len(json.loads(manifest.read_text())['files'][0]['chunks']) == 3
+
+    # Execução seguinte (índice lido do servidor): só o bloco novo é enviado
+    del server.writes[:]
+    artifact(tmp_path, catalog, 'sw1-ti_3', base + os.urandom(10))
+    summary = replicate(replica, catalog)
+    assert summary['sent_bytes'] == 10 and summary['skipped_bytes'] == 2 * MB
+    assert len(server.writes) == 2      # bloco novo e manifesto
+
+
+def test_interrupted_chunk_upload_resumes_from_part(env, server):
+    tmp_path, replica, catalog = env
+    data = os.urandom(MB)
+    artifact(tmp_path, catalog, 'sw1-ti_1', data)
+    digest = hashlib.sha256(data).hexdigest()
+    bucket = tmp_path / 'remote' / 'chunks' / digest[:2]
+    bucket.mkdir(parents=True)
+    (bucket / (digest + '.part')).write_bytes(data[:300 * 1024])
+
+    summary = replicate(replica, catalog)
+    assert summary['artifacts'] == 1
+    assert summary['sent_bytes'] == MB - 300 * 1024
+    assert (bucket / digest).read_bytes() == data
+    assert not (bucket / (digest + '.part')).exists()
+
+
+def test_artifact_not_matching_catalog_is_not_replicated(env, server):
+    tmp_path, replica, catalog = env
+    artifact(tmp_path, catalog, 'sw1-ti_1', os.urandom(MB), sha256='0' * 64)
+
+    summary = replicate(replica, catalog)
+    assert summary['failed'] == 1 and summary['artifacts'] == 0
+    assert not (tmp_path / 'remote' / 'manifests').exists()
+    assert len(catalog.pending_replication()) == 1
+
+
+def test_chunk_corrupted_on_remote_is_rejected(env, server):
+    tmp_path, replica, catalog = env
+    artifact(tmp_path, catalog, 'sw1-ti_1', os.urandom(MB))
+    server.corrupt = True
+
+    summary = replicate(replica, catalog)
+    assert summary['failed'] == 1 and summary['artifacts'] == 0
+    # Nenhum bloco é aceito (nem deixado como .part) e o manifesto não é gravado
+    assert remote_chunks(tmp_path) == []
+    assert not (tmp_path / 'remote' / 'manifests').exists()
+    assert len(catalog.pending_replication()) == 1
+
+
+def test_restore_from_replica(env, server):
+    tmp_path, replica, catalog = env
+    data = os.urandom(2 * MB + 123)
+    path = artifact(tmp_path, catalog, 'sw1-ti_1', data)
+    assert replicate(replica, catalog)['artifacts'] == 1
+
+    replicator = Replicator(catalog, replica)
+    try:
+        restored = replicator.restore('ne', 'SW1-TI', 'sw1-ti_1', str(tmp_path / 'restore'))
+        assert restored == [str(tmp_path / 'restore') + path]
+        with open(restored[0], 'rb') as f:
+            assert f.read() == data
+
+        # Bloco alterado no servidor: a restauração falha em vez de gravar dados errados
+        chunk = tmp_path / 'remote' / 'chunks'
+        victim = sorted(f for d in chunk.iterdir() for f in d.iterdir())[0]
+        victim.write_bytes(b'x' + victim.read_bytes()[1:])
+        with pytest.raises(ReplicationError):
+            replicator.restore('ne', 'SW1-TI', 'sw1-ti_1', str(tmp_path / 'restore2'))
+    finally:
+        replicator.close()
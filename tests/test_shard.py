@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+'''
+  test_shard.py - testes do ShardCoordinator com várias instâncias em processos separados.
+'''
+import collections
+import json
+import multiprocessing
+import os
+import time
+
+from shard import HashRing, ShardCoordinator
+
+SECTIONS = ['SW%d-TI' % i for i in range(24)]
+
+
+def instance(directory, name, log, ready=None, go=None, settle=0.5, ttl=2):
+    '''
+    Instância do backupNE.py: cada seção executada é registrada em log (uma linha JSON).
+    '''
+    shard = ShardCoordinator(directory, name, ttl=ttl)
+
+    def work(section):
+        with open(log, 'a') as f:
+            f.write(json.dumps({'instance': name, 'section': section, 'time': time.time()}) + '\n')
+        time.sleep(0.02)
+        return True
+    if ready is not None:
+        ready.set()
+        go.wait()
+    shard.join(settle=settle)
+    try:
+        done, pending = shard.run(SECTIONS, work, poll=0.1, max_wait=30)
+    finally:
+        shard.leave()
+    os._exit(0 if not pending else 1)
+
+
+def crashed(directory, name):
+    '''
+    Instância que entra no anel e morre sem sair (o lease deixa de ser renovado).
+    '''
+    shard = ShardCoordinator(directory, name, ttl=2)
+    shard.heartbeat()
+    os._exit(0)
+
+
+def executed(log):
+    with open(log) as f:
+        return [json.loads(line) for line in f]
+
+
+def start(target, *args):
+    proc = multiprocessing.get_context('fork').Process(target=target, args=args)
+    proc.start()
+    return proc
+
+
+def test_each_section_claimed_by_one_instance(tmp_path):
+    directory, log = str(tmp_path / 'shard'), str(tmp_path / 'work.log')
+    ctx = multiprocessing.get_context('fork')
+    go = ctx.Event()
+    names = ['srv%d:%d' % (i, i) for i in range(3)]
+    ready = [ctx.Event() for n in names]
+    procs = [start(instance, directory, n, log, r, go) for n, r in zip(names, ready)]
+    for r in ready:
+        assert r.wait(10)
+    go.set()
+    for proc in procs:
+        proc.join(60)
+        assert proc.exitcode == 0
+
+    runs = executed(log)
+    counts = collections.Counter(r['section'] for r in runs)
+    assert sorted(counts) == sorted(SECTIONS)
+    assert set(counts.values()) == {1}
+    # Com todas no anel, cada seção é executada pela dona indicada pelo hash
+    ring = HashRing(names)
+    assert all(ring.owner(r['section']) == r['instance'] for r in runs)
+    assert len(set(r['instance'] for r in runs)) == 3
+
+    # Uma nova execução na mesma janela (desde o início da execução) não repete as seções
+    late = start(instance, directory, 'srv9:9', log)
+    late.join(30)
+    assert late.exitcode == 0
+    assert len(executed(log)) == len(SECTIONS)
+
+
+def test_sections_taken_over_after_lease_expiry(tmp_path):
+    directory, log = str(tmp_path / 'shard'), str(tmp_path / 'work.log')
+    dead = start(crashed, directory, 'srv1:1')
+    dead.join(10)
+    survivor = start(instance, directory, 'srv2:2', log)
+    survivor.join(60)
+    assert survivor.exitcode == 0
+
+    runs = executed(log)
+    assert sorted(r['section'] for r in runs) == sorted(SECTIONS)
+    assert set(r['instance'] for r in runs) == {'srv2:2'}
+    # As seções da instância morta só foram executadas depois do fim do lease (ttl)
+    with open(os.path.join(directory, 'members', 'srv1:1.lease')) as f:
+        heartbeat = json.load(f)['heartbeat']
+    ring = HashRing(['srv1:1', 'srv2:2'])
+    orphans = [r for r in runs if ring.owner(r['section']) == 'srv1:1']
+    assert orphans
+    assert all(r['time'] > heartbeat + 2 for r in orphans)
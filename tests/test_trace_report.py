@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+'''
+  test_trace_report.py - testes da comparação de etapas entre execuções (trace_report.py).
+'''
+import os
+import subprocess
+import sys
+import time
+
+from conftest import TESTS_DIR
+from tracing import PhaseTracer, load
+
+SCRIPT = os.path.join(TESTS_DIR, os.pardir, 'backup', 'trace_report.py')
+sys.path.insert(0, os.path.dirname(SCRIPT))
+
+from trace_report import regressions
+
+
+def run(path, vm, run, export, downtime=30, result='ok'):
+    '''
+    Grava uma execução com etapas de duração conhecida: snapshot (10 s) e export.
+    '''
+    now = time.time()
+    tracer = PhaseTracer(path, vm, run)
+    tracer.started = now - 10 - export
+    tracer.record('snapshot', now - 10 - export, now - export)
+    tracer.record('export', now - export, now, bytes=export * 100 * 1024 * 1024)
+    return tracer.summary(result, downtime=downtime)
+
+
+def test_slower_phase_is_a_regression(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    for i, export in enumerate([100, 110, 95, 105]):
+        run(path, 'vm1', '2026101%d_030000' % i, export)
+    assert regressions(load(path, 'vm1'), 0.2) == []
+
+    run(path, 'vm1', '20261015_030000', 160, downtime=31)
+    found = dict((metric, (current, base)) for metric, current, base in regressions(load(path, 'vm1'), 0.2))
+    # A mediana das anteriores (102,5 s) e não a média nem a última é a referência
+    assert sorted(found) == ['export', 'total']
+    assert found['export'] == (160, 102.5)
+    assert abs(found['total'][0] - 170) < 0.1 and abs(found['total'][1] - 112.5) < 0.1
+
+
+def test_small_differences_are_ignored(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    for i, export in enumerate([2, 2, 2]):
+        run(path, 'vm1', '2026101%d_030000' % i, export, downtime=1)
+    # +100% em segundos não é regressão: a diferença fica abaixo de MIN_DELTA
+    run(path, 'vm1', '20261013_030000', 4, downtime=2)
+    assert regressions(load(path, 'vm1'), 0.2) == []
+    assert regressions(load(path, 'vm1')[-1:], 0.2) == []
+
+
+def test_report_exits_with_error_on_regression(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    config = tmp_path / 'config.yaml'
+    config.write_text('global:\n  backup_base_dir: %s\n  log_dir: %s\n  trace_file: %s\nvms: []\n'
+                      % (tmp_path, tmp_path, path))
+    for i, export in enumerate([100, 100, 100]):
+        run(path, 'vm1', '2026101%d_030000' % i, export)
+        run(path, 'vm2', '2026101%d_030000' % i, export)
+    run(path, 'vm2', '20261013_030000', 100, downtime=120)
+
+    report = subprocess.run([sys.executable, SCRIPT, '-v', 'vm1', str(config)], stdout=subprocess.PIPE)
+    assert report.returncode == 0 and b'REGRESS' not in report.stdout
+    report = subprocess.run([sys.executable, SCRIPT, str(config)], stdout=subprocess.PIPE)
+    assert report.returncode == 1
+    lines = report.stdout.decode('utf-8').splitlines()
+    assert [l.split(':')[1].split()[0] for l in lines if l.startswith('REGRESSÃO')] == ['downtime']
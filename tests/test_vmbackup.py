@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+'''
+  test_vmbackup.py - testes do VMBackup/process_backups com o virsh de teste e imagens esparsas.
+'''
+import errno
+import os
+import sqlite3
+import threading
+import zlib
+
+import pytest
+
+from conftest import MB, make_image
+import snapshot
+import tracing
+import vmbackup
+from snapshot import FrozenImage, SnapshotError
+from vmbackup import StageSlots, VMBackup, process_backups
+from vmconfig import BackupConfig
+
+
+def make_config(tmp_path, vms, read_limit=0, **glob):
+    '''
+    @param vms  - lista de (nome, snapshot)
+    '''
+    images = tmp_path / 'images'
+    images.mkdir(exist_ok=True)
+    (tmp_path / 'log').mkdir(exist_ok=True)
+    settings = {'backup_base_dir': str(tmp_path / 'backup'), 'log_dir': str(tmp_path / 'log'),
+                'compress_workers': 2, 'copy_slots': 1, 'verify_slots': 1, 'min_free_gb': 0,
+                'io': {'read_limit': read_limit, 'ioprio_class': 'none', 'nice': 0}}
+    settings.update(glob)
+    entries = []
+    for name, mode in vms:
+        image = make_image(str(images / (name + '.img')))
+        entries.append({'name': name, 'enabled': True, 'vm_file': image,
+                        'backup_types': [{'type': 'offline', 'shutdown_timeout': 5, 'snapshot': mode}]})
+    return BackupConfig({'global': settings, 'vms': entries})
+
+
+def spans(config, vm, phase):
+    return [s for s in tracing.load(config.trace_file, vm, 'span') if s['phase'] == phase]
+
+
+def windows(virsh, name):
+    '''
+    @returns - intervalos (shutdown, start) em que a VM ficou desligada, pelas chamadas ao virsh.
+    '''
+    result = []
+    down = None
+    for stamp, args in virsh.calls(name):
+        if args[0] == 'shutdown' and down is None:
+            down = stamp
+        elif args[0] == 'start' and down is not None:
+            result.append((down, stamp))
+            down = None
+    return result
+
+
+def overlaps(a, b):
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def test_stage_slots_limits():
+    slots = StageSlots(copy_slots=2, verify_slots=0)
+    assert slots.copy.acquire(False) and slots.copy.acquire(False)
+    assert not slots.copy.acquire(False)
+    assert slots.verify.acquire(False) and not slots.verify.acquire(False)
+
+
+def test_offline_backup_restarts_and_records_downtime(tmp_path, virsh):
+    config = make_config(tmp_path, [('vm1', 'none')])
+    virsh.define('vm1')
+
+    assert process_backups(config, 'vm1') == 0
+    assert virsh.state('vm1') == 'running'
+    assert virsh.commands('vm1') == ['dominfo', 'shutdown', 'start']
+    summary = tracing.load(config.trace_file, 'vm1')[-1]
+    assert summary['result'] == 'ok'
+    export = spans(config, 'vm1', 'export')[0]
+    down, up = windows(virsh, 'vm1')[0]
+    # Sem snapshot a VM fica desligada durante toda a exportação
+    assert summary['downtime'] >= export['duration']
+    assert down <= export['start'] and export['end'] <= up
+
+
+@pytest.mark.parametrize('error', [zlib.error('invalid block'), ValueError('manifest'),
+                                   sqlite3.OperationalError('database is locked')],
+                         ids=['zlib', 'value', 'sqlite'])
+def test_restart_when_export_raises(tmp_path, virsh, monkeypatch, error):
+    config = make_config(tmp_path, [('vm1', 'none')])
+    virsh.define('vm1')
+
+    def broken(*args, **kw):
+        raise error
+    monkeypatch.setattr(vmbackup, 'stream_backup', broken)
+
+    job = VMBackup(config, config.get_vm('vm1'))
+    assert job.setup()
+    with pytest.raises(type(error)):
+        job.run()
+    assert virsh.state('vm1') == 'running'
+    assert virsh.commands('vm1')[-2:] == ['shutdown', 'start']
+    assert tracing.load(config.trace_file, 'vm1')[-1]['result'] == 'failed'
+
+    # No lote, a falha é registrada e a VM continua no ar
+    assert process_backups(config, 'vm1') == 1
+    assert virsh.state('vm1') == 'running'
+
+
+def test_restart_when_snapshot_export_raises(tmp_path, virsh, monkeypatch):
+    config = make_config(tmp_path, [('vm1', 'overlay')])
+    virsh.define('vm1', disk=config.get_vm('vm1').vm_file)
+
+    def broken(*args, **kw):
+        raise zlib.error('invalid block')
+    monkeypatch.setattr(vmbackup, 'stream_backup', broken)
+
+    assert process_backups(config, 'vm1') == 1
+    assert virsh.state('vm1') == 'running'
+    # A cópia congelada é liberada (overlay consolidado) mesmo com a exceção
+    assert 'blockcommit' in virsh.commands('vm1')
+    assert not os.path.exists(config.get_vm('vm1').vm_file + '.backup-overlay')
+
+
+def test_copy_slot_serialises_offline_exports(tmp_path, virsh):
+    names = ['vm1', 'vm2', 'vm3']
+    config = make_config(tmp_path, [(n, 'none') for n in names], read_limit=8)
+    for name in names:
+        virsh.define(name)
+
+    assert process_backups(config) == 0
+    exports = [spans(config, n, 'export')[0] for n in names]
+    down = [windows(virsh, n)[0] for n in names]
+    for i in range(len(names)):
+        assert virsh.state(names[i]) == 'running'
+        # A VM só é desligada depois de obter o slot de cópia: nenhuma espera desligada
+        wait = spans(config, names[i], 'wait_copy')[0]
+        assert wait['end'] <= spans(config, names[i], 'shutdown')[0]['start']
+        for j in range(len(names)):
+            if i != j:
+                # Uma exportação por vez, e nenhuma VM desligada durante a exportação de outra
+                assert not overlaps((exports[i]['start'], exports[i]['end']), (exports[j]['start'], exports[j]['end']))
+                assert not overlaps(down[i], (exports[j]['start'], exports[j]['end']))
+    summaries = dict((n, tracing.load(config.trace_file, n)[-1]) for n in names)
+    assert len(set(s['run'] for s in summaries.values())) == 1
+    for name in names:
+        assert summaries[name]['downtime'] is not None
+
+
+def test_snapshot_restarts_before_export(tmp_path, virsh):
+    config = make_config(tmp_path, [('vm1', 'overlay')], read_limit=8)
+    vm = config.get_vm('vm1')
+    virsh.define('vm1', disk=vm.vm_file)
+
+    assert process_backups(config, 'vm1') == 0
+    assert virsh.commands('vm1') == ['dominfo', 'shutdown', 'domblklist', 'snapshot-create-as',
+                                     'start', 'blockcommit']
+    export = spans(config, 'vm1', 'export')[0]
+    down, up = windows(virsh, 'vm1')[0]
+    assert up < export['start']
+    summary = tracing.load(config.trace_file, 'vm1')[-1]
+    assert summary['downtime'] < export['duration']
+    assert not os.path.exists(vm.vm_file + '.backup-overlay')
+    assert not os.listdir(os.path.join(os.path.dirname(vm.vm_file), '.backup-snapshots'))
+
+
+def test_freeze_failure_with_free_slot_goes_offline(tmp_path, virsh):
+    config = make_config(tmp_path, [('vm1', 'overlay')])
+    virsh.define('vm1', disk=config.get_vm('vm1').vm_file)
+    virsh.flag('vm1', 'nosnapshot')
+
+    assert process_backups(config, 'vm1') == 0
+    # Slot livre: exporta offline em seguida, sem religar e desligar de novo
+    assert virsh.commands('vm1') == ['dominfo', 'shutdown', 'domblklist', 'snapshot-create-as', 'start']
+    assert virsh.state('vm1') == 'running'
+
+
+def test_freeze_failure_does_not_wait_down_for_copy_slot(tmp_path, virsh):
+    config = make_config(tmp_path, [('slow', 'none'), ('vm2', 'overlay')], read_limit=8)
+    virsh.define('slow')
+    virsh.define('vm2', disk=config.get_vm('vm2').vm_file)
+    virsh.flag('vm2', 'nosnapshot')
+
+    slots = StageSlots(1, 1)
+    slow = VMBackup(config, config.get_vm('slow'))
+    vm2 = VMBackup(config, config.get_vm('vm2'))
+    assert slow.setup() and vm2.setup()
+    exporting = threading.Event()
+    original = slow.export
+
+    def export(source):
+        exporting.set()
+        return original(source)
+    slow.export = export
+    thread = threading.Thread(target=slow.run, args=(slots,))
+    thread.start()
+    assert exporting.wait(10)
+    assert vm2.run(slots)
+    thread.join()
+
+    assert virsh.commands('vm2') == ['dominfo', 'shutdown', 'domblklist', 'snapshot-create-as',
+                                     'start', 'shutdown', 'start']
+    first, second = windows(virsh, 'vm2')
+    slow_export = spans(config, 'slow', 'export')[0]
+    # Religada enquanto a outra VM exportava; desligada de novo só depois, no slot
+    assert first[1] < slow_export['end']
+    assert second[0] >= slow_export['end']
+    assert virsh.state('vm2') == 'running' and virsh.state('slow') == 'running'
+
+
+def test_overlay_link_failure_commits_back(tmp_path, virsh, monkeypatch):
+    image = make_image(str(tmp_path / 'vm1.img'))
+    virsh.define('vm1', state='shut off', disk=image)
+
+    link = os.link
+
+    def broken(source, target):
+        raise OSError(1, 'Operation not permitted')
+    monkeypatch.setattr(snapshot.os, 'link', broken)
+
+    frozen = FrozenImage('vm1', image, method='overlay')
+    with pytest.raises(SnapshotError):
+        frozen.freeze()
+    assert virsh.commands('vm1') == ['domblklist', 'snapshot-create-as', 'start', 'blockcommit', 'destroy']
+    assert not os.path.exists(image + '.backup-overlay')
+    assert virsh.state('vm1') == 'shut off'
+
+    # O próximo backup consegue congelar a imagem de novo
+    monkeypatch.setattr(snapshot.os, 'link', link)
+    frozen = FrozenImage('vm1', image, method='overlay')
+    assert frozen.freeze() == 'overlay'
+    frozen.release()
+
+
+@pytest.mark.parametrize('code, fallback', [(errno.EOPNOTSUPP, True), (errno.EIO, False)])
+def test_failed_reflink_leaves_no_target(tmp_path, monkeypatch, code, fallback):
+    image = make_image(str(tmp_path / 'vm1.img'))
+    target = str(tmp_path / 'vm1.img.backup-reflink')
+
+    def ioctl(fd, request, arg):
+        raise IOError(code, os.strerror(code))
+    monkeypatch.setattr(snapshot.fcntl, 'ioctl', ioctl)
+
+    if fallback:
+        # Sem suporte a reflink: o chamador faz outra cópia
+        assert snapshot.reflink(image, target) is False
+    else:
+        with pytest.raises(IOError):
+            snapshot.reflink(image, target)
+    assert not os.path.exists(target)
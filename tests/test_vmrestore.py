@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+'''
+  test_vmrestore.py - testes do VMRestore com o virsh de teste e imagens esparsas.
+'''
+import hashlib
+import os
+
+import tracing
+import vmrestore
+from test_vmbackup import make_config
+from vmbackup import process_backups
+from vmrestore import VMRestore
+
+
+def sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def backed_up(tmp_path, virsh):
+    '''
+    @returns (config, imagem) com um backup válido da vm1 no catálogo.
+    '''
+    config = make_config(tmp_path, [('vm1', 'none')])
+    virsh.define('vm1')
+    assert process_backups(config, 'vm1') == 0
+    return config, config.get_vm('vm1').vm_file
+
+
+def test_restore_replaces_image_and_traces_as_restore(tmp_path, virsh):
+    config, image = backed_up(tmp_path, virsh)
+    original = sha256(image)
+    with open(image, 'r+b') as f:
+        f.write(b'corrompido')
+
+    job = VMRestore(config, config.get_vm('vm1'))
+    assert job.setup()
+    assert job.restore()
+    assert sha256(image) == original
+    assert virsh.state('vm1') == 'running'
+    assert virsh.commands('vm1')[-2:] == ['shutdown', 'start']
+
+    # O desligamento da restauração não aparece como etapa de backup
+    backups = tracing.load(config.trace_file, 'vm1', 'span')
+    restores = tracing.load(config.trace_file, 'vm1', 'span', operation='restore')
+    assert [s['phase'] for s in backups].count('shutdown') == 1
+    assert [s['phase'] for s in restores] == ['shutdown', 'restart']
+    assert len(tracing.load(config.trace_file, 'vm1')) == 1
+
+
+def test_restore_restarts_original_when_swap_fails(tmp_path, virsh, monkeypatch):
+    config, image = backed_up(tmp_path, virsh)
+    with open(image, 'r+b') as f:
+        f.write(b'atual')
+    current = sha256(image)
+
+    def broken(source, target):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(vmrestore.os, 'rename', broken)
+
+    job = VMRestore(config, config.get_vm('vm1'))
+    assert job.setup()
+    assert not job.restore(start=False)
+    # Mesmo com --no-start, a VM volta ao ar com a imagem original
+    assert virsh.state('vm1') == 'running'
+    assert sha256(image) == current
+    leftovers = [f for f in os.listdir(os.path.dirname(image)) if f != os.path.basename(image)]
+    assert leftovers == []